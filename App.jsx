@@ -11,6 +11,8 @@ import './App.css'
 
 function App() {
   const [leads, setLeads] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [stageFilter, setStageFilter] = useState('all')
   const [systemHealth, setSystemHealth] = useState(null)
   const [kpis, setKpis] = useState(null)
   const [alerts, setAlerts] = useState([])
@@ -23,17 +25,45 @@ function App() {
     relationship: 'self'
   })
 
-  // Fetch leads from API
-  const fetchLeads = async () => {
+  // Fetch one page of leads from API (keyset pagination)
+  const fetchLeadsPage = async (cursor = null, stage = stageFilter) => {
+    const params = new URLSearchParams({ limit: '50' })
+    if (cursor) params.set('cursor', cursor)
+    if (stage !== 'all') params.set('stage', stage)
+
+    const response = await fetch(`/api/leads/page?${params}`)
+    return response.json()
+  }
+
+  // Fetch the first page of leads
+  const fetchLeads = async (stage = stageFilter) => {
     try {
-      const response = await fetch('/api/leads')
-      const data = await response.json()
-      setLeads(data)
+      const data = await fetchLeadsPage(null, stage)
+      setLeads(data.leads || [])
+      setNextCursor(data.next_cursor)
     } catch (error) {
       console.error('Error fetching leads:', error)
     }
   }
 
+  // Append the next page of leads
+  const loadMoreLeads = async () => {
+    if (!nextCursor) return
+    try {
+      const data = await fetchLeadsPage(nextCursor)
+      setLeads(currentLeads => [...currentLeads, ...(data.leads || [])])
+      setNextCursor(data.next_cursor)
+    } catch (error) {
+      console.error('Error loading more leads:', error)
+    }
+  }
+
+  // Change the stage filter and reload from the first page
+  const changeStageFilter = (stage) => {
+    setStageFilter(stage)
+    fetchLeads(stage)
+  }
+
   // Fetch system health
   const fetchSystemHealth = async () => {
     try {
@@ -107,7 +137,8 @@ function App() {
           stage: 'new',
           source: 'web_form'
         })
-        fetchLeads() // Refresh the leads list
+        fetchLeads() // Refresh the first page of leads
+        fetchDailyDigest() // Refresh stage counts
       }
     } catch (error) {
       console.error('Error creating lead:', error)
@@ -236,7 +267,7 @@ function App() {
                   <Users className="h-4 w-4 text-muted-foreground" />
                 </CardHeader>
                 <CardContent>
-                  <div className="text-2xl font-bold">{leads.length}</div>
+                  <div className="text-2xl font-bold">{dailyDigest?.total_leads || 0}</div>
                 </CardContent>
               </Card>
 
@@ -247,7 +278,7 @@ function App() {
                 </CardHeader>
                 <CardContent>
                   <div className="text-2xl font-bold">
-                    {leads.filter(lead => lead.stage === 'docs_requested').length}
+                    {dailyDigest?.lead_counts?.docs_requested || 0}
                   </div>
                 </CardContent>
               </Card>
@@ -259,7 +290,7 @@ function App() {
                 </CardHeader>
                 <CardContent>
                   <div className="text-2xl font-bold">
-                    {leads.filter(lead => lead.stage === 'consult_ready').length}
+                    {dailyDigest?.lead_counts?.consult_ready || 0}
                   </div>
                 </CardContent>
               </Card>
@@ -271,7 +302,7 @@ function App() {
                 </CardHeader>
                 <CardContent>
                   <div className="text-2xl font-bold">
-                    {leads.filter(lead => lead.stage === 'scheduled').length}
+                    {dailyDigest?.lead_counts?.scheduled || 0}
                   </div>
                 </CardContent>
               </Card>
@@ -308,6 +339,21 @@ function App() {
               <CardHeader>
                 <CardTitle>All Leads</CardTitle>
                 <CardDescription>Manage and track all patient leads</CardDescription>
+                <Select value={stageFilter} onValueChange={changeStageFilter}>
+                  <SelectTrigger className="w-56">
+                    <SelectValue placeholder="Filter by stage" />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="all">All stages</SelectItem>
+                    <SelectItem value="inquiry">Inquiry</SelectItem>
+                    <SelectItem value="docs_requested">Docs Requested</SelectItem>
+                    <SelectItem value="docs_received">Docs Received</SelectItem>
+                    <SelectItem value="clinical_review">Clinical Review</SelectItem>
+                    <SelectItem value="consult_ready">Consult Ready</SelectItem>
+                    <SelectItem value="scheduled">Scheduled</SelectItem>
+                    <SelectItem value="decision">Decision</SelectItem>
+                  </SelectContent>
+                </Select>
               </CardHeader>
               <CardContent>
                 <div className="space-y-4">
@@ -353,6 +399,13 @@ function App() {
                     </div>
                   ))}
                 </div>
+                {nextCursor && (
+                  <div className="flex justify-center pt-4">
+                    <Button variant="outline" onClick={loadMoreLeads}>
+                      Load more
+                    </Button>
+                  </div>
+                )}
               </CardContent>
             </Card>
           </TabsContent>
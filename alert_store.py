@@ -0,0 +1,99 @@
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+class AlertStore:
+    """Bounded alert store that coalesces repeats and keeps running counts
+
+    A repeat of an alert that is still active (same dedup key, not yet
+    acknowledged) bumps the existing alert's count and last_seen. It does
+    not add a new entry. Once acknowledged, the next occurrence opens a
+    fresh alert. The oldest acknowledged alerts are evicted first when the
+    store is over capacity.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self._alerts = OrderedDict()    # id -> alert, oldest first
+        self._active_by_key = {}        # dedup key -> id of its unacknowledged alert
+        self._active_by_severity = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def raise_alert(self, key, alert):
+        """Record an occurrence; returns (alert, is_new)"""
+        now = datetime.utcnow().isoformat()
+
+        with self._lock:
+            existing_id = self._active_by_key.get(key)
+            if existing_id is not None:
+                existing = self._alerts[existing_id]
+                existing['count'] += 1
+                existing['last_seen'] = now
+                if 'value' in alert:
+                    existing['value'] = alert['value']
+                return existing, False
+
+            alert = dict(alert)
+            alert.update({
+                'id': uuid.uuid4().hex[:12],
+                'key': key,
+                'count': 1,
+                'timestamp': alert.get('timestamp', now),
+                'last_seen': now,
+                'acknowledged': False
+            })
+            self._alerts[alert['id']] = alert
+            self._active_by_key[key] = alert['id']
+            self._active_by_severity[alert['severity']] += 1
+
+            if len(self._alerts) > self.capacity:
+                self._evict()
+            return alert, True
+
+    def _evict(self):
+        excess = len(self._alerts) - self.capacity
+        acknowledged = [alert_id for alert_id, alert in self._alerts.items() if alert['acknowledged']][:excess]
+        for alert_id in acknowledged:
+            del self._alerts[alert_id]
+
+        # Everything left is active; drop the oldest of those
+        while len(self._alerts) > self.capacity:
+            _, alert = self._alerts.popitem(last=False)
+            self._deactivate(alert)
+
+    def _deactivate(self, alert):
+        if self._active_by_key.get(alert['key']) == alert['id']:
+            del self._active_by_key[alert['key']]
+            self._active_by_severity[alert['severity']] -= 1
+
+    def acknowledge(self, alert_id):
+        """Mark an alert acknowledged; returns it, or None if the id is unknown"""
+        with self._lock:
+            alert = self._alerts.get(alert_id)
+            if alert is None:
+                return None
+            if not alert['acknowledged']:
+                alert['acknowledged'] = True
+                alert['acknowledged_at'] = datetime.utcnow().isoformat()
+                self._deactivate(alert)
+            return alert
+
+    def list(self, active_only=False):
+        with self._lock:
+            if active_only:
+                return [self._alerts[alert_id] for alert_id in self._active_by_key.values()]
+            return list(self._alerts.values())
+
+    def counts(self):
+        with self._lock:
+            active = len(self._active_by_key)
+            return {
+                'total': len(self._alerts),
+                'active': active,
+                'critical': self._active_by_severity['critical'],
+                'by_severity': {severity: count for severity, count in self._active_by_severity.items() if count}
+            }
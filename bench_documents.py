@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Document check benchmark: per-keyword passes vs the compiled classifier, and uncached vs cached folder listings
+
+Usage: python bench_documents.py [lead_count] [latency_ms]   (defaults: 2000, 2)
+
+Classification runs with the shipped keyword list and with a wider
+52-keyword list. The listing part builds one folder per lead in a scratch
+LocalFolderSource.
+latency_ms is slept on every API call. All leads are checked for three
+rounds, and between rounds 5% of the folders get a new upload. Each mode
+reports API calls, wall time, and whether its results match a fresh
+listing.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import random
+import tempfile
+import time
+from src.services.document_classifier import DocumentClassifier, DOC_KEYWORDS, document_classifier
+from src.services.folder_listing import FolderListingCache, LocalFolderSource
+
+FILE_NAMES = [
+    'imaging_scan_2025.pdf', 'lab_results_recent.pdf', 'Pathology Report - Biopsy.pdf', 'CT_chest.pdf',
+    'MRI brain w contrast.pdf', 'medication list.docx', 'oncology_consult_notes.pdf', 'insurance_card.jpg',
+    'drivers_license.png', 'PET-CT 2024-11-02.pdf', 'bloodwork_CBC.pdf', 'discharge summary.pdf'
+]
+
+WIDE_KEYWORDS = {
+    'imaging': ('imaging', 'scan', 'mri', 'ct', 'pet', 'ultrasound', 'xray', 'x-ray', 'mammogram', 'radiology',
+                'sonogram', 'dexa'),
+    'labs': ('lab', 'cbc', 'cmp', 'bloodwork', 'blood_work', 'tumor_marker', 'cea', 'psa', 'panel', 'urinalysis'),
+    'pathology': ('pathology', 'biopsy', 'histology', 'cytology', 'ihc', 'immunohisto', 'frozen_section',
+                  'surgical_path'),
+    'med_list': ('medication', 'med_list', 'drugs', 'prescription', 'rx', 'pharmacy', 'meds', 'supplements'),
+    'prior_notes': ('oncology', 'notes', 'report', 'consult', 'discharge', 'summary', 'progress', 'h&p', 'history',
+                    'operative', 'treatment_plan', 'chemo', 'letter', 'referral')
+}
+
+def legacy_classify(files):
+    """The original check_documents mapping: one any() pass per category, lowercasing every name each time"""
+    received_docs = []
+    if any('imaging' in f.lower() or 'scan' in f.lower() or 'mri' in f.lower() or 'ct' in f.lower() for f in files):
+        received_docs.append('imaging')
+    if any('lab' in f.lower() for f in files):
+        received_docs.append('labs')
+    if any('pathology' in f.lower() or 'biopsy' in f.lower() for f in files):
+        received_docs.append('pathology')
+    if any('medication' in f.lower() or 'med_list' in f.lower() or 'drugs' in f.lower() for f in files):
+        received_docs.append('med_list')
+    if any('oncology' in f.lower() or 'notes' in f.lower() or 'report' in f.lower() for f in files):
+        received_docs.append('prior_notes')
+    return received_docs
+
+def keyword_passes(keywords):
+    """legacy_classify generalised to any keyword list"""
+    def classify(files):
+        return [
+            category for category, words in keywords.items()
+            if any(any(word in f.lower() for word in words) for f in files)
+        ]
+    return classify
+
+def bench_classifier(folders):
+    for name, keywords, legacy in (('shipped', DOC_KEYWORDS, legacy_classify),
+                                   ('wide', WIDE_KEYWORDS, keyword_passes(WIDE_KEYWORDS))):
+        classifier = DocumentClassifier(keywords)
+        count = sum(len(words) for words in keywords.values())
+        for label, fn in (('per-keyword passes', legacy), ('compiled classifier', classifier.classify_files)):
+            started = time.perf_counter()
+            for files in folders:
+                fn(files)
+            elapsed = time.perf_counter() - started
+            print(f"  {name} ({count} keywords), {label:<20} {elapsed * 1e6 / len(folders):7.2f} µs/folder")
+        mismatches = sum(legacy(files) != classifier.classify_files(files) for files in folders)
+        print(f"  {name}: mismatches {mismatches}")
+
+def build_library(root, lead_ids, rng):
+    for lead_id in lead_ids:
+        os.makedirs(os.path.join(root, lead_id))
+        for name in rng.sample(FILE_NAMES, rng.randint(0, 6)):
+            open(os.path.join(root, lead_id, name), 'w').close()
+
+def upload_round(root, lead_ids, rng, round_number):
+    for lead_id in rng.sample(lead_ids, max(1, len(lead_ids) // 20)):
+        open(os.path.join(root, lead_id, f'upload_{round_number}_{rng.choice(FILE_NAMES)}'), 'w').close()
+
+def bench_listing(lead_count, latency_ms):
+    rng = random.Random(11)
+    root = tempfile.mkdtemp(prefix='admissions_sharepoint_')
+    lead_ids = [f'lead-{i:06d}' for i in range(lead_count)]
+    build_library(root, lead_ids, rng)
+
+    modes = (('no cache', None), ('cTag check per lead', False), ('delta feed', True))
+    for label, use_delta in modes:
+        source = LocalFolderSource(root, latency_ms)
+        cache = None if use_delta is None else FolderListingCache(source, delta_interval_seconds=3600, use_delta=use_delta)
+        round_rng = random.Random(23)
+        print(f"  {label}:")
+        for round_number in range(3):
+            if round_number:
+                upload_round(root, lead_ids, round_rng, f'{label[:2]}{round_number}')
+            calls_before = sum(source.calls.values())
+            started = time.perf_counter()
+            if use_delta:
+                # One change-feed call per pass over the leads
+                cache.sync(force=True)
+            results = {}
+            for lead_id in lead_ids:
+                files = source.list_folder(lead_id)[0] if cache is None else cache.get(lead_id)[0]
+                results[lead_id] = document_classifier.classify_files(files)
+            elapsed = time.perf_counter() - started
+
+            fresh = LocalFolderSource(root)
+            stale = sum(results[lead_id] != document_classifier.classify_files(fresh.list_folder(lead_id)[0])
+                        for lead_id in lead_ids)
+            calls = sum(source.calls.values()) - calls_before
+            print(f"    round {round_number + 1}: {elapsed:6.2f}s  {lead_count / elapsed:8.0f} leads/s  "
+                  f"{calls:6d} API calls  stale results {stale}")
+
+if __name__ == '__main__':
+    lead_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    rng = random.Random(5)
+    folders = [rng.sample(FILE_NAMES, rng.randint(0, 6)) for _ in range(50000)]
+    print(f"classification, {len(folders):,} folders of 0-6 files:")
+    bench_classifier(folders)
+    print(f"folder checks, {lead_count:,} leads, {latency_ms:g} ms per API call, 5% of folders change per round:")
+    bench_listing(lead_count, latency_ms)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Replay benchmark: lead intake and F1_WebLead triggers with 50% retried requests, idempotency layer off vs on
+
+Usage: python bench_idempotency.py [unique_requests]   (default: 1000)
+
+Each phase sends every request once and retries half of them with the
+same key and body, in shuffled order. It runs against a scratch SQLite
+database through the Flask test client. It reports mean latency and SQL
+statements for first attempts and for retries, plus the rows the
+retries left behind.
+"""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.setdefault('WORKFLOW_WORKERS', '0')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='admissions_bench_'), 'app.db')}")
+
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from src.main import app
+from src.models.lead import db, Lead
+from src.models.workflow_job import WorkflowJob
+from src.services.idempotency_service import idempotency_service
+
+SQL_COUNT = re.compile(r'"(\d+) queries"')
+
+def replay_order(count, rng):
+    """Indexes 0..count-1 once each, plus a retry of every other one placed after its first attempt"""
+    order, pending = [], []
+    for i in range(count):
+        order.append((i, False))
+        if i % 2 == 0:
+            pending.append(i)
+        while pending and rng.random() < 0.5:
+            order.append((pending.pop(rng.randrange(len(pending))), True))
+    order.extend((i, True) for i in pending)
+    return order
+
+def run_phase(client, order, send):
+    stats = {False: [], True: []}
+    statuses = {False: Counter(), True: Counter()}
+    started = time.perf_counter()
+    for i, retry in order:
+        request_started = time.perf_counter()
+        response = send(client, i)
+        elapsed_ms = (time.perf_counter() - request_started) * 1000
+        match = SQL_COUNT.search(response.headers.get('Server-Timing', ''))
+        stats[retry].append((elapsed_ms, int(match.group(1)) if match else 0))
+        statuses[retry][response.status_code] += 1
+    return time.perf_counter() - started, stats, statuses
+
+def report(label, wall, stats, statuses):
+    print(f"  {label:<18} {wall:6.2f}s total")
+    for retry, name in ((False, 'first attempts'), (True, 'retries')):
+        samples = stats[retry]
+        mean_ms = sum(ms for ms, _ in samples) / len(samples)
+        mean_sql = sum(sql for _, sql in samples) / len(samples)
+        print(f"    {name:<15} {len(samples):>6}  {mean_ms:7.3f} ms/req  {mean_sql:5.1f} SQL/req  "
+              f"status {dict(statuses[retry])}")
+
+def run(count, enabled):
+    idempotency_service.enabled = enabled
+    rng = random.Random(7)
+    run_id = uuid.uuid4().hex[:8]
+    client = app.test_client()
+    lead_ids = {}
+
+    def create(client, i):
+        response = client.post('/api/leads', json={
+            'first_name': 'Replay',
+            'last_name': f'Lead{i}',
+            'email': f'replay-{run_id}-{i}@example.com',
+            'phone': f'+1555{run_id}{i:07d}',
+            'idempotency_key': f'intake-{run_id}-{i}'
+        })
+        body = response.get_json(silent=True) or {}
+        lead = body.get('lead') if isinstance(body.get('lead'), dict) else body
+        lead_ids.setdefault(i, lead.get('lead_id'))
+        return response
+
+    def trigger(client, i):
+        return client.post(f'/api/workflows/F1_WebLead/{lead_ids[i]}',
+                           headers={'Idempotency-Key': f'f1-{run_id}-{i}'})
+
+    print(f"idempotency layer {'on' if enabled else 'off'}:")
+    report('lead create', *run_phase(client, replay_order(count, rng), create))
+    report('F1_WebLead trigger', *run_phase(client, replay_order(count, rng), trigger))
+
+    with app.app_context():
+        leads = Lead.query.filter(Lead.email.like(f'replay-{run_id}-%')).count()
+        jobs = WorkflowJob.query.filter(WorkflowJob.lead_id.in_([i for i in lead_ids.values() if i])).count()
+        print(f"    rows written: {leads} leads, {jobs} queued F1_WebLead jobs for {count} unique requests")
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{count:,} unique requests per phase, {count // 2:,} retried:")
+    run(count, enabled=False)
+    run(count, enabled=True)
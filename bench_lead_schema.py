@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Query plans and timings for the Lead queries before and after migrate_lead_schema.py
+
+Usage: python bench_lead_schema.py [row_count]   (default: 100000)
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from synthetic_leads import synthetic_lead_rows
+from migrate_lead_schema import migrate
+
+# Lead table as it was created before the schema upgrade
+LEGACY_DDL = """
+CREATE TABLE lead (
+    lead_id VARCHAR NOT NULL, first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL,
+    email VARCHAR NOT NULL, phone VARCHAR NOT NULL, timezone VARCHAR, relationship VARCHAR,
+    stage VARCHAR NOT NULL, has_consent BOOLEAN, consent_type VARCHAR, consent_version VARCHAR,
+    consent_timestamp VARCHAR, required_docs VARCHAR, received_docs VARCHAR, missing_docs VARCHAR,
+    ehr_patient_id VARCHAR, owner_user_id VARCHAR, last_touch_iso VARCHAR, idempotency_key VARCHAR,
+    PRIMARY KEY (lead_id), UNIQUE (email), UNIQUE (phone), UNIQUE (idempotency_key)
+)
+"""
+
+# (label, SQL) for the query patterns the services issue; :cutoff is a timestamp bound
+QUERIES = [
+    ('stage/consent aggregate', "SELECT stage, COUNT(*), SUM(has_consent = 1) FROM lead GROUP BY stage"),
+    ('reminder selection', "SELECT lead_id FROM lead WHERE stage = 'docs_requested' AND last_touch_iso < :cutoff"),
+    ('owner work queue', "SELECT lead_id FROM lead WHERE owner_user_id = 'coordinator' AND stage = 'inquiry'"),
+    ('retention candidates', "SELECT COUNT(*) FROM lead WHERE last_touch_iso < :cutoff AND stage != 'decision'"),
+    ('consent count', "SELECT COUNT(*) FROM lead WHERE has_consent = 1"),
+]
+
+def legacy_row(record):
+    row = dict(record)
+    for field in ('required_docs', 'received_docs', 'missing_docs'):
+        row[field] = json.dumps(row[field])
+    for field in ('last_touch_iso', 'consent_timestamp'):
+        row[field] = row[field].isoformat() if row[field] else None
+    return row
+
+def build_legacy_db(path, row_count):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_DDL)
+    records = (legacy_row(record) for record in synthetic_lead_rows(row_count))
+    first = legacy_row(next(synthetic_lead_rows(1)))
+    columns = ', '.join(first)
+    params = ', '.join(f':{column}' for column in first)
+    conn.executemany(f"INSERT INTO lead ({columns}) VALUES ({params})", records)
+    conn.commit()
+    conn.close()
+
+def report(path, cutoff):
+    conn = sqlite3.connect(path)
+    for label, sql in QUERIES:
+        params = {'cutoff': cutoff} if ':cutoff' in sql else {}
+        plan = ' | '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+        best = None
+        for _ in range(5):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        print(f"  {label:<24} {best:8.1f} ms   {plan}")
+    conn.close()
+
+if __name__ == '__main__':
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    path = os.path.join(tempfile.mkdtemp(prefix='admissions_schema_'), 'app.db')
+    cutoff = datetime.utcnow() - timedelta(days=180)
+
+    build_legacy_db(path, row_count)
+    print(f"Before (legacy schema, {row_count:,} leads):")
+    # Legacy timestamps are ISO text with a 'T' separator
+    report(path, cutoff.isoformat())
+
+    print(f"Migration: {migrate(path)}")
+
+    print("After (indexed, typed schema):")
+    # SQLAlchemy stores SQLite DATETIME as 'YYYY-MM-DD HH:MM:SS.ffffff'
+    report(path, cutoff.isoformat(sep=' ', timespec='microseconds'))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Document reconciliation benchmark: the bulk job vs check_documents one lead at a time
+
+Usage: python bench_reconcile.py [lead_count] [latency_ms]   (defaults: 5000, 5)
+
+Seeds synthetic leads into a scratch SQLite database. It gives every
+active lead a folder in a scratch LocalFolderSource holding a random
+subset of its documents. latency_ms is slept on every API call. The job
+then runs three times: cold, with nothing changed, and after 5% of the
+folders get an upload. The per-lead baseline runs on a 500-lead sample:
+list the folder, set received_docs/missing_docs through the ORM, advance
+if complete, commit. The last check compares stored documents and the
+KPI counters with the folders and the lead table.
+"""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+scratch = tempfile.mkdtemp(prefix='admissions_reconcile_')
+os.environ['WORKFLOW_WORKERS'] = '0'
+os.environ['OUTBOX_EMAIL_CONCURRENCY'] = '0'
+os.environ['OUTBOX_SMS_CONCURRENCY'] = '0'
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'app.db')}"
+os.environ['SHAREPOINT_BACKEND'] = 'local'
+os.environ['SHAREPOINT_LOCAL_ROOT'] = os.path.join(scratch, 'library')
+os.environ['SHAREPOINT_LOCAL_LATENCY_MS'] = sys.argv[2] if len(sys.argv) > 2 else '5'
+
+import contextlib
+import random
+import time
+from src.main import app
+from src.models.lead import db, Lead, LeadDocument, DOCS_RECEIVED_STAGES, REQUIRED_DOCS
+from synthetic_leads import seed_leads
+from src.services.kpi_service import kpi_service
+from src.services.document_classifier import document_classifier
+from src.services.folder_listing import LocalFolderSource
+from src.services.sharepoint_service import sharepoint_service
+from src.services.document_reconciliation_service import document_reconciliation_service, ACTIVE_STAGES
+
+FILE_FOR = {
+    'imaging': 'CT_chest_{n}.pdf',
+    'pathology': 'Pathology Report {n}.pdf',
+    'labs': 'lab_results_{n}.pdf',
+    'med_list': 'medication list {n}.docx',
+    'prior_notes': 'oncology_consult_notes_{n}.pdf'
+}
+
+def build_folders(lead_ids, rng):
+    root = os.environ['SHAREPOINT_LOCAL_ROOT']
+    for lead_id in lead_ids:
+        os.makedirs(os.path.join(root, lead_id), exist_ok=True)
+        for doc_type in rng.sample(REQUIRED_DOCS, rng.randint(0, len(REQUIRED_DOCS))):
+            open(os.path.join(root, lead_id, FILE_FOR[doc_type].format(n=0)), 'w').close()
+
+def upload_round(lead_ids, rng):
+    root = os.environ['SHAREPOINT_LOCAL_ROOT']
+    for lead_id in rng.sample(lead_ids, len(lead_ids) // 20):
+        doc_type = rng.choice(REQUIRED_DOCS)
+        open(os.path.join(root, lead_id, FILE_FOR[doc_type].format(n=1)), 'w').close()
+
+def report(label, result):
+    print(f"  {label:<26} {result['elapsed_seconds']:7.2f}s  {result['leads_per_second']:8.0f} leads/s  "
+          f"API calls {result['api_calls']:5d} (saved {result['api_calls_saved']:5d})  "
+          f"changed {result['changed_leads']:5d}  unchanged {result['unchanged_leads']:5d}  "
+          f"rows written {result['rows_written']:5d}  advanced {result['advanced_to_docs_received']:4d}")
+
+def per_lead(lead_ids):
+    """check_documents-style loop without the cache: one listing, one ORM update and one commit per lead"""
+    source = sharepoint_service.folder_source
+    calls_before = sum(source.calls.values())
+    started = time.perf_counter()
+    for lead_id in lead_ids:
+        files, _ = source.list_folder(lead_id)
+        received = document_classifier.classify_files(files)
+        lead = db.session.get(Lead, lead_id)
+        lead.received_docs = received
+        lead.missing_docs = [doc for doc in REQUIRED_DOCS if doc not in received]
+        if lead.stage == 'docs_requested' and len(received) == len(REQUIRED_DOCS):
+            lead.stage = 'docs_received'
+        db.session.commit()
+    elapsed = time.perf_counter() - started
+    print(f"  {'per-lead loop (sample)':<26} {elapsed:7.2f}s  {len(lead_ids) / elapsed:8.0f} leads/s  "
+          f"API calls {sum(source.calls.values()) - calls_before:5d} for {len(lead_ids)} leads")
+
+def verify():
+    """Stored receipts vs folders for pre-packet leads, and KPI counters vs the lead table"""
+    mismatched = 0
+    leads = db.session.query(Lead.lead_id, Lead.stage).filter(Lead.stage.in_(ACTIVE_STAGES)).all()
+    stored = {}
+    for lead_id, doc_type in db.session.query(LeadDocument.lead_id, LeadDocument.doc_type).filter(
+        LeadDocument.received_at.isnot(None)
+    ):
+        stored.setdefault(lead_id, set()).add(doc_type)
+    for lead_id, stage in leads:
+        in_folder = set(document_classifier.classify_files(sharepoint_service.folder_source.list_folder(lead_id)[0]))
+        have = stored.get(lead_id, set())
+        if (have != in_folder) if stage not in DOCS_RECEIVED_STAGES else not in_folder <= have:
+            mismatched += 1
+    counters_ok = kpi_service.stored_counts() == kpi_service.count_from_table()
+    print(f"  check: {mismatched} leads out of sync with their folder, KPI counters "
+          f"{'match' if counters_ok else 'DIFFER from'} the lead table")
+
+if __name__ == '__main__':
+    lead_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(3)
+    with app.app_context(), contextlib.redirect_stdout(open(os.devnull, 'w')):
+        seed_leads(lead_count)
+        kpi_service.rebuild()
+        active = [lead_id for lead_id, in db.session.query(Lead.lead_id).filter(Lead.stage.in_(ACTIVE_STAGES))]
+        build_folders(active, rng)
+    # Let the seeding fall outside the change feed's mtime look-back, as an older library would
+    time.sleep(LocalFolderSource.DELTA_OVERLAP_NS / 1e9)
+
+    print(f"{lead_count:,} leads ({len(active):,} active), {os.environ['SHAREPOINT_LOCAL_LATENCY_MS']} ms per API call, "
+          f"concurrency {document_reconciliation_service.concurrency}:")
+    with app.app_context():
+        report('bulk job, cold cache', document_reconciliation_service.reconcile())
+        report('bulk job, nothing changed', document_reconciliation_service.reconcile())
+        upload_round(active, rng)
+        report('bulk job, 5% uploads', document_reconciliation_service.reconcile())
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            sample = rng.sample(active, min(500, len(active)))
+        per_lead(sample)
+        verify()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: 1M record_metric calls and a 24h window summary, list store vs ring store
+
+Usage: python bench_record_metric.py [call_count]   (default: 1000000)
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from src.services.metric_store import MetricStore
+
+class LegacyMetrics:
+    """The original defaultdict(list) store with slice-on-overflow"""
+
+    def __init__(self):
+        self.metrics = defaultdict(list)
+
+    def record_metric(self, metric_name, value, tags=None):
+        self.metrics[metric_name].append({
+            'timestamp': datetime.utcnow().isoformat(),
+            'value': value,
+            'tags': tags or {}
+        })
+        if len(self.metrics[metric_name]) > 1000:
+            self.metrics[metric_name] = self.metrics[metric_name][-1000:]
+
+    def summary(self, metric_name, hours=24):
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        values = [
+            entry['value'] for entry in self.metrics.get(metric_name, [])
+            if datetime.fromisoformat(entry['timestamp']) > cutoff_time
+        ]
+        return {'count': len(values), 'avg': sum(values) / len(values), 'min': min(values), 'max': max(values)}
+
+def bench(label, record, summarize, calls):
+    tags = {'endpoint': '/api/leads', 'status_code': 200}
+
+    start = time.perf_counter()
+    for i in range(calls):
+        record('api_response_time_ms', i % 500, tags)
+    record_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        summarize()
+    summary_us = (time.perf_counter() - start) * 1000
+
+    print(f"  {label:<8} record: {record_seconds:6.2f}s ({calls / record_seconds:>10,.0f} calls/s)   "
+          f"24h summary: {summary_us:8.1f} us/call")
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"{calls:,} record_metric calls, 1000-entry retention:")
+
+    legacy = LegacyMetrics()
+    bench('list', legacy.record_metric, lambda: legacy.summary('api_response_time_ms'), calls)
+
+    store = MetricStore(capacity=1000)
+    cutoff = lambda: time.time() - 24 * 3600
+    bench('ring', store.record, lambda: store.series('api_response_time_ms').summary(since=cutoff()), calls)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Delivery benchmark: one SMTP connection per message vs the pooled SMTPTransport vs the file sink
+
+Usage: python bench_smtp.py [message_count] [handshake_ms]   (defaults: 500, 50)
+
+The SMTP phases run against a local aiosmtpd server (pip install aiosmtpd)
+that counts what it receives. handshake_ms is added to every EHLO to
+stand in for the TCP, TLS and AUTH round trips of a real provider. Every
+20th message is refused once with a 451 so the retry path runs too. The
+rate limit is disabled so the numbers show connection cost only. Without
+aiosmtpd only the file sink phase runs.
+"""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ['SMTP_RATE_PER_SECOND'] = '0'
+os.environ['SMTP_RETRY_BACKOFF_SECONDS'] = '0.01'
+os.environ['SMTP_STARTTLS'] = 'false'
+
+import asyncio
+import smtplib
+import socket
+import threading
+import time
+from collections import Counter
+from src.services.email_delivery import FileSinkTransport, SMTPTransport, build_message
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+SENDER = 'admissions@example.com'
+
+class CountingHandler:
+    """Accepts everything except the first attempt at every 20th recipient; counts deliveries"""
+
+    def __init__(self, handshake_seconds):
+        self.handshake_seconds = handshake_seconds
+        self.received = Counter()
+        self.refused = set()
+        self.lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.handshake_seconds)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            for rcpt in envelope.rcpt_tos:
+                index = int(rcpt.split('@')[0][4:])
+                if index % 20 == 0 and rcpt not in self.refused:
+                    self.refused.add(rcpt)
+                    return '451 4.3.0 Try again later'
+            for rcpt in envelope.rcpt_tos:
+                self.received[rcpt] += 1
+        return '250 OK'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def messages(count):
+    return [
+        (f'lead{i}@example.com', 'Reminder: Medical Records Needed for Your Consultation',
+         f'Hello First{i},\n\nWe are still waiting for your medical records.\n')
+        for i in range(count)
+    ]
+
+def connect_per_message(host, port, batch):
+    """What a plain smtplib loop does: connect, EHLO, send, QUIT for every message, retrying a 4xx once"""
+    errors = []
+    for to_email, subject, body in batch:
+        for attempt in range(2):
+            try:
+                with smtplib.SMTP(host, port, timeout=30) as conn:
+                    conn.ehlo()
+                    conn.send_message(build_message(SENDER, to_email, subject, body))
+                errors.append(None)
+                break
+            except smtplib.SMTPResponseException as e:
+                if attempt:
+                    errors.append(f'SMTP {e.smtp_code}')
+    return errors
+
+def report(label, count, elapsed, errors, extra=''):
+    failed = sum(1 for error in errors if error)
+    print(f"  {label:<28} {elapsed:7.2f}s  {count / elapsed:8.1f} msg/s  failed {failed}  {extra}")
+
+def run_smtp(count, handshake_seconds):
+    batch = messages(count)
+    for label, pool_size in (('connect per message', None), ('pooled, 1 connection', 1), ('pooled, 4 connections', 4)):
+        handler = CountingHandler(handshake_seconds)
+        host, port = '127.0.0.1', free_port()
+        controller = Controller(handler, hostname=host, port=port)
+        controller.start()
+        try:
+            started = time.perf_counter()
+            if pool_size is None:
+                errors = connect_per_message(host, port, batch)
+                extra = f'connections {count + len(handler.refused)}'
+            else:
+                os.environ['SMTP_POOL_SIZE'] = str(pool_size)
+                transport = SMTPTransport(SENDER, host, port)
+                errors = transport.send_many(batch)
+                transport.close()
+                extra = (f"connections {transport.stats['connections_opened']}  "
+                         f"retries {transport.stats['retries']}")
+            elapsed = time.perf_counter() - started
+        finally:
+            controller.stop()
+
+        delivered = sum(handler.received.values())
+        duplicates = sum(n - 1 for n in handler.received.values() if n > 1)
+        report(label, count, elapsed, errors, f'{extra}  received {delivered} (duplicates {duplicates})')
+
+def run_file_sink(count):
+    directory = tempfile.mkdtemp(prefix='admissions_mail_sink_')
+    transport = FileSinkTransport(SENDER, directory)
+    started = time.perf_counter()
+    errors = transport.send_many(messages(count))
+    elapsed = time.perf_counter() - started
+    report('file sink', count, elapsed, errors, f'{len(os.listdir(directory))} .eml files in {directory}')
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    handshake_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"{count:,} messages, {handshake_ms:g} ms handshake:")
+    if Controller is None:
+        print("  aiosmtpd is not installed; skipping the SMTP phases")
+    else:
+        run_smtp(count, handshake_ms / 1000)
+    run_file_sink(count)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: rendering reminder e-mails, per-key str.replace + MIMEMultipart vs compiled templates
+
+Usage: python bench_templates.py [message_count]   (default: 10000)
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from src.services.notification_service import notification_service, EMAIL_TEMPLATES
+
+def reminder_rows(count):
+    return [
+        {
+            'first_name': f'First{i}',
+            'last_name': f'Last{i}',
+            'email': f'lead{i}@example.com',
+            'phone': f'555-{i:08d}',
+            'missing_docs': '- Pathology reports\n- Laboratory results',
+            'upload_link': f'https://example.sharepoint.com/upload/{i}'
+        }
+        for i in range(count)
+    ]
+
+def legacy_replace(rows):
+    """Substitution only: one str.replace over the whole body per variable"""
+    spec = EMAIL_TEMPLATES['document_reminder']
+    messages = []
+    for values in rows:
+        body = spec['body']
+        for key, value in values.items():
+            body = body.replace(f'{{{key}}}', str(value))
+        messages.append((spec['subject'], body))
+    return messages
+
+def legacy_render(rows):
+    """The original send_email path: one str.replace per variable, then a MIMEMultipart per message"""
+    spec = EMAIL_TEMPLATES['document_reminder']
+    messages = []
+    for values in rows:
+        body = spec['body']
+        for key, value in values.items():
+            body = body.replace(f'{{{key}}}', str(value))
+        msg = MIMEMultipart()
+        msg['From'] = notification_service.smtp_username
+        msg['To'] = values['email']
+        msg['Subject'] = spec['subject']
+        msg.attach(MIMEText(body, 'plain'))
+        messages.append((spec['subject'], body))
+    return messages
+
+def compiled_render(rows):
+    return notification_service.render_batch('document_reminder', rows)
+
+def best_of(fn, rows, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows = reminder_rows(count)
+
+    legacy_seconds, legacy = best_of(legacy_render, rows)
+    replace_seconds, _ = best_of(legacy_replace, rows)
+    compiled_seconds, compiled = best_of(compiled_render, rows)
+    assert legacy == compiled, 'compiled output differs from str.replace output'
+
+    print(f"{count:,} document_reminder messages:")
+    for label, seconds in (
+        ('str.replace + MIME', legacy_seconds),
+        ('str.replace only', replace_seconds),
+        ('compiled batch', compiled_seconds)
+    ):
+        print(f"  {label:<20} {seconds * 1000:8.1f} ms  ({count / seconds:>10,.0f} msg/s, {seconds / count * 1e6:6.2f} us/msg)")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Benchmark /api/workflows/metrics: per-stage count queries vs one grouped aggregate
+
+Usage: python bench_workflow_metrics.py [row_count ...]   (default: 100000 1000000)
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import time
+from src.models.lead import db, Lead, LEAD_STAGES, DOCS_RECEIVED_STAGES
+from src.services.metrics_service import metrics_service
+from synthetic_leads import make_app, seed_leads
+
+def legacy_metrics():
+    """The original eleven-query implementation"""
+    total_leads = Lead.query.count()
+    stages = {stage: Lead.query.filter_by(stage=stage).count() for stage in LEAD_STAGES}
+    consented_leads = Lead.query.filter_by(has_consent=True).count()
+    leads_with_docs = Lead.query.filter(Lead.stage.in_(DOCS_RECEIVED_STAGES)).count()
+    scheduled_leads = Lead.query.filter_by(stage='scheduled').count()
+    return total_leads, stages, consented_leads, leads_with_docs, scheduled_leads
+
+def time_it(fn, repeat=5):
+    """Return the best wall time in milliseconds over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(row_count):
+    app = make_app()
+    with app.app_context():
+        start = time.perf_counter()
+        seed_leads(row_count)
+        print(f"Seeded {row_count:,} leads in {time.perf_counter() - start:.1f}s")
+
+        legacy = legacy_metrics()
+        engine = metrics_service.get_workflow_metrics()
+        assert legacy[0] == engine['total_leads']
+        assert legacy[1] == engine['stage_distribution']
+
+        legacy_ms = time_it(legacy_metrics)
+        engine_ms = time_it(metrics_service.get_workflow_metrics)
+
+        print(f"  legacy (11 queries):   {legacy_ms:9.1f} ms")
+        print(f"  grouped (1 query):     {engine_ms:9.1f} ms")
+        print(f"  speedup:               {legacy_ms / engine_ms:9.1f}x")
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    for size in sizes:
+        run(size)
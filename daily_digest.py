@@ -0,0 +1,34 @@
+import json
+from datetime import datetime
+from src.models.lead import db
+
+class DailyDigest(db.Model):
+    """Materialised operational digest for one UTC day; rows are kept as history"""
+    __tablename__ = 'daily_digest'
+
+    date = db.Column(db.Date, primary_key=True)
+    total_leads = db.Column(db.Integer, nullable=False, default=0)
+    new_leads = db.Column(db.Integer, nullable=False, default=0)
+    lead_counts = db.Column(db.Text, nullable=False, default='{}')         # JSON {stage: count}
+    stage_transitions = db.Column(db.Text, nullable=False, default='{}')   # JSON {"from->to": count}
+    recent_activity = db.Column(db.Text, nullable=False, default='{}')     # JSON {event_type: count}
+    kpis = db.Column(db.Text, nullable=False, default='{}')
+    active_alerts = db.Column(db.Integer, nullable=False, default=0)
+    system_health = db.Column(db.String, nullable=False, default='healthy')
+    computed_at = db.Column(db.DateTime)     # last full materialisation
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat(),
+            'lead_counts': json.loads(self.lead_counts),
+            'total_leads': self.total_leads,
+            'new_leads': self.new_leads,
+            'stage_transitions': json.loads(self.stage_transitions),
+            'recent_activity': json.loads(self.recent_activity),
+            'active_alerts': self.active_alerts,
+            'kpis': json.loads(self.kpis),
+            'system_health': self.system_health,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None,
+            'updated_at': self.updated_at.isoformat()
+        }
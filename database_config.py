@@ -0,0 +1,60 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+
+def conflict_insert(dialect_name, table):
+    """INSERT for `table` supporting on_conflict_do_nothing/do_update (SQLite and PostgreSQL), or None elsewhere"""
+    if dialect_name == 'sqlite':
+        return sqlite.insert(table)
+    if dialect_name == 'postgresql':
+        return postgresql.insert(table)
+    return None
+
+def configure_database(app, sqlite_path):
+    """Point the app at DATABASE_URL (pooled) or the local SQLite file (WAL-tuned)
+
+    Postgres and other server databases take pool settings from
+    DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_RECYCLE_SECONDS. Connections
+    are checked with pre-ping before reuse. SQLite keeps a small pool of
+    reused connections. Each connection is switched to WAL with
+    synchronous=NORMAL, so readers never block the writer, and gets a busy
+    timeout, so concurrent writers queue instead of failing with
+    "database is locked".
+    """
+    database_url = os.getenv('DATABASE_URL')
+
+    if database_url:
+        # Heroku-style URLs use the scheme SQLAlchemy dropped in 1.4
+        if database_url.startswith('postgres://'):
+            database_url = 'postgresql://' + database_url[len('postgres://'):]
+
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE_SECONDS', '1800')),
+            'pool_pre_ping': True
+        }
+    else:
+        os.makedirs(os.path.dirname(sqlite_path), exist_ok=True)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{sqlite_path}"
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            'connect_args': {'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')) / 1000}
+        }
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning; a no-op for other databases"""
+    if type(dbapi_connection).__module__.split('.')[0] not in ('sqlite3', 'pysqlite2'):
+        return
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.close()
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from src.models.lead import db, Lead
+from src.models.daily_digest import DailyDigest
+from src.services.observability_service import observability_service
+from src.services.database_config import conflict_insert
+
+class DigestService:
+    """Daily digests materialised into daily_digest, one row per UTC day
+
+    A scheduled job recomputes today's row every DIGEST_REFRESH_SECONDS.
+    Between runs, each Lead flush adjusts the row in the same transaction
+    with new leads, stage transitions and per-stage counts. Bulk Core
+    writes bypass that, and the next scheduled run corrects for them.
+    Past rows are never rewritten.
+    """
+
+    def __init__(self):
+        self.refresh_seconds = float(os.getenv('DIGEST_REFRESH_SECONDS', '300'))
+        self._thread = None
+        self._stopping = threading.Event()
+        event.listen(Session, 'after_flush', self._after_flush)
+
+    @staticmethod
+    def today():
+        return datetime.utcnow().date()
+
+    def _stage_history(self, obj):
+        history = get_history(obj, 'stage')
+        old = (history.deleted or history.unchanged or [None])[0]
+        new = (history.added or history.unchanged or [None])[0]
+        return old, new
+
+    def _after_flush(self, session, flush_context):
+        """Fold stage changes from this flush into today's digest row"""
+        stage_deltas = Counter()
+        transitions = Counter()
+        new_leads = 0
+
+        for obj in session.new:
+            if isinstance(obj, Lead):
+                stage_deltas[obj.stage] += 1
+                new_leads += 1
+
+        for obj in session.deleted:
+            if isinstance(obj, Lead):
+                stage_deltas[self._stage_history(obj)[0]] -= 1
+
+        for obj in session.dirty:
+            if isinstance(obj, Lead) and obj not in session.deleted:
+                old, new = self._stage_history(obj)
+                if old != new:
+                    stage_deltas[old] -= 1
+                    stage_deltas[new] += 1
+                    transitions[f'{old}->{new}'] += 1
+
+        if new_leads or transitions or any(stage_deltas.values()):
+            self.apply_events(session.connection(), stage_deltas, transitions, new_leads)
+
+    def _seed_day(self, connection, values):
+        """Insert the day's first row unless another transaction already has; returns True if this one did"""
+        table = DailyDigest.__table__
+        insert = conflict_insert(connection.dialect.name, table)
+        if insert is not None:
+            return connection.execute(
+                insert.values(**values).on_conflict_do_nothing(index_elements=['date'])
+            ).rowcount == 1
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(**values))
+            return True
+        except IntegrityError:
+            return False
+
+    def apply_events(self, connection, stage_deltas, transitions, new_leads=0):
+        """Adjust today's digest row on the given connection, seeding the row if the day has none yet"""
+        table = DailyDigest.__table__
+        today = self.today()
+        now = datetime.utcnow()
+
+        select_today = table.select().where(table.c.date == today).with_for_update()
+        row = connection.execute(select_today).first()
+
+        if row is None:
+            # First write of the day: counts come straight from the (already flushed) lead table
+            lead_counts = dict(connection.execute(
+                db.select(Lead.stage, func.count()).group_by(Lead.stage)
+            ).all())
+            if self._seed_day(connection, {
+                'date': today,
+                'total_leads': sum(lead_counts.values()),
+                'new_leads': new_leads,
+                'lead_counts': json.dumps(lead_counts),
+                'stage_transitions': json.dumps(dict(transitions)),
+                'recent_activity': '{}',
+                'kpis': '{}',
+                'active_alerts': 0,
+                'system_health': 'healthy',
+                'updated_at': now
+            }):
+                return
+            # Another transaction seeded the day first, from counts without this one's changes
+            row = connection.execute(select_today).first()
+
+        lead_counts = Counter(json.loads(row.lead_counts))
+        lead_counts.update(stage_deltas)
+        stored_transitions = Counter(json.loads(row.stage_transitions))
+        stored_transitions.update(transitions)
+
+        connection.execute(table.update().where(table.c.date == today).values(
+            total_leads=row.total_leads + sum(stage_deltas.values()),
+            new_leads=row.new_leads + new_leads,
+            lead_counts=json.dumps({stage: count for stage, count in lead_counts.items() if count}),
+            stage_transitions=json.dumps(dict(stored_transitions)),
+            updated_at=now
+        ))
+
+    def materialize(self):
+        """Recompute today's digest from counters, logs and alerts and store it"""
+        digest = observability_service.get_daily_digest()
+        if not digest:
+            return None
+
+        today = self.today()
+        now = datetime.utcnow()
+        table = DailyDigest.__table__
+        computed = {
+            'total_leads': digest['total_leads'],
+            'lead_counts': json.dumps(digest['lead_counts']),
+            'recent_activity': json.dumps(digest['recent_activity']),
+            'kpis': json.dumps(digest['kpis']),
+            'active_alerts': digest['active_alerts'],
+            'system_health': digest['system_health'],
+            'computed_at': now,
+            'updated_at': now
+        }
+        # Every worker's refresh and a first request can materialise at once; the day's row is upserted.
+        # new_leads and stage_transitions only come from lead writes, so an existing row keeps them
+        seed = {'date': today, 'new_leads': 0, 'stage_transitions': '{}', **computed}
+        connection = db.session.connection()
+        insert = conflict_insert(connection.dialect.name, table)
+        if insert is not None:
+            connection.execute(insert.values(**seed).on_conflict_do_update(index_elements=['date'], set_=computed))
+        elif not self._seed_day(connection, seed):
+            connection.execute(table.update().where(table.c.date == today).values(**computed))
+        db.session.commit()
+        return db.session.get(DailyDigest, today, populate_existing=True)
+
+    def get_digest(self, day=None):
+        """Stored digest for a day; today's is materialised on first request if the job has not run yet"""
+        day = day or self.today()
+        row = db.session.get(DailyDigest, day)
+        if (row is None or row.computed_at is None) and day == self.today():
+            row = self.materialize()
+        return row.to_dict() if row else None
+
+    def get_range(self, start, end):
+        """Stored digests between two dates (inclusive), oldest first"""
+        rows = DailyDigest.query.filter(
+            DailyDigest.date >= start,
+            DailyDigest.date <= end
+        ).order_by(DailyDigest.date).all()
+        return [row.to_dict() for row in rows]
+
+    def _refresh_loop(self, app):
+        while not self._stopping.is_set():
+            try:
+                with app.app_context():
+                    self.materialize()
+            except Exception as e:
+                print(f"Digest refresh error: {e}")
+            self._stopping.wait(self.refresh_seconds)
+
+    def start(self, app):
+        """Start the scheduled materialisation thread"""
+        if self._thread is not None:
+            return self._thread
+
+        self._thread = threading.Thread(target=self._refresh_loop, args=(app,), name='digest-refresh', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._stopping.clear()
+
+# Global instance
+digest_service = DigestService()
@@ -0,0 +1,72 @@
+import json
+import os
+import re
+
+# Filename keywords per document category, matched case-insensitively anywhere in the name
+DOC_KEYWORDS = {
+    'imaging': ('imaging', 'scan', 'mri', 'ct'),
+    'labs': ('lab',),
+    'pathology': ('pathology', 'biopsy'),
+    'med_list': ('medication', 'med_list', 'drugs'),
+    'prior_notes': ('oncology', 'notes', 'report')
+}
+
+class DocumentClassifier:
+    """Maps uploaded filenames to document categories with one compiled regex
+
+    Every keyword of every category goes into a single alternation. A
+    folder's filenames are joined and lowercased once, then searched in
+    one pass. Each search restarts one character after the previous
+    match, so overlapping keywords are all seen. A folder therefore gets
+    the same categories as a substring test per keyword and file would
+    give it. The cost grows with the text length and the number of
+    matches, not with the number of keywords. The scan stops once every
+    category has been seen.
+    """
+
+    def __init__(self, keywords=DOC_KEYWORDS):
+        self.categories = tuple(keywords)
+        pairs = [(word.lower(), category) for category, words in keywords.items() for word in words]
+
+        # The alternation reports one keyword per position (longest first), so a match also
+        # stands for every shorter keyword it starts with
+        self.categories_for = {
+            word: frozenset(category for prefix, category in pairs if word.startswith(prefix))
+            for word, _ in pairs
+        }
+        self.pattern = re.compile('|'.join(re.escape(word) for word in sorted(self.categories_for, key=len, reverse=True)))
+
+    def _scan(self, text):
+        found = set()
+        search = self.pattern.search
+        categories_for = self.categories_for
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return found
+            found |= categories_for[match.group()]
+            if len(found) == len(self.categories):
+                return found
+            position = match.start() + 1
+
+    def classify(self, filename):
+        """Categories one filename belongs to, as a set"""
+        return self._scan(filename.lower())
+
+    def classify_files(self, filenames):
+        """Categories present across a folder, in DOC_KEYWORDS order"""
+        # Newlines never occur in keywords, so no match spans two filenames
+        found = self._scan('\n'.join(filenames).lower())
+        return [category for category in self.categories if category in found]
+
+def _configured_keywords():
+    """DOC_KEYWORDS, or the {category: [keyword, ...]} mapping in the JSON file named by DOC_KEYWORDS_FILE"""
+    path = os.getenv('DOC_KEYWORDS_FILE')
+    if not path:
+        return DOC_KEYWORDS
+    with open(path) as f:
+        return {category: tuple(words) for category, words in json.load(f).items()}
+
+# Global instance
+document_classifier = DocumentClassifier(_configured_keywords())
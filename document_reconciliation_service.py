@@ -0,0 +1,248 @@
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import bindparam
+from src.models.lead import db, Lead, LeadDocument, LEAD_STAGES, DOCS_RECEIVED_STAGES, REQUIRED_DOCS
+from src.models.workflow_step import WorkflowStep
+from src.services.kpi_service import kpi_service
+from src.services.digest_service import digest_service
+from src.services.sharepoint_service import sharepoint_service
+
+# Decided leads no longer collect documents
+ACTIVE_STAGES = tuple(stage for stage in LEAD_STAGES if stage != 'decision')
+
+class DocumentReconciliationService:
+    """Brings lead_document in line with the SharePoint folders of every active lead
+
+    Leads are read in lead_id keyset pages of RECONCILE_BATCH_SIZE. For
+    each page, folder contents are fetched RECONCILE_CONCURRENCY at a time
+    through the SharePoint listing cache. The change feed is synced once
+    per run, so only changed folders are listed again. The stored document
+    state for the page comes from one query and is diffed against the
+    folders. Only changed rows are written, as executemany updates and
+    inserts in one transaction per page.
+
+    Before a lead's packet is complete, the folder is authoritative both
+    ways, as with Lead.received_docs. After that, receipts are only ever
+    added. A docs_requested lead whose required documents are all in moves
+    to docs_received. The KPI counters, today's digest and the workflow
+    history are updated in the same transaction, because Core writes
+    bypass the ORM flush listeners. A folder that cannot be read leaves
+    its lead untouched.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv('RECONCILE_BATCH_SIZE', '500'))
+        self.concurrency = int(os.getenv('RECONCILE_CONCURRENCY', '8'))
+
+    def _folder_status(self, lead_id):
+        try:
+            return sharepoint_service.document_status(lead_id)
+        except Exception as e:
+            return {'error': str(e)}
+
+    def _load_page(self, after, limit):
+        table = Lead.__table__
+        query = (
+            db.select(table.c.lead_id, table.c.stage, table.c.has_consent, table.c.last_touch_iso)
+            .where(table.c.stage.in_(ACTIVE_STAGES))
+            .order_by(table.c.lead_id)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(table.c.lead_id > after)
+        return db.session.execute(query).all()
+
+    def _load_documents(self, lead_ids):
+        """{lead_id: {doc_type: (required, received)}} for one page in a single query"""
+        documents = LeadDocument.__table__
+        stored = defaultdict(dict)
+        for lead_id, doc_type, required, received_at in db.session.execute(
+            db.select(documents.c.lead_id, documents.c.doc_type, documents.c.required, documents.c.received_at)
+            .where(documents.c.lead_id.in_(lead_ids))
+        ):
+            stored[lead_id][doc_type] = (required, received_at is not None)
+        return stored
+
+    def diff(self, lead, stored, folder_received):
+        """(updates, inserts, complete) to make one lead's stored documents match its folder"""
+        updates = []
+        inserts = []
+        authoritative = lead.stage not in DOCS_RECEIVED_STAGES
+
+        for doc_type, (_, received) in stored.items():
+            in_folder = doc_type in folder_received
+            if in_folder and not received:
+                updates.append((doc_type, True))
+            elif received and not in_folder and authoritative:
+                updates.append((doc_type, False))
+        for doc_type in folder_received:
+            if doc_type not in stored:
+                inserts.append(doc_type)
+
+        received_after = {doc_type for doc_type, (_, received) in stored.items() if received}
+        received_after |= {doc_type for doc_type, received in updates if received}
+        received_after -= {doc_type for doc_type, received in updates if not received}
+        received_after |= set(inserts)
+        # Leads created without a document checklist need the full packet, as check_documents did
+        required = {doc_type for doc_type, (is_required, _) in stored.items() if is_required} or set(REQUIRED_DOCS)
+        complete = required <= received_after
+        return updates, inserts, complete
+
+    def _write_page(self, page, changes, advance, now):
+        """Apply one page's document changes and stage advances in one transaction; returns the advanced lead ids"""
+        documents = LeadDocument.__table__
+        leads = Lead.__table__
+        connection = db.session.connection()
+
+        updates = [
+            {'b_lead_id': lead_id, 'b_doc_type': doc_type, 'b_received_at': now if received else None}
+            for lead_id, (lead_updates, _) in changes.items()
+            for doc_type, received in lead_updates
+        ]
+        inserts = [
+            {'lead_id': lead_id, 'doc_type': doc_type, 'required': doc_type in REQUIRED_DOCS, 'received_at': now}
+            for lead_id, (_, lead_inserts) in changes.items()
+            for doc_type in lead_inserts
+        ]
+        if updates:
+            connection.execute(
+                documents.update()
+                .where((documents.c.lead_id == bindparam('b_lead_id')) & (documents.c.doc_type == bindparam('b_doc_type')))
+                .values(received_at=bindparam('b_received_at')),
+                updates
+            )
+        if inserts:
+            connection.execute(documents.insert(), inserts)
+
+        advanced = []
+        if advance:
+            advanced = connection.execute(
+                leads.update()
+                .where(leads.c.lead_id.in_(advance) & (leads.c.stage == 'docs_requested'))
+                .values(stage='docs_received', last_touch_iso=now)
+                .returning(leads.c.lead_id)
+            ).scalars().all()
+
+        if advanced:
+            by_id = {lead.lead_id: lead for lead in page}
+            kpi_deltas = Counter()
+            for lead_id in advanced:
+                lead = by_id[lead_id]
+                kpi_deltas[kpi_service.bucket_for(lead.stage, lead.has_consent, lead.last_touch_iso)] -= 1
+                kpi_deltas[kpi_service.bucket_for('docs_received', lead.has_consent, now)] += 1
+            kpi_service.apply_deltas(connection, kpi_deltas)
+            digest_service.apply_events(
+                connection,
+                Counter({'docs_requested': -len(advanced), 'docs_received': len(advanced)}),
+                Counter({'docs_requested->docs_received': len(advanced)})
+            )
+            connection.execute(WorkflowStep.__table__.insert(), [
+                {
+                    'lead_id': lead_id,
+                    'workflow_type': 'DocumentReconciliation',
+                    'step': 'stage_updated',
+                    'status': 'completed',
+                    'details': 'All required documents received; lead stage updated to docs_received',
+                    'created_at': now
+                }
+                for lead_id in advanced
+            ])
+
+        db.session.commit()
+        return advanced
+
+    def reconcile(self, dry_run=False, batch_size=None, max_leads=None):
+        """Reconcile every active lead; returns counts, API call savings and throughput"""
+        batch_size = batch_size or self.batch_size
+        timings = defaultdict(float)
+        source = sharepoint_service.folder_source
+        calls_before = sum(source.calls.values())
+        started = time.perf_counter()
+        report = Counter()
+
+        stage_start = time.perf_counter()
+        sharepoint_service.listing_cache.sync(force=True)
+        timings['sync'] += time.perf_counter() - stage_start
+
+        after = None
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while max_leads is None or report['scanned'] < max_leads:
+                limit = batch_size if max_leads is None else min(batch_size, max_leads - report['scanned'])
+                stage_start = time.perf_counter()
+                page = self._load_page(after, limit)
+                if not page:
+                    db.session.rollback()
+                    break
+                after = page[-1].lead_id
+                lead_ids = [lead.lead_id for lead in page]
+                stored = self._load_documents(lead_ids)
+                timings['load'] += time.perf_counter() - stage_start
+
+                stage_start = time.perf_counter()
+                statuses = list(pool.map(self._folder_status, lead_ids))
+                timings['fetch'] += time.perf_counter() - stage_start
+
+                stage_start = time.perf_counter()
+                changes = {}
+                advance = []
+                for lead, status in zip(page, statuses):
+                    if 'error' in status:
+                        report['folder_errors'] += 1
+                        continue
+                    if not status['listed']:
+                        report['listings_from_cache'] += 1
+                    updates, inserts, complete = self.diff(lead, stored.get(lead.lead_id, {}), set(status['received']))
+                    if updates or inserts:
+                        changes[lead.lead_id] = (updates, inserts)
+                        report['documents_marked_received'] += sum(1 for _, received in updates if received) + len(inserts)
+                        report['documents_cleared'] += sum(1 for _, received in updates if not received)
+                        report['rows_written'] += len(updates) + len(inserts)
+                    else:
+                        report['unchanged_leads'] += 1
+                    if complete and lead.stage == 'docs_requested':
+                        advance.append(lead.lead_id)
+                report['scanned'] += len(page)
+                report['changed_leads'] += len(changes)
+                timings['diff'] += time.perf_counter() - stage_start
+
+                stage_start = time.perf_counter()
+                if dry_run:
+                    db.session.rollback()
+                    report['advanced_to_docs_received'] += len(advance)
+                elif changes or advance:
+                    report['advanced_to_docs_received'] += len(self._write_page(page, changes, advance, datetime.utcnow()))
+                    report['batches_written'] += 1
+                else:
+                    db.session.rollback()
+                timings['write'] += time.perf_counter() - stage_start
+
+        elapsed = time.perf_counter() - started
+        api_calls = sum(source.calls.values()) - calls_before
+
+        return {
+            'status': 'completed',
+            'dry_run': dry_run,
+            'source': source.name,
+            'leads_scanned': report['scanned'],
+            'changed_leads': report['changed_leads'],
+            'unchanged_leads': report['unchanged_leads'],
+            'documents_marked_received': report['documents_marked_received'],
+            'documents_cleared': report['documents_cleared'],
+            'rows_written': report['rows_written'],
+            'advanced_to_docs_received': report['advanced_to_docs_received'],
+            'folder_errors': report['folder_errors'],
+            'api_calls': api_calls,
+            # Each cached listing is a list call the change feed made unnecessary
+            'api_calls_saved': report['listings_from_cache'],
+            'batches_written': report['batches_written'],
+            'elapsed_seconds': round(elapsed, 3),
+            'leads_per_second': round(report['scanned'] / elapsed, 1) if elapsed > 0 else 0,
+            'stage_timings_ms': {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+# Global instance
+document_reconciliation_service = DocumentReconciliationService()
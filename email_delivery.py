@@ -0,0 +1,278 @@
+import os
+import random
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from queue import LifoQueue, Empty
+
+def build_message(sender, to_email, subject, body):
+    """Single-part text/plain message"""
+    msg = MIMEText(body, 'plain', 'utf-8')
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    return msg
+
+class RateLimiter:
+    """Token bucket shared by every connection to one provider; rate <= 0 disables it
+
+    Each caller reserves a token, so the bucket can go negative. The
+    caller then sleeps, outside the lock, until its token would have
+    accrued. Concurrent senders are spaced evenly instead of bursting.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class _Session:
+    __slots__ = ('conn', 'sent', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+class ConsoleTransport:
+    """Prints each message, as the service did before real delivery existed"""
+    name = 'console'
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.stats = Counter()
+
+    def send_many(self, messages):
+        for to_email, subject, body in messages:
+            print(f"EMAIL SENT TO: {to_email}")
+            print(f"SUBJECT: {subject}")
+            print(f"BODY: {body}")
+            print("---")
+        self.stats['sent'] += len(messages)
+        return [None] * len(messages)
+
+    def close(self):
+        pass
+
+class FileSinkTransport:
+    """Local sink: one RFC 822 .eml file per message in EMAIL_SINK_DIR, for offline runs and throughput tests"""
+    name = 'file'
+
+    def __init__(self, sender, directory):
+        self.sender = sender
+        self.directory = directory
+        self.stats = Counter()
+        os.makedirs(directory, exist_ok=True)
+
+    def send_many(self, messages):
+        results = []
+        for to_email, subject, body in messages:
+            path = os.path.join(self.directory, f'{time.time_ns()}-{uuid.uuid4().hex[:8]}.eml')
+            try:
+                with open(path, 'wb') as f:
+                    f.write(build_message(self.sender, to_email, subject, body).as_bytes())
+                results.append(None)
+                self.stats['sent'] += 1
+            except OSError as e:
+                results.append(f'Sink write failed: {e}')
+                self.stats['failed'] += 1
+        return results
+
+    def close(self):
+        pass
+
+class SMTPTransport:
+    """Pooled, authenticated SMTP sessions shared by all senders
+
+    Up to SMTP_POOL_SIZE sessions stay open. Each does its connect,
+    STARTTLS and login once, then sends up to
+    SMTP_MAX_MESSAGES_PER_CONNECTION messages before it is recycled. A
+    batch is split into per-session runs that go out concurrently. Every
+    message takes a token from the provider's rate limiter first.
+    Transient failures are retried with exponential backoff and jitter:
+    4xx replies, dropped connections and timeouts. A 5xx fails the
+    message at once.
+    """
+    name = 'smtp'
+
+    def __init__(self, sender, host, port, username=None, password=None):
+        self.sender = sender
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = os.getenv('SMTP_SSL', 'true' if port == 465 else 'false').lower() == 'true'
+        self.starttls = os.getenv('SMTP_STARTTLS', 'true').lower() == 'true'
+        self.timeout = float(os.getenv('SMTP_TIMEOUT_SECONDS', '30'))
+        self.pool_size = int(os.getenv('SMTP_POOL_SIZE', '4'))
+        self.max_messages_per_connection = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+        self.max_idle_seconds = float(os.getenv('SMTP_MAX_IDLE_SECONDS', '60'))
+        self.max_retries = int(os.getenv('SMTP_MAX_RETRIES', '3'))
+        self.backoff_seconds = float(os.getenv('SMTP_RETRY_BACKOFF_SECONDS', '0.5'))
+        # Default matches a new Amazon SES account's sending quota
+        self.limiter = RateLimiter(float(os.getenv('SMTP_RATE_PER_SECOND', '14')))
+
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._stats_lock = threading.Lock()
+        self.stats = Counter()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # Pool
+
+    def _connect(self):
+        if self.use_ssl:
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.ehlo()
+            if self.starttls and not self.use_ssl and conn.has_extn('starttls'):
+                conn.starttls(context=ssl.create_default_context())
+                conn.ehlo()
+            if self.username:
+                conn.login(self.username, self.password)
+        except Exception:
+            conn.close()
+            raise
+        self._count('connections_opened')
+        return _Session(conn)
+
+    def _close(self, session):
+        try:
+            session.conn.quit()
+        except Exception:
+            session.conn.close()
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    session = self._idle.get_nowait()
+                except Empty:
+                    return self._connect()
+                if time.monotonic() - session.last_used < self.max_idle_seconds:
+                    return session
+                self._close(session)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, session, healthy=True):
+        if healthy and session.sent < self.max_messages_per_connection:
+            session.last_used = time.monotonic()
+            self._idle.put(session)
+        else:
+            self._close(session)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except Empty:
+                return
+
+    # Sending
+
+    def _classify(self, exc):
+        """(error text, transient, connection unusable) for a send failure"""
+        if isinstance(exc, smtplib.SMTPRecipientsRefused):
+            codes = [code for code, _ in exc.recipients.values()]
+            return f'Recipient refused: {exc.recipients}', all(400 <= code < 500 for code in codes), False
+        if isinstance(exc, smtplib.SMTPAuthenticationError):
+            return f'SMTP authentication failed: {exc.smtp_code} {exc.smtp_error!r}', False, True
+        if isinstance(exc, smtplib.SMTPResponseException):
+            # 421: the server is closing the session
+            return f'SMTP {exc.smtp_code}: {exc.smtp_error!r}', 400 <= exc.smtp_code < 500, exc.smtp_code == 421
+        if isinstance(exc, (smtplib.SMTPServerDisconnected, OSError)):
+            return f'SMTP connection error: {exc}', True, True
+        return f'SMTP error: {exc}', False, True
+
+    def _send_run(self, messages, indexes, results):
+        """Send one run of messages over a checked-out session, retrying transient failures"""
+        session = None
+        try:
+            for i in indexes:
+                to_email, subject, body = messages[i]
+                msg = build_message(self.sender, to_email, subject, body)
+                attempt = 0
+                while True:
+                    try:
+                        if session is None:
+                            session = self._checkout()
+                        self.limiter.acquire()
+                        session.conn.send_message(msg)
+                        session.sent += 1
+                        self._count('sent')
+                        break
+                    except Exception as e:
+                        error, transient, broken = self._classify(e)
+                        if broken and session is not None:
+                            self._checkin(session, healthy=False)
+                            session = None
+                        if transient and attempt < self.max_retries:
+                            attempt += 1
+                            self._count('retries')
+                            time.sleep(self.backoff_seconds * 2 ** (attempt - 1) * (0.5 + random.random()))
+                            continue
+                        results[i] = error
+                        self._count('failed')
+                        break
+
+                if session is not None and session.sent >= self.max_messages_per_connection:
+                    self._checkin(session)
+                    session = None
+        finally:
+            if session is not None:
+                self._checkin(session)
+
+    def send_many(self, messages):
+        """Deliver (to, subject, body) tuples; returns None or an error string per message"""
+        results = [None] * len(messages)
+        # Spread the batch over the pool, but never more than one session's worth per run
+        run_size = max(1, min(self.max_messages_per_connection, -(-len(messages) // self.pool_size)))
+        runs = [
+            range(start, min(start + run_size, len(messages)))
+            for start in range(0, len(messages), run_size)
+        ]
+        if len(runs) <= 1:
+            for run in runs:
+                self._send_run(messages, run, results)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.pool_size, len(runs))) as pool:
+                list(pool.map(lambda run: self._send_run(messages, run, results), runs))
+        return results
+
+def create_transport(kind, sender, host=None, port=None, username=None, password=None):
+    """EMAIL_TRANSPORT: console (default), smtp or file"""
+    if kind == 'smtp':
+        return SMTPTransport(sender, host, port, username, password)
+    if kind == 'file':
+        return FileSinkTransport(sender, os.getenv('EMAIL_SINK_DIR', os.path.join(os.getcwd(), 'mail_sink')))
+    if kind == 'console':
+        return ConsoleTransport(sender)
+    raise ValueError(f'Unknown EMAIL_TRANSPORT: {kind}')
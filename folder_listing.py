@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+class SimulatedFolderSource:
+    """The fixed two-file folder check_documents has always reported; nothing ever changes"""
+    name = 'simulated'
+    TOKEN = 'simulated'
+    FILES = ('imaging_scan_2025.pdf', 'lab_results_recent.pdf')
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def create_folder(self, lead_id):
+        self.calls['create_folder'] += 1
+
+    def folder_token(self, lead_id):
+        self.calls['folder_token'] += 1
+        return self.TOKEN
+
+    def list_folder(self, lead_id):
+        self.calls['list_folder'] += 1
+        return list(self.FILES), self.TOKEN
+
+    def delta(self, token):
+        self.calls['delta'] += 1
+        return set(), self.TOKEN
+
+class LocalFolderSource:
+    """Local stand-in for the Graph drive API: one directory per lead under SHAREPOINT_LOCAL_ROOT
+
+    Each method counts as one API call. latency_ms is slept per call to
+    stand in for the network round trip.
+    - create_folder: the lead's upload folder.
+    - folder_token: the folder's cTag. Here that is the directory mtime,
+      which changes when a file is added, removed or renamed.
+    - list_folder: the folder's children.
+    - delta: the lead folders changed since a token, for the whole
+      library in one call.
+    """
+    name = 'local'
+
+    # Directory mtimes come from a coarse kernel clock, so each delta looks back this far past its token
+    DELTA_OVERLAP_NS = 1_000_000_000
+
+    def __init__(self, root, latency_ms=0):
+        self.root = root
+        self.latency_seconds = latency_ms / 1000
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        os.makedirs(root, exist_ok=True)
+
+    def _call(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _token(self, path):
+        try:
+            return str(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def create_folder(self, lead_id):
+        self._call('create_folder')
+        os.makedirs(os.path.join(self.root, lead_id), exist_ok=True)
+
+    def folder_token(self, lead_id):
+        self._call('folder_token')
+        return self._token(os.path.join(self.root, lead_id))
+
+    def list_folder(self, lead_id):
+        """(sorted filenames, token); the token is read first, so a change during the listing forces a relist"""
+        self._call('list_folder')
+        path = os.path.join(self.root, lead_id)
+        token = self._token(path)
+        if token is None:
+            return [], None
+        try:
+            return sorted(entry.name for entry in os.scandir(path) if entry.is_file()), token
+        except FileNotFoundError:
+            return [], None
+
+    def delta(self, token):
+        """(lead ids whose folder changed at or after the token, new token); a None token means everything"""
+        self._call('delta')
+        scanned_at = time.time_ns()
+        since = int(token) - self.DELTA_OVERLAP_NS if token else 0
+        changed = set()
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_dir() and entry.stat().st_mtime_ns >= since:
+                    changed.add(entry.name)
+        return changed, str(scanned_at)
+
+class FolderListingCache:
+    """Per-lead folder listings kept until the source reports the folder changed
+
+    Without delta sync, every lookup costs one folder_token call. A
+    folder is listed again only when that token differs from the cached
+    one. With delta sync, one delta call every delta_interval_seconds
+    covers every folder and marks the changed ones stale. Lookups of
+    fresh entries then cost no calls at all. The cache holds at most
+    max_entries listings (LRU).
+    """
+
+    def __init__(self, source, max_entries=50000, delta_interval_seconds=30, use_delta=True):
+        self.source = source
+        self.max_entries = max_entries
+        self.delta_interval_seconds = delta_interval_seconds
+        self.use_delta = use_delta
+
+        self._entries = OrderedDict()   # lead_id -> [token, files, stale]
+        self._lock = threading.Lock()
+        self._delta_token = None
+        self._delta_at = None
+        self._syncs = 0
+        self.counts = Counter()         # hits, token_checks, relists, invalidated, delta_syncs
+
+    def sync(self, force=False):
+        """Apply the source's change feed; returns the number of cached folders marked stale"""
+        if not self.use_delta:
+            return 0
+        with self._lock:
+            due = force or self._delta_at is None or time.monotonic() - self._delta_at >= self.delta_interval_seconds
+            if not due:
+                return 0
+            token = self._delta_token
+
+        changed, new_token = self.source.delta(token)
+
+        invalidated = 0
+        with self._lock:
+            self.counts['delta_syncs'] += 1
+            for lead_id in changed:
+                entry = self._entries.get(lead_id)
+                if entry is not None and not entry[2]:
+                    entry[2] = True
+                    invalidated += 1
+            self.counts['invalidated'] += invalidated
+            self._delta_token = new_token
+            self._delta_at = time.monotonic()
+            self._syncs += 1
+        return invalidated
+
+    def _store(self, lead_id, token, files, syncs):
+        with self._lock:
+            # A sync that ran during the listing may have reported a change this listing missed
+            self._entries[lead_id] = [token, files, syncs != self._syncs]
+            self._entries.move_to_end(lead_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, lead_id):
+        """(filenames, listed) for a lead folder; listed is False when the cached listing was still current"""
+        if self.use_delta:
+            self.sync()
+
+        with self._lock:
+            syncs = self._syncs
+            entry = self._entries.get(lead_id)
+            if entry is not None:
+                self._entries.move_to_end(lead_id)
+                if self.use_delta and self._delta_token is not None and not entry[2]:
+                    self.counts['hits'] += 1
+                    return entry[1], False
+                cached_token, files = entry[0], entry[1]
+
+        if entry is not None and not self.use_delta:
+            self.counts['token_checks'] += 1
+            if self.source.folder_token(lead_id) == cached_token:
+                self.counts['hits'] += 1
+                return files, False
+
+        files, token = self.source.list_folder(lead_id)
+        self.counts['relists'] += 1
+        self._store(lead_id, token, files, syncs)
+        return files, True
+
+    def invalidate(self, lead_id=None):
+        """Drop one lead's listing, or all of them"""
+        with self._lock:
+            if lead_id is None:
+                self._entries.clear()
+                self._delta_token = None
+                self._delta_at = None
+            else:
+                self._entries.pop(lead_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'source': self.source.name,
+                'api_calls': dict(self.source.calls),
+                **self.counts
+            }
+
+def create_folder_source(kind, root=None, latency_ms=0):
+    """SHAREPOINT_BACKEND: simulated (default) or local"""
+    if kind == 'local':
+        return LocalFolderSource(root, latency_ms)
+    if kind == 'simulated':
+        return SimulatedFolderSource()
+    raise ValueError(f'Unknown SHAREPOINT_BACKEND: {kind}')
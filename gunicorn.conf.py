@@ -0,0 +1,102 @@
+"""Production server settings
+
+Run from the project root:
+
+    pip install gunicorn
+    python init_database.py
+    gunicorn -c gunicorn.conf.py src.main:app
+
+init_database.py creates missing tables and builds the KPI counters.
+Run it once per deploy, before the workers start. The workers skip that
+setup (INIT_DATABASE_ON_START=false, set below).
+
+By default this runs ONE worker process and scales with its request
+threads (WEB_THREADS). That process also runs the background threads:
+workflow job workers, outbox dispatchers, health and digest refresh.
+Request handlers mostly wait on the database, SMTP and HTTP calls, so
+threads go a long way before a second process is needed.
+
+Several pieces of state live in process memory and are not shared:
+  - request metrics and the latency sketches behind /api/metrics and
+    /api/performance/*
+  - the log store and the alert store
+  - automation_failure_rate in /api/kpis, computed from the workflow
+    metrics of the process that ran the workflows
+  - the idempotency cache in front of the idempotency table
+With WEB_CONCURRENCY > 1, each of those endpoints shows only the share of
+the worker that served it. POST /api/alerts/<id>/acknowledge returns 404
+when it reaches a worker other than the one that raised the alert.
+Only raise WEB_CONCURRENCY if that is acceptable.
+
+With more than one worker, the web workers start no background threads
+(BACKGROUND_TASKS=false). Run them in one separate process instead:
+
+    python job_worker.py
+
+Queued workflows then record their metrics in that process, so the web
+workers' automation_failure_rate covers only workflows run in-request.
+
+Workers are not recycled (WEB_MAX_REQUESTS=0). Recycling would take a
+worker's background threads with it. On exit, a worker stops those
+threads and waits up to graceful_timeout for a running job or send. A
+job cut off anyway stays 'running' until WORKFLOW_LOCK_TIMEOUT_SECONDS
+passes, and is then requeued.
+
+With LOG_FILE set, every worker appends to the same file. Rotating it is
+left to logrotate (LOG_ROTATE=external, the default here). The workers
+must not rotate it themselves, or they would rotate under each other.
+Each worker reopens the file after it has been moved. A matching
+logrotate entry:
+
+    /var/log/admissions/app.log {
+        daily
+        rotate 5
+        missingok
+        notifempty
+    }
+
+Without compress or dateext, the backups keep the app.log.N names that
+the log store reads at startup.
+"""
+import os
+
+# Workers inherit this (the app is imported after fork); see the note above
+os.environ.setdefault('LOG_ROTATE', 'external')
+os.environ.setdefault('INIT_DATABASE_ON_START', 'false')
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# Threaded workers: request handlers mostly wait on SQLite, SMTP and HTTP calls
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+threads = int(os.getenv('WEB_THREADS', '8'))
+
+# Background threads belong to one process; with several workers job_worker.py is that process
+if workers > 1:
+    os.environ.setdefault('BACKGROUND_TASKS', 'false')
+
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# 0 disables recycling; see the note above before turning it on
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = 500 if max_requests else 0
+
+preload_app = False
+
+accesslog = os.getenv('ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+def worker_exit(server, worker):
+    """Stop the worker's background threads, letting a running job or send finish"""
+    from src.services.job_queue_service import job_queue_service
+    from src.services.outbox_service import outbox_service
+    from src.services.health_service import health_service
+    from src.services.digest_service import digest_service
+
+    job_queue_service.stop_workers(timeout=graceful_timeout)
+    outbox_service.stop(timeout=graceful_timeout)
+    health_service.stop()
+    digest_service.stop()
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+from flask import current_app
+from src.services.observability_service import observability_service
+
+class HealthService:
+    """Component health checks run on a schedule and served from a cached snapshot
+
+    A background thread refreshes the snapshot every HEALTH_REFRESH_SECONDS.
+    Each check gets HEALTH_CHECK_TIMEOUT_SECONDS. A check that overruns is
+    reported unhealthy, and it is not started again until the stuck run
+    returns. Probes read the last snapshot plus its age. Without the
+    background thread (scripts, tests), a stale snapshot is refreshed
+    inline.
+    """
+
+    def __init__(self):
+        self.refresh_seconds = float(os.getenv('HEALTH_REFRESH_SECONDS', '15'))
+        self.check_timeout_seconds = float(os.getenv('HEALTH_CHECK_TIMEOUT_SECONDS', '2'))
+        self.started_at = time.time()
+
+        self.checks = {
+            'database': observability_service.check_database,
+            'error_rate': observability_service.check_error_rate,
+            'alerts': observability_service.check_alerts
+        }
+
+        self._pool = ThreadPoolExecutor(max_workers=len(self.checks) * 2, thread_name_prefix='health-check')
+        self._in_flight = {}
+        self._snapshot = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._app = None
+
+    def _run_check(self, app, fn):
+        started = time.perf_counter()
+        with app.app_context():
+            result = fn()
+        result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def refresh(self, app=None):
+        """Run every check (concurrently, each time-boxed) and replace the cached snapshot"""
+        app = app or self._app or current_app._get_current_object()
+        futures = {}
+        results = {}
+
+        for name, fn in self.checks.items():
+            running = self._in_flight.get(name)
+            if running is not None and not running.done():
+                results[name] = {
+                    'status': 'unhealthy',
+                    'error': 'Previous check still running'
+                }
+                continue
+            futures[name] = self._in_flight[name] = self._pool.submit(self._run_check, app, fn)
+
+        deadline = time.monotonic() + self.check_timeout_seconds
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except TimeoutError:
+                results[name] = {
+                    'status': 'unhealthy',
+                    'error': f'Timed out after {self.check_timeout_seconds:g}s',
+                    'duration_ms': round(self.check_timeout_seconds * 1000, 1)
+                }
+            except Exception as e:
+                results[name] = {
+                    'status': 'unhealthy',
+                    'error': str(e)
+                }
+
+        snapshot = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'status': 'healthy' if all(check['status'] == 'healthy' for check in results.values()) else 'unhealthy',
+            'checks': {name: results[name] for name in self.checks}
+        }
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._refreshed_at = time.monotonic()
+        return snapshot
+
+    def snapshot(self, app=None):
+        """Latest cached health snapshot with its age in seconds"""
+        with self._lock:
+            snapshot = self._snapshot
+            age = time.monotonic() - self._refreshed_at
+
+        if snapshot is None or (self._thread is None and age > self.refresh_seconds):
+            snapshot = self.refresh(app)
+            age = 0.0
+
+        return dict(snapshot, age_seconds=round(age, 1))
+
+    def liveness(self):
+        """Process is up and serving requests; deliberately touches nothing else"""
+        return {
+            'status': 'alive',
+            'timestamp': datetime.utcnow().isoformat(),
+            'uptime_seconds': round(self.uptime_seconds(), 1)
+        }
+
+    def uptime_seconds(self):
+        return time.time() - self.started_at
+
+    def _refresh_loop(self):
+        while not self._stopping.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Health refresh error: {e}")
+            self._stopping.wait(self.refresh_seconds)
+
+    def start(self, app):
+        """Start the background refresh thread"""
+        self._app = app
+        if self._thread is not None:
+            return self._thread
+
+        self._thread = threading.Thread(target=self._refresh_loop, name='health-refresh', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._stopping.clear()
+
+# Global instance
+health_service = HealthService()
@@ -0,0 +1,16 @@
+from datetime import datetime
+from src.models.lead import db
+
+class IdempotencyRecord(db.Model):
+    """Claim on an idempotency key while its first request runs, then the stored response replayed to retries"""
+    __tablename__ = 'idempotency_record'
+
+    key = db.Column(db.String, primary_key=True)               # sha256 of endpoint, path and client key
+    request_hash = db.Column(db.String, nullable=False)        # sha256 of the request body
+    status = db.Column(db.String, nullable=False, default='completed')  # in_flight, completed
+    lead_id = db.Column(db.String, index=True)                 # lead the response is about; purged with it
+    status_code = db.Column(db.Integer)                        # response fields stay empty while in flight
+    content_type = db.Column(db.String)
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # in flight: end of the claim
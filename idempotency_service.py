@@ -0,0 +1,270 @@
+import hashlib
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app, g, jsonify, request
+from sqlalchemy.exc import IntegrityError
+from src.models.lead import db
+from src.models.idempotency_record import IdempotencyRecord
+from src.services.observability_service import observability_service
+
+# Requests that honour idempotency keys, named "METHOD rule" like the request metrics
+IDEMPOTENT_ENDPOINTS = (
+    'POST /api/leads',
+    'POST /api/workflows/<workflow_type>/<lead_id>'
+)
+
+# _lookup result for a key whose first request is still running
+IN_FLIGHT = 'in_flight'
+
+class IdempotencyService:
+    """Replays stored responses to retried lead creations and workflow triggers
+
+    The key comes from the Idempotency-Key header or, failing that, an
+    idempotency_key field in the JSON body. The first request for a key
+    claims it by inserting an in_flight idempotency_record row. A retry
+    from any worker process that finds a live claim gets 409. A claim
+    older than IDEMPOTENCY_LOCK_SECONDS is taken over, because its worker
+    died. A 2xx response completes the row and is kept for
+    IDEMPOTENCY_TTL_SECONDS there and in an in-process LRU. Any other
+    outcome releases the claim. A retry with the same key and body gets
+    the stored response from the before_request hook, so the view does
+    not run and Lead is not touched. Reusing a key with a different body
+    returns 422. Each record carries the lead_id of its response, so a
+    lead purge deletes the stored bodies with the lead. A response stays
+    in the LRU for at most IDEMPOTENCY_MEMORY_TTL_SECONDS before the table
+    is checked again. Other worker processes therefore stop replaying a
+    purged lead within that time.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+        self.ttl_seconds = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+        self.cache_size = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000'))
+        self.purge_interval_seconds = int(os.getenv('IDEMPOTENCY_PURGE_SECONDS', '300'))
+        self.lock_seconds = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '60'))
+        self.memory_ttl_seconds = int(os.getenv('IDEMPOTENCY_MEMORY_TTL_SECONDS', '30'))
+
+        self._cache = OrderedDict()   # key -> (request_hash, status_code, content_type, body, expires_at epoch, lead_id)
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+        self.counts = Counter()       # memory_hits, database_hits, misses, claims, stored, conflicts
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    # Keys
+
+    def _client_key(self):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict) and isinstance(data.get('idempotency_key'), str):
+                key = data['idempotency_key']
+        return key.strip() if key else None
+
+    def _scoped_key(self, endpoint, client_key):
+        # Scoped by path so one client key can trigger different workflows or leads
+        return hashlib.sha256(f'{endpoint}\n{request.path}\n{client_key}'.encode()).hexdigest()
+
+    # Storage
+
+    def _remember(self, key, entry):
+        # Memory hits skip the table, so they may only lag a purge by memory_ttl_seconds
+        entry = entry[:4] + (min(entry[4], time.time() + self.memory_ttl_seconds),) + entry[5:]
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _lookup(self, key):
+        """Stored (request_hash, status_code, content_type, body, expires_at, lead_id) for a key, IN_FLIGHT, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[4] > now:
+                    self._cache.move_to_end(key)
+                    self.counts['memory_hits'] += 1
+                    return entry
+                del self._cache[key]
+
+        table = IdempotencyRecord.__table__
+        row = db.session.execute(
+            db.select(table.c.request_hash, table.c.status, table.c.lead_id, table.c.status_code,
+                      table.c.content_type, table.c.body, table.c.expires_at)
+            .where(table.c.key == key)
+        ).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            self.counts['misses'] += 1
+            return None
+        if row.status == IN_FLIGHT:
+            return IN_FLIGHT
+
+        entry = (row.request_hash, row.status_code, row.content_type, row.body,
+                 now + (row.expires_at - datetime.utcnow()).total_seconds(), row.lead_id)
+        self._remember(key, entry)
+        self.counts['database_hits'] += 1
+        return entry
+
+    def _claim(self, key, request_hash):
+        """Take the key for this request; returns None when claimed, else what _lookup now finds"""
+        now = datetime.utcnow()
+        table = IdempotencyRecord.__table__
+        values = {
+            'request_hash': request_hash,
+            'status': IN_FLIGHT,
+            'lead_id': None,
+            'status_code': None,
+            'content_type': None,
+            'body': None,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=self.lock_seconds)
+        }
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(table.insert().values(key=key, **values))
+        except IntegrityError:
+            # Only an expired record (or a claim whose worker died) may be taken over
+            with db.engine.begin() as connection:
+                claimed = connection.execute(
+                    table.update().where((table.c.key == key) & (table.c.expires_at <= now)).values(**values)
+                ).rowcount
+            if not claimed:
+                # Another worker holds the key, or finished between our lookup and the insert
+                return self._lookup(key) or IN_FLIGHT
+        self.counts['claims'] += 1
+        return None
+
+    def _release(self, key, request_hash):
+        """Drop this request's claim so the key can be retried"""
+        table = IdempotencyRecord.__table__
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    table.delete().where(
+                        (table.c.key == key) & (table.c.status == IN_FLIGHT) & (table.c.request_hash == request_hash)
+                    )
+                )
+        except Exception as e:
+            print(f"Error releasing idempotency key: {e}")
+
+    def _response_lead_id(self, response):
+        """The lead a response is about: the lead_id URL argument, else lead_id in the JSON body"""
+        lead_id = (request.view_args or {}).get('lead_id')
+        if lead_id is None and response.is_json:
+            data = response.get_json(silent=True)
+            if isinstance(data, dict):
+                lead = data.get('lead') if isinstance(data.get('lead'), dict) else data
+                lead_id = lead.get('lead_id')
+        return lead_id if isinstance(lead_id, str) else None
+
+    def _store(self, key, request_hash, response):
+        body = response.get_data()
+        lead_id = self._response_lead_id(response)
+        now = datetime.utcnow()
+        self._remember(key, (request_hash, response.status_code, response.content_type, body,
+                             time.time() + self.ttl_seconds, lead_id))
+
+        table = IdempotencyRecord.__table__
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    table.update()
+                    .where((table.c.key == key) & (table.c.status == IN_FLIGHT) & (table.c.request_hash == request_hash))
+                    .values(
+                        status='completed',
+                        lead_id=lead_id,
+                        status_code=response.status_code,
+                        content_type=response.content_type,
+                        body=body,
+                        expires_at=now + timedelta(seconds=self.ttl_seconds)
+                    )
+                )
+            self.counts['stored'] += 1
+        except Exception as e:
+            print(f"Error storing idempotency record: {e}")
+
+        if time.time() - self._last_purge >= self.purge_interval_seconds:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete expired records from the table and the LRU; returns the number of rows deleted"""
+        self._last_purge = time.time()
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._cache.items() if entry[4] <= now]:
+                del self._cache[key]
+
+        try:
+            table = IdempotencyRecord.__table__
+            with db.engine.begin() as connection:
+                return connection.execute(table.delete().where(table.c.expires_at <= datetime.utcnow())).rowcount
+        except Exception as e:
+            print(f"Error purging idempotency records: {e}")
+            return 0
+
+    def forget_leads(self, lead_ids):
+        """Drop this process's cached responses for deleted leads at once; other processes drop them within memory_ttl_seconds"""
+        lead_ids = set(lead_ids)
+        with self._lock:
+            for key in [key for key, entry in self._cache.items() if entry[5] in lead_ids]:
+                del self._cache[key]
+
+    # Request hooks
+
+    def _before_request(self):
+        if not self.enabled or request.url_rule is None:
+            return None
+        endpoint = f"{request.method} {request.url_rule.rule}"
+        if endpoint not in IDEMPOTENT_ENDPOINTS:
+            return None
+
+        client_key = self._client_key()
+        if not client_key:
+            return None
+
+        key = self._scoped_key(endpoint, client_key)
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        entry = self._lookup(key)
+        if entry is None:
+            entry = self._claim(key, request_hash)
+            if entry is None:
+                g.idempotency = (key, request_hash)
+                return None
+
+        if entry == IN_FLIGHT:
+            self.counts['conflicts'] += 1
+            response = jsonify({'error': 'A request with this idempotency key is still in progress'})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
+
+        if entry[0] != request_hash:
+            return jsonify({'error': 'Idempotency key was already used with a different request body'}), 422
+
+        observability_service.record_metric('idempotent_replays', 1, {'endpoint': endpoint})
+        response = current_app.response_class(entry[3], status=entry[1], content_type=entry[2])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+    def _after_request(self, response):
+        pending = g.get('idempotency')
+        if pending is not None and 200 <= response.status_code < 300 and not response.is_streamed:
+            self._store(*pending, response)
+            g.pop('idempotency')
+        return response
+
+    def _teardown_request(self, exc):
+        # Anything not stored (error status, exception, streamed body) frees the key for a retry
+        pending = g.pop('idempotency', None)
+        if pending is not None:
+            self._release(*pending)
+
+# Global instance
+idempotency_service = IdempotencyService()
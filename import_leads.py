@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Bulk import leads from a CSV or NDJSON file into the app database
+
+Usage: python import_leads.py <file.csv|file.ndjson> [--format csv|ndjson] [--chunk-size N]
+
+Rows whose idempotency_key matches an existing lead update that lead;
+everything else is inserted. Rejected rows are listed with line numbers.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import json
+
+# Importing shouldn't start the web app's background threads
+os.environ.setdefault('BACKGROUND_TASKS', 'false')
+
+from src.main import app
+from src.services.lead_import_service import lead_import_service
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk import leads')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'ndjson'])
+    parser.add_argument('--chunk-size', type=int)
+    args = parser.parse_args()
+
+    with app.app_context():
+        report = lead_import_service.import_file(args.path, args.format, args.chunk_size)
+
+    for reject in report['rejects']:
+        print(f"line {reject['line']}: {reject['error']}")
+    summary = {key: value for key, value in report.items() if key != 'rejects'}
+    print(json.dumps(summary, indent=2))
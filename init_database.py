@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""One-time database setup: create missing tables and build the KPI counters
+
+Usage: python init_database.py
+
+Run once per deploy, before starting gunicorn (see gunicorn.conf.py).
+Uses the same DATABASE_URL / local SQLite file as the app, without
+starting any of its background threads. The counters are only built
+when their table is empty and leads exist; an explicit recount is
+POST /api/kpis/rebuild.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask import Flask
+from src.models.lead import db
+# Every model module, so create_all sees all the tables
+from src.models import daily_digest, idempotency_record, notification_outbox, purge_audit, workflow_job, workflow_step
+from src.services.database_config import configure_database
+from src.services.kpi_service import kpi_service
+
+def init_database(app):
+    with app.app_context():
+        db.create_all()
+        return kpi_service.ensure_initialized()
+
+if __name__ == '__main__':
+    app = Flask(__name__)
+    configure_database(app, os.path.join(os.path.dirname(__file__), 'src', 'database', 'app.db'))
+    db.init_app(app)
+
+    result = init_database(app)
+    if result is None:
+        print("Database ready; KPI counters already present or no leads yet")
+    else:
+        print(f"Database ready; KPI counters built for {result['total_leads']} leads")
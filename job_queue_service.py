@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from src.models.lead import db
+from src.models.workflow_job import WorkflowJob
+from src.services.simple_workflow_service import simple_workflow_service
+
+# Workflow errors that another attempt cannot fix; the job fails at once instead of retrying
+PERMANENT_ERRORS = ('Lead not found',)
+
+class JobQueueService:
+    """Workflow job queue stored in the app database and drained by a local worker pool
+
+    Jobs survive restarts: a job stuck in 'running' longer than the lock
+    timeout (worker died mid-run) is put back on the queue. A worker only
+    records its result while it still holds the claim, so a run that
+    outlived the timeout cannot overwrite the rerun's outcome. locked_at
+    is kept after a run as the start of the latest attempt.
+    """
+
+    def __init__(self):
+        self.worker_count = int(os.getenv('WORKFLOW_WORKERS', '4'))
+        self.max_attempts = int(os.getenv('WORKFLOW_MAX_ATTEMPTS', '3'))
+        self.backoff_seconds = float(os.getenv('WORKFLOW_BACKOFF_SECONDS', '2'))
+        self.max_backoff_seconds = float(os.getenv('WORKFLOW_MAX_BACKOFF_SECONDS', '300'))
+        self.lock_timeout_seconds = int(os.getenv('WORKFLOW_LOCK_TIMEOUT_SECONDS', '600'))
+        self.poll_interval_seconds = float(os.getenv('WORKFLOW_POLL_INTERVAL_SECONDS', '1'))
+
+        self.workflows = simple_workflow_service.workflows
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_stale_check = 0.0
+
+    def enqueue(self, workflow_type, lead_id):
+        """Persist a queued job and return it"""
+        now = datetime.utcnow()
+        job = WorkflowJob(
+            id=str(uuid.uuid4()),
+            workflow_type=workflow_type,
+            lead_id=lead_id,
+            status='queued',
+            attempts=0,
+            max_attempts=self.max_attempts,
+            next_run_at=now,
+            created_at=now,
+            updated_at=now
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self._wakeup.set()
+        return job
+
+    def get_job(self, job_id):
+        return db.session.get(WorkflowJob, job_id)
+
+    def claim_next(self, worker_id):
+        """Atomically move the next due job to 'running' for this worker; returns the job or None"""
+        table = WorkflowJob.__table__
+        now = datetime.utcnow()
+
+        while True:
+            candidate = db.session.query(WorkflowJob.id).filter(
+                WorkflowJob.status == 'queued',
+                WorkflowJob.next_run_at <= now
+            ).order_by(WorkflowJob.next_run_at).first()
+            if candidate is None:
+                return None
+
+            # The status guard makes the claim safe against other workers and processes
+            claimed = db.session.execute(
+                table.update()
+                .where((table.c.id == candidate.id) & (table.c.status == 'queued'))
+                .values(status='running', locked_by=worker_id, locked_at=now,
+                        attempts=table.c.attempts + 1, updated_at=now)
+            ).rowcount
+            db.session.commit()
+
+            if claimed:
+                return self.get_job(candidate.id)
+
+    def requeue_stale(self):
+        """Return jobs whose worker stopped responding to the queue"""
+        table = WorkflowJob.__table__
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.lock_timeout_seconds)
+
+        requeued = db.session.execute(
+            table.update()
+            .where((table.c.status == 'running') & (table.c.locked_at < cutoff))
+            .values(status='queued', locked_by=None, locked_at=None, next_run_at=now, updated_at=now)
+        ).rowcount
+        db.session.commit()
+        return requeued
+
+    def backoff_for(self, attempts):
+        return min(self.backoff_seconds * (2 ** (attempts - 1)), self.max_backoff_seconds)
+
+    def run_job(self, job):
+        """Execute one claimed job and record success, retry or failure; returns the status, or 'lost' if reclaimed"""
+        # Read before the workflow runs: its commits expire `job`, which would then reload another worker's claim
+        worker_id, attempts, max_attempts = job.locked_by, job.attempts, job.max_attempts
+        workflow = self.workflows.get(job.workflow_type)
+        permanent = workflow is None
+        result = None
+        if workflow is None:
+            error = f'Unknown workflow type: {job.workflow_type}'
+        else:
+            try:
+                result = workflow(job.lead_id)
+                error = result.get('error') if isinstance(result, dict) else None
+                permanent = error in PERMANENT_ERRORS
+            except Exception as e:
+                db.session.rollback()
+                error = f'Workflow error: {str(e)}'
+
+        now = datetime.utcnow()
+        values = {'updated_at': now, 'locked_by': None, 'error': error}
+        if error is None:
+            values.update(status='succeeded', result=json.dumps(result, default=str))
+        elif not permanent and attempts < max_attempts:
+            values.update(status='queued', next_run_at=now + timedelta(seconds=self.backoff_for(attempts)))
+        else:
+            values['status'] = 'failed'
+
+        # Same guard as claim_next: a job requeued as stale and claimed again belongs to the new worker
+        table = WorkflowJob.__table__
+        recorded = db.session.execute(
+            table.update()
+            .where((table.c.id == job.id) & (table.c.status == 'running') & (table.c.locked_by == worker_id))
+            .values(**values)
+        ).rowcount
+        db.session.commit()
+
+        if not recorded:
+            print(f"Job {job.id}: claim lost to another worker, result of this run discarded")
+            return 'lost'
+        return values['status']
+
+    def _worker_loop(self, app, worker_id):
+        while not self._stopping.is_set():
+            job_found = False
+            try:
+                with app.app_context():
+                    job = self.claim_next(worker_id)
+                    if job is not None:
+                        job_found = True
+                        self.run_job(job)
+            except Exception as e:
+                print(f"Job worker {worker_id} error: {e}")
+
+            if not job_found:
+                self._check_stale(app)
+                self._wakeup.wait(self.poll_interval_seconds)
+                self._wakeup.clear()
+
+    def _check_stale(self, app):
+        """Requeue stale jobs at most once a minute per process, from whichever worker is idle"""
+        now = time.monotonic()
+        if now - self._last_stale_check < 60:
+            return
+        self._last_stale_check = now
+        try:
+            with app.app_context():
+                self.requeue_stale()
+        except Exception as e:
+            print(f"Stale job check error: {e}")
+
+    def start_workers(self, app, count=None):
+        """Start the in-process worker threads (no-op when the pool size is 0)"""
+        count = self.worker_count if count is None else count
+        if count <= 0 or self._threads:
+            return []
+
+        with app.app_context():
+            self.requeue_stale()
+        self._last_stale_check = time.monotonic()
+
+        prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        for i in range(count):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(app, f"{prefix}-{i}"),
+                name=f"workflow-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        return self._threads
+
+    def stop_workers(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping.clear()
+
+# Global instance
+job_queue_service = JobQueueService()
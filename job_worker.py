@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Run the background work in a separate process (no web server)
+
+Usage: python job_worker.py [worker_threads]
+
+Drains the workflow job queue, delivers the notification outbox and
+refreshes today's digest. gunicorn.conf.py turns these off in the web
+workers when it runs more than one (BACKGROUND_TASKS=false); this
+process then does them instead. Start several to scale the job queue:
+job and outbox claims are atomic on the shared tables, so a job never
+runs twice, and the digest refresh is idempotent.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import signal
+import threading
+
+# Only the pools started below should run here
+os.environ['BACKGROUND_TASKS'] = 'false'
+# Tables and counters are set up once by init_database.py
+os.environ['INIT_DATABASE_ON_START'] = 'false'
+
+from src.main import app
+from src.services.job_queue_service import job_queue_service
+from src.services.outbox_service import outbox_service
+from src.services.digest_service import digest_service
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    job_queue_service.start_workers(app, count)
+    outbox_service.start(app)
+    digest_service.start(app)
+    print(f"Background worker running with {count} job threads (pid {os.getpid()})")
+
+    stop.wait()
+    digest_service.stop()
+    outbox_service.stop()
+    job_queue_service.stop_workers()
+    print("Background worker stopped")
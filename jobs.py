@@ -0,0 +1,29 @@
+import json
+from flask import Blueprint, jsonify
+from src.services.job_queue_service import job_queue_service
+from src.services.workflow_history_service import workflow_history_service
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the progress of a queued workflow job"""
+    try:
+        job = job_queue_service.get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        response = job.to_dict()
+        
+        if job.status == 'succeeded':
+            response['result'] = json.loads(job.result) if job.result else None
+        else:
+            # Steps persisted so far by this job's latest attempt, not the lead's earlier runs
+            response['workflow_steps'] = workflow_history_service.get_steps_since(
+                job.lead_id, job.workflow_type, job.locked_at
+            ) if job.locked_at else []
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,210 @@
+from collections import Counter
+from sqlalchemy import event, func, case
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import get_history
+from src.models.lead import db, Lead, LeadStageCounter, LEAD_STAGES
+from src.services.database_config import conflict_insert
+
+class KPIService:
+    """Lead counts kept in lead_stage_counter, adjusted in the same transaction as each Lead write"""
+
+    def __init__(self):
+        event.listen(Session, 'after_flush', self._after_flush)
+
+    @staticmethod
+    def bucket_for(stage, has_consent, last_touch):
+        """Counter bucket key for a lead's current values"""
+        return (stage, bool(has_consent), last_touch is not None)
+
+    def _previous_value(self, obj, attr):
+        history = get_history(obj, attr)
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return None
+
+    def _current_value(self, obj, attr):
+        history = get_history(obj, attr)
+        if history.added:
+            return history.added[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return None
+
+    def _after_flush(self, session, flush_context):
+        """Collect bucket deltas for flushed Lead rows and write them through the flush connection"""
+        deltas = Counter()
+
+        for obj in session.new:
+            if isinstance(obj, Lead):
+                deltas[self.bucket_for(obj.stage, obj.has_consent, obj.last_touch_iso)] += 1
+
+        for obj in session.deleted:
+            if isinstance(obj, Lead):
+                deltas[self.bucket_for(
+                    self._previous_value(obj, 'stage'),
+                    self._previous_value(obj, 'has_consent'),
+                    self._previous_value(obj, 'last_touch_iso')
+                )] -= 1
+
+        for obj in session.dirty:
+            if isinstance(obj, Lead) and obj not in session.deleted:
+                old = self.bucket_for(
+                    self._previous_value(obj, 'stage'),
+                    self._previous_value(obj, 'has_consent'),
+                    self._previous_value(obj, 'last_touch_iso')
+                )
+                new = self.bucket_for(
+                    self._current_value(obj, 'stage'),
+                    self._current_value(obj, 'has_consent'),
+                    self._current_value(obj, 'last_touch_iso')
+                )
+                if old != new:
+                    deltas[old] -= 1
+                    deltas[new] += 1
+
+        if any(deltas.values()):
+            self.apply_deltas(session.connection(), deltas)
+
+    def apply_deltas(self, connection, deltas):
+        """Add {(stage, has_consent, touched): delta} to the counters on the given connection
+
+        One upsert per call on SQLite and PostgreSQL, so concurrent first
+        writers to a new bucket add up instead of colliding on the key.
+        """
+        table = LeadStageCounter.__table__
+        rows = [
+            {'stage': stage, 'has_consent': has_consent, 'touched': touched, 'lead_count': delta}
+            for (stage, has_consent, touched), delta in deltas.items() if delta
+        ]
+        if not rows:
+            return
+
+        insert = conflict_insert(connection.dialect.name, table)
+        if insert is not None:
+            connection.execute(
+                insert.on_conflict_do_update(
+                    index_elements=['stage', 'has_consent', 'touched'],
+                    set_={'lead_count': table.c.lead_count + insert.excluded.lead_count}
+                ),
+                rows
+            )
+            return
+
+        for row in rows:
+            match = (
+                (table.c.stage == row['stage']) & (table.c.has_consent == row['has_consent'])
+                & (table.c.touched == row['touched'])
+            )
+            update = table.update().where(match).values(lead_count=table.c.lead_count + row['lead_count'])
+            if connection.execute(update).rowcount:
+                continue
+            try:
+                # Savepoint, so losing the race to insert the bucket doesn't abort the caller's transaction
+                with connection.begin_nested():
+                    connection.execute(table.insert().values(**row))
+            except IntegrityError:
+                connection.execute(update)
+
+    def count_from_table(self):
+        """Grouped scan of the Lead table, keyed like the counter buckets"""
+        rows = db.session.query(
+            Lead.stage,
+            func.coalesce(Lead.has_consent, False),
+            case((Lead.last_touch_iso.isnot(None), True), else_=False),
+            func.count()
+        ).group_by(Lead.stage, Lead.has_consent, Lead.last_touch_iso.isnot(None)).all()
+
+        actual = Counter()
+        for stage, has_consent, touched, count in rows:
+            actual[self.bucket_for(stage, has_consent, True if touched else None)] += count
+        return actual
+
+    def stored_counts(self):
+        """Current counter rows as {(stage, has_consent, touched): count}"""
+        return Counter({
+            (row.stage, row.has_consent, row.touched): row.lead_count
+            for row in LeadStageCounter.query.all()
+        })
+
+    def rebuild(self):
+        """Cold rebuild: recount the Lead table and replace the counters, returning any drift found
+
+        One transaction that takes the counter write lock before it counts.
+        Every Lead write adjusts the counters in its own transaction. So a
+        write either committed before the recount and is in it, or waits
+        for the rebuild and applies its delta on top. Concurrent rebuilds
+        run one after the other.
+        """
+        table = LeadStageCounter.__table__
+        connection = db.session.connection()
+
+        if connection.dialect.name == 'postgresql':
+            connection.exec_driver_sql('LOCK TABLE lead_stage_counter IN EXCLUSIVE MODE')
+
+        if connection.dialect.delete_returning:
+            # On SQLite the DELETE is the transaction's first write, so it takes the database write lock
+            deleted = connection.execute(
+                table.delete().returning(table.c.stage, table.c.has_consent, table.c.touched, table.c.lead_count)
+            )
+            stored = Counter({(stage, has_consent, touched): count for stage, has_consent, touched, count in deleted})
+        else:
+            stored = self.stored_counts()
+            connection.execute(table.delete())
+
+        actual = self.count_from_table()
+
+        drift = {}
+        for key in set(actual) | set(stored):
+            if actual.get(key, 0) != stored.get(key, 0):
+                stage, consented, touched = key
+                label = f"{stage}/{'consented' if consented else 'no_consent'}/{'touched' if touched else 'untouched'}"
+                drift[label] = actual.get(key, 0) - stored.get(key, 0)
+
+        rows = [
+            {'stage': stage, 'has_consent': consented, 'touched': touched, 'lead_count': count}
+            for (stage, consented, touched), count in actual.items()
+        ]
+        if rows:
+            connection.execute(table.insert(), rows)
+        db.session.commit()
+
+        return {
+            'total_leads': sum(actual.values()),
+            'drift': drift
+        }
+
+    def ensure_initialized(self):
+        """Build the counters for an existing database that has none yet (run once, from init_database.py)"""
+        if LeadStageCounter.query.first() is None and Lead.query.first() is not None:
+            return self.rebuild()
+        return None
+
+    def snapshot(self):
+        """Lead totals derived from the counter rows; cost is independent of the number of leads"""
+        stage_counts = {stage: 0 for stage in LEAD_STAGES}
+        total_leads = 0
+        consented_leads = 0
+        touched_by_stage = {stage: 0 for stage in LEAD_STAGES}
+
+        for (stage, consented, touched), count in self.stored_counts().items():
+            if not count:
+                continue
+            stage_counts[stage] = stage_counts.get(stage, 0) + count
+            total_leads += count
+            if consented:
+                consented_leads += count
+            if touched:
+                touched_by_stage[stage] = touched_by_stage.get(stage, 0) + count
+
+        return {
+            'total_leads': total_leads,
+            'stage_counts': stage_counts,
+            'consented_leads': consented_leads,
+            'touched_by_stage': touched_by_stage
+        }
+
+# Global instance
+kpi_service = KPIService()
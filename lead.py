@@ -1,8 +1,50 @@
+import json
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Pipeline stages in order
+LEAD_STAGES = ['inquiry', 'docs_requested', 'docs_received', 'clinical_review', 'consult_ready', 'scheduled', 'decision']
+
+# Stages reached once the document packet is complete
+DOCS_RECEIVED_STAGES = ['docs_received', 'clinical_review', 'consult_ready', 'scheduled', 'decision']
+
+# Standard intake document packet
+REQUIRED_DOCS = ['imaging', 'pathology', 'labs', 'med_list', 'prior_notes']
+
+def parse_timestamp(value):
+    """Convert an ISO 8601 string (or datetime) to a naive UTC datetime"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _doc_list(value):
+    """Accept a JSON text list (legacy column format) or a Python list"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
 class Lead(db.Model):
+    __table_args__ = (
+        # Dashboard stage counts, consent rates and KPI counter rebuilds (covering for the grouped scans)
+        db.Index('ix_lead_stage_consent', 'stage', 'has_consent', 'last_touch_iso'),
+        # Reminder selection (stage = 'docs_requested' AND last_touch_iso < cutoff) and stage-filtered listing
+        db.Index('ix_lead_stage_last_touch', 'stage', 'last_touch_iso', 'lead_id'),
+        # Per-owner work queues
+        db.Index('ix_lead_owner_stage', 'owner_user_id', 'stage', 'last_touch_iso'),
+        # Retention purge (last_touch_iso < cutoff) and keyset listing order
+        db.Index('ix_lead_last_touch', 'last_touch_iso', 'lead_id'),
+        # Compliance report consent counts
+        db.Index('ix_lead_consent', 'has_consent'),
+    )
+
     lead_id = db.Column(db.String, primary_key=True)
     first_name = db.Column(db.String, nullable=False)
     last_name = db.Column(db.String, nullable=False)
@@ -10,17 +52,122 @@ class Lead(db.Model):
     phone = db.Column(db.String, nullable=False, unique=True)
     timezone = db.Column(db.String, default='America/Phoenix')
     relationship = db.Column(db.String)
-    stage = db.Column(db.String, nullable=False)
-    has_consent = db.Column(db.Boolean, default=False)
+    # active_history keeps the previous value available to the KPI counters on change
+    stage = db.column_property(db.Column(db.String, nullable=False), active_history=True)
+    has_consent = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
     consent_type = db.Column(db.String)
     consent_version = db.Column(db.String)
-    consent_timestamp = db.Column(db.String)
-    required_docs = db.Column(db.String)
-    received_docs = db.Column(db.String)
-    missing_docs = db.Column(db.String)
+    consent_timestamp = db.Column(db.DateTime)
     ehr_patient_id = db.Column(db.String)
     owner_user_id = db.Column(db.String)
-    last_touch_iso = db.Column(db.String)
+    last_touch_iso = db.column_property(db.Column(db.DateTime), active_history=True)
     idempotency_key = db.Column(db.String, unique=True)
 
+    documents = db.relationship('LeadDocument', cascade='all, delete-orphan', backref='lead')
+
+    @db.validates('last_touch_iso', 'consent_timestamp')
+    def validate_timestamp(self, key, value):
+        return parse_timestamp(value)
+
+    def _document(self, doc_type):
+        for document in self.documents:
+            if document.doc_type == doc_type:
+                return document
+        document = LeadDocument(doc_type=doc_type, required=False)
+        self.documents.append(document)
+        return document
+
+    def _doc_types(self, predicate):
+        order = {doc_type: i for i, doc_type in enumerate(REQUIRED_DOCS)}
+        docs = [d.doc_type for d in self.documents if predicate(d)]
+        return sorted(docs, key=lambda doc_type: (order.get(doc_type, len(order)), doc_type))
+
+    # Document lists keep their JSON text interface on top of the lead_document table
+
+    @property
+    def required_docs(self):
+        return json.dumps(self._doc_types(lambda d: d.required))
+
+    @required_docs.setter
+    def required_docs(self, value):
+        wanted = set(_doc_list(value))
+        for doc_type in wanted:
+            self._document(doc_type).required = True
+        for document in list(self.documents):
+            if document.doc_type not in wanted:
+                if document.received_at is None:
+                    self.documents.remove(document)
+                else:
+                    document.required = False
+
+    @property
+    def received_docs(self):
+        return json.dumps(self._doc_types(lambda d: d.received_at is not None))
+
+    @received_docs.setter
+    def received_docs(self, value):
+        received = set(_doc_list(value))
+        now = datetime.utcnow()
+        for doc_type in received:
+            document = self._document(doc_type)
+            if document.received_at is None:
+                document.received_at = now
+        for document in self.documents:
+            if document.doc_type not in received:
+                document.received_at = None
+
+    @property
+    def missing_docs(self):
+        return json.dumps(self._doc_types(lambda d: d.required and d.received_at is None))
+
+    @missing_docs.setter
+    def missing_docs(self, value):
+        missing = set(_doc_list(value))
+        now = datetime.utcnow()
+        for doc_type in missing:
+            document = self._document(doc_type)
+            document.required = True
+            document.received_at = None
+        for document in self.documents:
+            if document.required and document.doc_type not in missing and document.received_at is None:
+                document.received_at = now
+
+    def to_dict(self):
+        """JSON-ready representation with ISO timestamps and document lists"""
+        return {
+            'lead_id': self.lead_id,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'email': self.email,
+            'phone': self.phone,
+            'timezone': self.timezone,
+            'relationship': self.relationship,
+            'stage': self.stage,
+            'has_consent': self.has_consent,
+            'consent_type': self.consent_type,
+            'consent_version': self.consent_version,
+            'consent_timestamp': self.consent_timestamp.isoformat() if self.consent_timestamp else None,
+            'required_docs': self._doc_types(lambda d: d.required),
+            'received_docs': self._doc_types(lambda d: d.received_at is not None),
+            'missing_docs': self._doc_types(lambda d: d.required and d.received_at is None),
+            'ehr_patient_id': self.ehr_patient_id,
+            'owner_user_id': self.owner_user_id,
+            'last_touch_iso': self.last_touch_iso.isoformat() if self.last_touch_iso else None,
+            'idempotency_key': self.idempotency_key
+        }
+
+
+class LeadDocument(db.Model):
+    """One row per document type tracked for a lead"""
+    lead_id = db.Column(db.String, db.ForeignKey('lead.lead_id', ondelete='CASCADE'), primary_key=True)
+    doc_type = db.Column(db.String, primary_key=True)
+    required = db.Column(db.Boolean, nullable=False, default=True)
+    received_at = db.Column(db.DateTime)
+
 
+class LeadStageCounter(db.Model):
+    """Running lead counts per (stage, consent, touched) bucket, maintained on every Lead write"""
+    stage = db.Column(db.String, primary_key=True)
+    has_consent = db.Column(db.Boolean, primary_key=True)
+    touched = db.Column(db.Boolean, primary_key=True)
+    lead_count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify
+from src.services.lead_import_service import lead_import_service
+
+lead_import_bp = Blueprint('lead_import', __name__)
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-lines')
+
+def _import_format(filename=None):
+    """?format= wins, then the uploaded file's extension, then the Content-Type"""
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt.lower()
+    if filename:
+        return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+    return 'ndjson' if request.mimetype in NDJSON_TYPES else 'csv'
+
+@lead_import_bp.route('/leads/import', methods=['POST'])
+def import_leads():
+    """Bulk import leads from a CSV or NDJSON body (or multipart 'file' upload)"""
+    try:
+        chunk_size = request.args.get('chunk_size', type=int)
+
+        upload = request.files.get('file')
+        if upload is not None:
+            report = lead_import_service.import_bytes_stream(upload.stream, _import_format(upload.filename), chunk_size)
+        else:
+            report = lead_import_service.import_bytes_stream(request.stream, _import_format(), chunk_size)
+
+        return jsonify(report)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,49 @@
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from src.services.lead_listing_service import lead_listing_service
+
+lead_listing_bp = Blueprint('lead_listing', __name__)
+
+def _listing_filters():
+    """Read stage / owner / consent filters from the query string"""
+    consent = request.args.get('has_consent')
+    return {
+        'stage': request.args.get('stage') or None,
+        'owner_user_id': request.args.get('owner') or None,
+        'has_consent': None if consent in (None, '') else consent.lower() == 'true'
+    }
+
+@lead_listing_bp.route('/leads/page', methods=['GET'])
+def list_leads_page():
+    """Get one keyset-paginated page of leads"""
+    try:
+        page = lead_listing_service.get_page(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit'),
+            **_listing_filters()
+        )
+        return jsonify(page)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@lead_listing_bp.route('/leads/export', methods=['GET'])
+def export_leads():
+    """Stream all matching leads as NDJSON, one lead per line"""
+    try:
+        filters = _listing_filters()
+
+        def generate():
+            for lead in lead_listing_service.iter_export(**filters):
+                yield json.dumps(lead) + '\n'
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename=leads.ndjson'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
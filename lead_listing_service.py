@@ -0,0 +1,102 @@
+import base64
+import json
+from sqlalchemy import tuple_
+from sqlalchemy.orm import selectinload
+from src.models.lead import Lead, parse_timestamp
+
+class LeadListingService:
+    """Keyset-paginated lead listing, newest touch first
+
+    Leads are ordered by (last_touch_iso DESC, lead_id DESC). Leads that were
+    never touched follow, ordered by lead_id DESC. The cursor records the
+    last row returned, so each page is an index range scan. The cost does not
+    depend on how deep into the listing the client is.
+    """
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    EXPORT_CHUNK_SIZE = 1000
+
+    def encode_cursor(self, lead):
+        payload = {
+            't': lead.last_touch_iso.isoformat() if lead.last_touch_iso else None,
+            'id': lead.lead_id
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        """Return (last_touch, lead_id) from an opaque cursor; raises ValueError if malformed"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return parse_timestamp(payload['t']), payload['id']
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Invalid cursor: {e}')
+
+    def filtered_query(self, stage=None, owner_user_id=None, has_consent=None):
+        query = Lead.query.options(selectinload(Lead.documents))
+
+        if stage:
+            stages = stage if isinstance(stage, (list, tuple)) else stage.split(',')
+            query = query.filter(Lead.stage.in_(stages)) if len(stages) > 1 else query.filter(Lead.stage == stages[0])
+        if owner_user_id:
+            query = query.filter(Lead.owner_user_id == owner_user_id)
+        if has_consent is not None:
+            query = query.filter(Lead.has_consent == has_consent)
+
+        return query
+
+    def _fetch(self, query, after, limit):
+        """Fetch up to limit leads strictly after the (last_touch, lead_id) position"""
+        leads = []
+        last_touch, lead_id = after
+
+        # Touched leads first, unless the cursor is already past them
+        if last_touch is not None or lead_id is None:
+            touched = query.filter(Lead.last_touch_iso.isnot(None))
+            if last_touch is not None:
+                touched = touched.filter(tuple_(Lead.last_touch_iso, Lead.lead_id) < tuple_(last_touch, lead_id))
+            leads = touched.order_by(Lead.last_touch_iso.desc(), Lead.lead_id.desc()).limit(limit).all()
+            lead_id = None
+
+        if len(leads) < limit:
+            untouched = query.filter(Lead.last_touch_iso.is_(None))
+            if lead_id is not None:
+                untouched = untouched.filter(Lead.lead_id < lead_id)
+            leads += untouched.order_by(Lead.lead_id.desc()).limit(limit - len(leads)).all()
+
+        return leads
+
+    def get_page(self, cursor=None, limit=None, **filters):
+        """One page of leads plus the cursor for the next page (None at the end)"""
+        limit = min(max(int(limit or self.DEFAULT_PAGE_SIZE), 1), self.MAX_PAGE_SIZE)
+        after = self.decode_cursor(cursor) if cursor else (None, None)
+
+        # Fetch one extra row to know whether another page exists
+        leads = self._fetch(self.filtered_query(**filters), after, limit + 1)
+        has_more = len(leads) > limit
+        leads = leads[:limit]
+
+        return {
+            'leads': [lead.to_dict() for lead in leads],
+            'next_cursor': self.encode_cursor(leads[-1]) if has_more else None,
+            'limit': limit
+        }
+
+    def iter_export(self, **filters):
+        """Yield lead dicts in listing order, loading EXPORT_CHUNK_SIZE rows at a time"""
+        query = self.filtered_query(**filters)
+        after = (None, None)
+
+        while True:
+            leads = self._fetch(query, after, self.EXPORT_CHUNK_SIZE)
+            for lead in leads:
+                yield lead.to_dict()
+
+            if len(leads) < self.EXPORT_CHUNK_SIZE:
+                break
+            after = (leads[-1].last_touch_iso, leads[-1].lead_id)
+            # Release the chunk before loading the next one
+            query.session.expunge_all()
+
+# Global instance
+lead_listing_service = LeadListingService()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Load test for lead create / list / delete against a running server
+
+Usage: python load_test.py [--url http://localhost:5000] [--concurrency 1,4,16,32] [--requests 200]
+
+For each concurrency level it creates --requests leads, pages through
+the lead list --requests times and deletes every lead it created. It
+reports requests/sec, p50/p95 latency and errors per operation. Only
+the standard library is used, so it runs anywhere the server is
+reachable.
+"""
+import argparse
+import json
+import time
+import uuid
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def call(method, url, payload=None):
+    """Returns (status, parsed JSON or None, seconds)"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+    except Exception:
+        return 0, None, time.perf_counter() - started
+    elapsed = time.perf_counter() - started
+
+    try:
+        return status, json.loads(body), elapsed
+    except ValueError:
+        return status, None, elapsed
+
+def lead_payload(run_id, i):
+    return {
+        'first_name': 'Load',
+        'last_name': f'Test{i}',
+        'email': f'load-{run_id}-{i}@example.com',
+        'phone': f'+1555{run_id[:3]}{i:07d}',
+        'stage': 'inquiry',
+        'source': 'load_test'
+    }
+
+def created_lead_id(body):
+    if not isinstance(body, dict):
+        return None
+    lead = body.get('lead') if isinstance(body.get('lead'), dict) else body
+    return lead.get('lead_id')
+
+def run_phase(concurrency, tasks):
+    """Run callables returning (ok, seconds, result); returns stats and results"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda task: task(), tasks))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(seconds for _, seconds, _ in outcomes)
+    errors = sum(1 for ok, _, _ in outcomes if not ok)
+    stats = {
+        'requests': len(outcomes),
+        'errors': errors,
+        'rps': round(len(outcomes) / wall, 1) if wall else 0,
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else 0
+    }
+    return stats, [result for _, _, result in outcomes]
+
+def run_level(base_url, concurrency, count):
+    run_id = uuid.uuid4().hex[:8]
+
+    def create(i):
+        def task():
+            status, body, seconds = call('POST', f'{base_url}/api/leads', lead_payload(run_id, i))
+            return status in (200, 201), seconds, created_lead_id(body)
+        return task
+
+    def list_page():
+        status, _, seconds = call('GET', f'{base_url}/api/leads/page?limit=50')
+        return status == 200, seconds, None
+
+    def delete(lead_id):
+        def task():
+            status, _, seconds = call('DELETE', f'{base_url}/api/delete-lead/{lead_id}')
+            return status == 200, seconds, None
+        return task
+
+    create_stats, lead_ids = run_phase(concurrency, [create(i) for i in range(count)])
+    list_stats, _ = run_phase(concurrency, [list_page] * count)
+    delete_stats, _ = run_phase(concurrency, [delete(lead_id) for lead_id in lead_ids if lead_id])
+
+    return {'create': create_stats, 'list': list_stats, 'delete': delete_stats}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrency', default='1,4,16,32')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f"{'conc':>5} {'operation':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for concurrency in levels:
+        results = run_level(args.url.rstrip('/'), concurrency, args.requests)
+        for operation, stats in results.items():
+            print(f"{concurrency:>5} {operation:<8} {stats['rps']:>8} {stats['p50_ms']:>8} "
+                  f"{stats['p95_ms']:>8} {stats['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
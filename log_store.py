@@ -0,0 +1,196 @@
+import glob
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+class _Postings:
+    """Ascending sequence numbers for one index key; evicted from the front"""
+
+    __slots__ = ('seqs', 'head')
+
+    def __init__(self):
+        self.seqs = []
+        self.head = 0
+
+    def __len__(self):
+        return len(self.seqs) - self.head
+
+    def append(self, seq):
+        self.seqs.append(seq)
+
+    def evict_through(self, seq):
+        while self.head < len(self.seqs) and self.seqs[self.head] <= seq:
+            self.head += 1
+        # Compact once the dead prefix dominates, keeping eviction amortised O(1)
+        if self.head > 1024 and self.head * 2 > len(self.seqs):
+            del self.seqs[:self.head]
+            self.head = 0
+
+class LogStore:
+    """Bounded log entry store with indexes by level, event_type and time
+
+    Entries get increasing sequence numbers. Timestamps are kept
+    non-decreasing, so the time index is a sorted column and a window
+    start is one binary search. Level and event_type map to posting lists
+    of sequence numbers. "ERROR in the last hour" is therefore a bisect
+    over the ERROR postings, not a scan of the whole store. With LOG_FILE
+    set, the store is pre-loaded at startup from the log writer's on-disk
+    JSON-lines files, so retention survives restarts.
+    """
+
+    def __init__(self, capacity=50000):
+        self.capacity = capacity
+        self._entries = []
+        self._timestamps = array('d')
+        self._head = 0          # index of the oldest live entry in _entries/_timestamps
+        self._base_seq = 0      # sequence number of _entries[0]
+        self._by_level = {}
+        self._by_event_type = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries) - self._head
+
+    def __iter__(self):
+        with self._lock:
+            return iter(self._entries[self._head:])
+
+    def append(self, entry, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if len(self._timestamps) > self._head and timestamp < self._timestamps[-1]:
+                timestamp = self._timestamps[-1]
+
+            seq = self._base_seq + len(self._entries)
+            self._entries.append(entry)
+            self._timestamps.append(timestamp)
+            self._by_level.setdefault(entry['level'], _Postings()).append(seq)
+            self._by_event_type.setdefault(entry['event_type'], _Postings()).append(seq)
+
+            if len(self) > self.capacity:
+                self._evict(len(self) - self.capacity)
+
+    def _evict(self, count):
+        last_evicted = self._base_seq + self._head + count - 1
+        for i in range(self._head, self._head + count):
+            entry = self._entries[i]
+            self._entries[i] = None
+            self._by_level[entry['level']].evict_through(last_evicted)
+            self._by_event_type[entry['event_type']].evict_through(last_evicted)
+        self._head += count
+
+        if self._head > 1024 and self._head * 2 > len(self._entries):
+            del self._entries[:self._head]
+            del self._timestamps[:self._head]
+            self._base_seq += self._head
+            self._head = 0
+
+    def _first_index_after(self, since):
+        """Index into _entries of the first live entry with timestamp > since"""
+        if since is None:
+            return self._head
+        return bisect_right(self._timestamps, since, self._head)
+
+    def _candidates(self, level, event_type, since):
+        """(size, postings, start position) of the smallest index covering the window; () if unfiltered, None if no match"""
+        first_seq = self._base_seq + self._first_index_after(since)
+        options = []
+        for key, index in ((level, self._by_level), (event_type, self._by_event_type)):
+            if key is not None:
+                postings = index.get(key)
+                if postings is None:
+                    return None
+                start = bisect_right(postings.seqs, first_seq - 1, postings.head)
+                options.append((len(postings.seqs) - start, postings, start))
+        if not options:
+            return ()
+        return min(options, key=lambda option: option[0])
+
+    def _matches(self, entry, level, event_type):
+        return (level is None or entry['level'] == level) and \
+               (event_type is None or entry['event_type'] == event_type)
+
+    def query(self, level=None, event_type=None, since=None, limit=100):
+        """Newest `limit` entries matching the filters, oldest first"""
+        with self._lock:
+            candidates = self._candidates(level, event_type, since)
+            if candidates is None:
+                return []
+
+            results = []
+            if candidates == ():
+                first = self._first_index_after(since)
+                results = self._entries[max(first, len(self._entries) - limit):]
+            else:
+                _, postings, start = candidates
+                for position in range(len(postings.seqs) - 1, start - 1, -1):
+                    entry = self._entries[postings.seqs[position] - self._base_seq]
+                    if self._matches(entry, level, event_type):
+                        results.append(entry)
+                        if len(results) >= limit:
+                            break
+                results.reverse()
+            return results
+
+    def count(self, level=None, event_type=None, since=None):
+        with self._lock:
+            candidates = self._candidates(level, event_type, since)
+            if candidates is None:
+                return 0
+            if candidates == ():
+                return len(self._entries) - self._first_index_after(since)
+
+            size, postings, start = candidates
+            if level is None or event_type is None:
+                return size
+            return sum(
+                1 for position in range(start, len(postings.seqs))
+                if self._matches(self._entries[postings.seqs[position] - self._base_seq], level, event_type)
+            )
+
+    def counts_by_event_type(self, since=None):
+        """{event_type: count} for entries after `since`"""
+        with self._lock:
+            first_seq = self._base_seq + self._first_index_after(since)
+            counts = {}
+            for event_type, postings in self._by_event_type.items():
+                count = len(postings.seqs) - bisect_right(postings.seqs, first_seq - 1, postings.head)
+                if count:
+                    counts[event_type] = count
+            return counts
+
+    def load(self, path):
+        """Pre-load the newest `capacity` entries from a JSON-lines log and its rotated backups"""
+        backups = [name for name in glob.glob(f'{path}.*') if name.rsplit('.', 1)[1].isdigit()]
+        files = sorted(backups, key=lambda name: int(name.rsplit('.', 1)[1]), reverse=True)
+        if os.path.exists(path):
+            files.append(path)
+
+        # Newest files are last; take lines from the end until the store would be full
+        chunks = []
+        remaining = self.capacity
+        for name in reversed(files):
+            if remaining <= 0:
+                break
+            with open(name, encoding='utf-8', errors='replace') as f:
+                lines = f.readlines()
+            chunks.append(lines[-remaining:])
+            remaining -= len(chunks[-1])
+
+        loaded = 0
+        for lines in reversed(chunks):
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                    timestamp = datetime.fromisoformat(entry['timestamp']).replace(tzinfo=timezone.utc).timestamp()
+                    entry.setdefault('metadata', {})
+                    self.append(entry, timestamp)
+                    loaded += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return loaded
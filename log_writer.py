@@ -0,0 +1,166 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+
+class LogWriter:
+    """Queue-backed JSON-lines log sink drained by one background thread
+
+    write() only enqueues the entry. The writer thread serialises entries
+    in batches and writes each batch with a single unbuffered append.
+    With LOG_FILE set, output goes to that file; otherwise it goes to
+    stdout. When the queue is full, LOG_BACKPRESSURE decides the outcome:
+    'drop' counts and discards the entry, 'block' waits for space.
+
+    LOG_ROTATE picks who rotates LOG_FILE:
+    - 'size' (default): this writer rotates at LOG_MAX_BYTES. Use it only
+      when a single process writes the file.
+    - 'external': an outside tool such as logrotate renames the file. The
+      writer reopens LOG_FILE when it has been moved or removed, as
+      logging's WatchedFileHandler does. Several processes can then share
+      one file, because each batch is one O_APPEND write.
+    """
+
+    def __init__(self):
+        self.path = os.getenv('LOG_FILE')
+        self.max_bytes = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+        self.backup_count = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+        self.rotation = os.getenv('LOG_ROTATE', 'size')
+        self.batch_size = int(os.getenv('LOG_BATCH_SIZE', '500'))
+        self.backpressure = os.getenv('LOG_BACKPRESSURE', 'drop')
+
+        self._queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stream = None
+        self._size = 0
+        self._file_id = None
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def write(self, entry):
+        """Enqueue a log entry; returns False if it was dropped"""
+        if self._thread is None:
+            self._start()
+
+        if self.backpressure == 'block':
+            self._queue.put(entry)
+            return True
+
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"Log writer error: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        lines = []
+        for entry in batch:
+            try:
+                lines.append(json.dumps(entry, separators=(',', ':'), default=str))
+            except Exception:
+                # e.g. metadata mutated by its owner while we were serialising it
+                self.errors += 1
+        if not lines:
+            return
+
+        chunk = '\n'.join(lines) + '\n'
+
+        if self.path:
+            data = chunk.encode('utf-8')
+            if self._stream is None:
+                self._open()
+            if self.rotation == 'external':
+                self._reopen_if_moved()
+            elif self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._stream.write(data)
+            self._stream.flush()
+            self._size += len(data)
+        else:
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+
+        self.written += len(lines)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stream = open(self.path, 'ab', buffering=0)
+        self._size = self._stream.tell()
+        stat = os.fstat(self._stream.fileno())
+        self._file_id = (stat.st_dev, stat.st_ino)
+
+    def _reopen_if_moved(self):
+        """Reopen LOG_FILE if it was rotated away since it was opened"""
+        try:
+            stat = os.stat(self.path)
+            moved = (stat.st_dev, stat.st_ino) != self._file_id
+        except FileNotFoundError:
+            moved = True
+        if moved:
+            self._stream.close()
+            self._open()
+
+    def _rotate(self):
+        """app.log -> app.log.1 -> ... -> app.log.<backup_count> (oldest discarded)"""
+        self._stream.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def flush(self):
+        """Block until every queued entry has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self):
+        return {
+            'sink': self.path or 'stdout',
+            'rotation': self.rotation if self.path else None,
+            'backpressure': self.backpressure,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors
+        }
+
+# Global instance
+log_writer = LogWriter()
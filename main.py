@@ -6,11 +6,24 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.lead import db
+from src.services.database_config import configure_database
 from src.routes.lead import lead_bp
 from src.routes.workflow import workflow_bp
 from src.routes.monitoring import monitoring_bp
 from src.routes.followup import followup_bp
 from src.routes.simple_delete import simple_delete_bp
+from src.routes.lead_listing import lead_listing_bp
+from src.routes.jobs import jobs_bp
+from src.routes.lead_import import lead_import_bp
+from src.routes.retention import retention_bp
+from src.routes.outbox import outbox_bp
+from src.services.kpi_service import kpi_service
+from src.services.job_queue_service import job_queue_service
+from src.services.outbox_service import outbox_service
+from src.services.request_metrics_service import request_metrics_service
+from src.services.idempotency_service import idempotency_service
+from src.services.health_service import health_service
+from src.services.digest_service import digest_service
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -23,13 +36,40 @@ app.register_blueprint(workflow_bp, url_prefix='/api')
 app.register_blueprint(monitoring_bp, url_prefix='/api')
 app.register_blueprint(followup_bp, url_prefix='/api')
 app.register_blueprint(simple_delete_bp, url_prefix='/api')
+app.register_blueprint(lead_listing_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+app.register_blueprint(lead_import_bp, url_prefix='/api')
+app.register_blueprint(retention_bp, url_prefix='/api')
+app.register_blueprint(outbox_bp, url_prefix='/api')
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Per-request timing and SQL counts for /api routes
+request_metrics_service.init_app(app)
+
+# Retried lead creations and workflow triggers replay the stored response (after metrics, so replays are timed too)
+idempotency_service.init_app(app)
+
+# DATABASE_URL selects a pooled server database; otherwise the local SQLite file (WAL mode)
+configure_database(app, os.path.join(os.path.dirname(__file__), 'database', 'app.db'))
 db.init_app(app)
-with app.app_context():
-    db.create_all()
+# The dev server sets up its own database; under gunicorn init_database.py runs once before the workers start
+if os.getenv('INIT_DATABASE_ON_START', 'true') == 'true':
+    with app.app_context():
+        db.create_all()
+        kpi_service.ensure_initialized()
+
+# Background threads run in one designated process; BACKGROUND_TASKS=false leaves them to job_worker.py
+if os.getenv('BACKGROUND_TASKS', 'true') == 'true':
+    # Workers for queued workflow jobs (WORKFLOW_WORKERS=0 to disable)
+    job_queue_service.start_workers(app)
+
+    # Outbox dispatchers deliver queued e-mail and SMS (OUTBOX_EMAIL_CONCURRENCY / OUTBOX_SMS_CONCURRENCY=0 to disable)
+    outbox_service.start(app)
+
+    # Health checks run on a schedule; /api/health serves the cached result
+    health_service.start(app)
+
+    # Today's digest row is recomputed on a schedule and adjusted on every lead write in between
+    digest_service.start(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -48,5 +88,6 @@ def serve(path):
             return "index.html not found", 404
 
 
+# Development server only; production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '5000')), debug=os.getenv('FLASK_DEBUG', '1') == '1')
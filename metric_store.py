@@ -0,0 +1,117 @@
+import threading
+import time
+from array import array
+
+class MetricSeries:
+    """Fixed-size ring of (epoch timestamp, float value) samples for one metric
+
+    Appends are O(1) and never copy the buffer. Timestamps are kept
+    non-decreasing, so time-window queries binary-search for their start.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._tags = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value, tags=None, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if self._count:
+                # Clock adjustments must not break the ordering the window search relies on
+                newest = self._timestamps[(self._start + self._count - 1) % self.capacity]
+                if timestamp < newest:
+                    timestamp = newest
+
+            if self._count < self.capacity:
+                index = (self._start + self._count) % self.capacity
+                self._count += 1
+            else:
+                index = self._start
+                self._start = (self._start + 1) % self.capacity
+
+            self._timestamps[index] = timestamp
+            self._values[index] = value
+            self._tags[index] = tags
+
+    def _first_position_after(self, since):
+        """Logical position (0 = oldest) of the first sample with timestamp > since"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamps[(self._start + mid) % self.capacity] > since:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _slice(self, buffer, first):
+        """Samples from logical position first to the newest, oldest first"""
+        begin = (self._start + first) % self.capacity
+        end = (self._start + self._count) % self.capacity
+        if first >= self._count:
+            return buffer[0:0]
+        if begin < end:
+            return buffer[begin:end]
+        return buffer[begin:] + buffer[:end]
+
+    def values(self, since=None):
+        """Values recorded after the given epoch time (all retained values if None)"""
+        with self._lock:
+            first = 0 if since is None else self._first_position_after(since)
+            return self._slice(self._values, first)
+
+    def entries(self, since=None):
+        """(timestamp, value, tags) tuples recorded after the given epoch time"""
+        with self._lock:
+            first = 0 if since is None else self._first_position_after(since)
+            positions = [(self._start + i) % self.capacity for i in range(first, self._count)]
+            return [(self._timestamps[i], self._values[i], self._tags[i]) for i in positions]
+
+    def summary(self, since=None):
+        values = self.values(since)
+        if not values:
+            return {'count': 0, 'avg': 0, 'min': 0, 'max': 0}
+
+        return {
+            'count': len(values),
+            'avg': sum(values) / len(values),
+            'min': min(values),
+            'max': max(values),
+            'latest': values[-1]
+        }
+
+class MetricStore:
+    """Named MetricSeries, created on first write"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, name):
+        series = self._series.get(name)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(name, MetricSeries(self.capacity))
+        return series
+
+    def record(self, name, value, tags=None, timestamp=None):
+        self.series(name).append(value, tags, timestamp)
+
+    def get(self, name):
+        return self._series.get(name)
+
+    def keys(self):
+        return list(self._series.keys())
+
+    def __contains__(self, name):
+        return name in self._series
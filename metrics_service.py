@@ -0,0 +1,47 @@
+from datetime import datetime
+from sqlalchemy import func, case
+from src.models.lead import db, Lead, LEAD_STAGES, DOCS_RECEIVED_STAGES
+
+class MetricsService:
+    def get_stage_aggregates(self):
+        """Return {stage: (lead_count, consented_count)} from one grouped query"""
+        rows = db.session.query(
+            Lead.stage,
+            func.count(),
+            func.sum(case((Lead.has_consent == True, 1), else_=0))
+        ).group_by(Lead.stage).all()
+
+        return {stage: (count, consented or 0) for stage, count, consented in rows}
+
+    def get_workflow_metrics(self):
+        """Calculate workflow performance metrics in a single aggregate query"""
+        aggregates = self.get_stage_aggregates()
+
+        total_leads = sum(count for count, _ in aggregates.values())
+        consented_leads = sum(consented for _, consented in aggregates.values())
+
+        # Stage distribution
+        stages = {stage: aggregates.get(stage, (0, 0))[0] for stage in LEAD_STAGES}
+
+        # Consent rate
+        consent_rate = (consented_leads / total_leads * 100) if total_leads > 0 else 0
+
+        # Document completion rate
+        leads_with_docs = sum(stages[stage] for stage in DOCS_RECEIVED_STAGES)
+        docs_completion_rate = (leads_with_docs / total_leads * 100) if total_leads > 0 else 0
+
+        # Conversion rate (docs to consult)
+        scheduled_leads = stages['scheduled']
+        conversion_rate = (scheduled_leads / leads_with_docs * 100) if leads_with_docs > 0 else 0
+
+        return {
+            'total_leads': total_leads,
+            'stage_distribution': stages,
+            'consent_rate': round(consent_rate, 2),
+            'docs_completion_rate': round(docs_completion_rate, 2),
+            'docs_to_consult_conversion_rate': round(conversion_rate, 2),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+# Global instance
+metrics_service = MetricsService()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Upgrade an existing app.db in place to the indexed, typed Lead schema
+
+- last_touch_iso / consent_timestamp: ISO text -> DATETIME (naive UTC)
+- required_docs / received_docs / missing_docs: JSON text -> lead_document rows
+- composite indexes for the dashboard, reminder, owner and retention queries
+
+Usage: python migrate_lead_schema.py [path/to/app.db]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, inspect
+from src.models.lead import db, Lead, LeadDocument, parse_timestamp
+
+LEGACY_TABLE = 'lead_legacy'
+COPY_CHUNK_SIZE = 20000
+
+def _convert_timestamp(value, stats):
+    try:
+        return parse_timestamp(value)
+    except (TypeError, ValueError):
+        stats['unparseable_timestamps'] += 1
+        return None
+
+def _convert_docs(value, stats):
+    try:
+        docs = json.loads(value) if value else []
+        return [str(doc) for doc in docs] if isinstance(docs, list) else []
+    except ValueError:
+        stats['unparseable_doc_lists'] += 1
+        return []
+
+def _convert_row(row, stats):
+    """Map a legacy lead row to (lead row, lead_document rows)"""
+    lead = {column: row[column] for column in Lead.__table__.columns.keys()}
+    lead['last_touch_iso'] = _convert_timestamp(row['last_touch_iso'], stats)
+    lead['consent_timestamp'] = _convert_timestamp(row['consent_timestamp'], stats)
+
+    required = _convert_docs(row['required_docs'], stats)
+    received = _convert_docs(row['received_docs'], stats)
+    missing = _convert_docs(row['missing_docs'], stats)
+
+    # Receipt time was never recorded; last touch is the closest available
+    received_at = lead['last_touch_iso'] or datetime.utcnow()
+
+    documents = {}
+    for doc_type in required + missing:
+        documents[doc_type] = {'lead_id': row['lead_id'], 'doc_type': doc_type, 'required': True, 'received_at': None}
+    for doc_type in received:
+        if doc_type not in missing:
+            document = documents.setdefault(doc_type, {'lead_id': row['lead_id'], 'doc_type': doc_type, 'required': False})
+            document['received_at'] = received_at
+
+    return lead, list(documents.values())
+
+def needs_migration(engine):
+    inspector = inspect(engine)
+    if not inspector.has_table('lead'):
+        return False
+    return 'required_docs' in {column['name'] for column in inspector.get_columns('lead')}
+
+def migrate(db_path):
+    """Convert the lead table in place; returns migration statistics"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    stats = {'rows': 0, 'documents': 0, 'unparseable_timestamps': 0, 'unparseable_doc_lists': 0}
+
+    if not needs_migration(engine):
+        print("Lead table already uses the current schema (or does not exist); nothing to do")
+        return stats
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"ALTER TABLE lead RENAME TO {LEGACY_TABLE}")
+        db.metadata.create_all(conn, tables=[Lead.__table__, LeadDocument.__table__])
+
+        last_rowid = 0
+        while True:
+            rows = conn.exec_driver_sql(
+                f"SELECT rowid AS legacy_rowid, * FROM {LEGACY_TABLE} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, COPY_CHUNK_SIZE)
+            ).mappings().all()
+            if not rows:
+                break
+
+            lead_rows = []
+            document_rows = []
+            for row in rows:
+                lead, documents = _convert_row(row, stats)
+                lead_rows.append(lead)
+                document_rows.extend(documents)
+
+            conn.execute(Lead.__table__.insert(), lead_rows)
+            if document_rows:
+                conn.execute(LeadDocument.__table__.insert(), document_rows)
+
+            stats['rows'] += len(lead_rows)
+            stats['documents'] += len(document_rows)
+            last_rowid = rows[-1]['legacy_rowid']
+
+        conn.exec_driver_sql(f"DROP TABLE {LEGACY_TABLE}")
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    stats['seconds'] = round(time.perf_counter() - start, 2)
+    return stats
+
+if __name__ == '__main__':
+    default_path = os.path.join(os.path.dirname(__file__), 'src', 'database', 'app.db')
+    db_path = sys.argv[1] if len(sys.argv) > 1 else default_path
+
+    if not os.path.exists(db_path):
+        print(f"Database not found: {db_path}")
+        sys.exit(1)
+
+    print(f"Migrating {db_path}...")
+    result = migrate(db_path)
+    print(f"Migration complete: {result}")
@@ -1,15 +1,20 @@
 from flask import Blueprint, request, jsonify
 from src.services.observability_service import observability_service
 from src.services.security_service import security_service
+from src.services.kpi_service import kpi_service
+from src.services.log_writer import log_writer
+from src.services.health_service import health_service
+from src.services.digest_service import digest_service
+import time
 from datetime import datetime, timedelta
 
 monitoring_bp = Blueprint('monitoring', __name__)
 
 @monitoring_bp.route('/health', methods=['GET'])
 def health_check():
-    """System health check endpoint"""
+    """System health check endpoint (cached snapshot, refreshed in the background)"""
     try:
-        health_status = observability_service.health_check()
+        health_status = health_service.snapshot()
         
         status_code = 200 if health_status['status'] == 'healthy' else 503
         return jsonify(health_status), status_code
@@ -21,6 +26,11 @@ def health_check():
             'timestamp': datetime.utcnow().isoformat()
         }), 503
 
+@monitoring_bp.route('/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe; does not touch the database"""
+    return jsonify(health_service.liveness())
+
 @monitoring_bp.route('/metrics', methods=['GET'])
 def get_metrics():
     """Get system metrics"""
@@ -31,11 +41,18 @@ def get_metrics():
         if metric_name:
             # Get specific metric
             summary = observability_service.get_metrics_summary(metric_name, hours)
-            return jsonify({
+            response = {
                 'metric': metric_name,
                 'period_hours': hours,
                 'summary': summary
-            })
+            }
+            
+            # Latency metrics also carry percentiles over the whole window
+            percentiles = observability_service.get_latency_percentiles(metric_name, hours)
+            if percentiles is not None:
+                response['percentiles'] = percentiles
+            
+            return jsonify(response)
         else:
             # Get all available metrics
             available_metrics = list(observability_service.metrics.keys())
@@ -68,45 +85,92 @@ def get_kpis():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@monitoring_bp.route('/kpis/rebuild', methods=['POST'])
+def rebuild_kpi_counters():
+    """Recount leads and reconcile the KPI counters against the table"""
+    try:
+        result = kpi_service.rebuild()
+        result['timestamp'] = datetime.utcnow().isoformat()
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @monitoring_bp.route('/digest/daily', methods=['GET'])
 def get_daily_digest():
-    """Get daily operational digest"""
+    """Get daily operational digest (today, or ?date=YYYY-MM-DD from history)"""
     try:
-        digest = observability_service.get_daily_digest()
+        date_param = request.args.get('date')
+        try:
+            day = datetime.strptime(date_param, '%Y-%m-%d').date() if date_param else None
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        
+        digest = digest_service.get_digest(day)
+        if digest is None:
+            return jsonify({'error': 'No digest for that date'}), 404
         return jsonify(digest)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@monitoring_bp.route('/digest/range', methods=['GET'])
+def get_digest_range():
+    """Get stored daily digests between start and end (default: last 4 weeks) with per-day trends"""
+    try:
+        try:
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if 'end' in request.args else digest_service.today()
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if 'start' in request.args else end - timedelta(days=27)
+        except ValueError:
+            return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+        
+        if start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        
+        digests = digest_service.get_range(start, end)
+        
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'digests': digests,
+            'trends': {
+                'dates': [digest['date'] for digest in digests],
+                'total_leads': [digest['total_leads'] for digest in digests],
+                'new_leads': [digest['new_leads'] for digest in digests],
+                'stage_transitions': [sum(digest['stage_transitions'].values()) for digest in digests],
+                'active_alerts': [digest['active_alerts'] for digest in digests]
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @monitoring_bp.route('/alerts', methods=['GET'])
 def get_alerts():
     """Get system alerts"""
     try:
         active_only = request.args.get('active_only', 'false').lower() == 'true'
         
-        alerts = observability_service.alerts
-        
-        if active_only:
-            alerts = [alert for alert in alerts if not alert.get('acknowledged', False)]
+        alerts = observability_service.alerts.list(active_only=active_only)
+        counts = observability_service.alerts.counts()
         
         return jsonify({
             'alerts': alerts,
-            'total_count': len(observability_service.alerts),
-            'active_count': len([a for a in observability_service.alerts if not a.get('acknowledged', False)])
+            'total_count': counts['total'],
+            'active_count': counts['active'],
+            'active_by_severity': counts['by_severity']
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@monitoring_bp.route('/alerts/<int:alert_index>/acknowledge', methods=['POST'])
-def acknowledge_alert(alert_index):
-    """Acknowledge an alert"""
+@monitoring_bp.route('/alerts/<alert_id>/acknowledge', methods=['POST'])
+def acknowledge_alert(alert_id):
+    """Acknowledge an alert by its id"""
     try:
-        if 0 <= alert_index < len(observability_service.alerts):
-            observability_service.alerts[alert_index]['acknowledged'] = True
-            observability_service.alerts[alert_index]['acknowledged_at'] = datetime.utcnow().isoformat()
-            
-            return jsonify({'status': 'acknowledged'})
+        alert = observability_service.alerts.acknowledge(alert_id)
+        if alert is not None:
+            return jsonify({'status': 'acknowledged', 'alert': alert})
         else:
             return jsonify({'error': 'Alert not found'}), 404
         
@@ -120,24 +184,21 @@ def get_logs():
         level = request.args.get('level', '').upper()
         event_type = request.args.get('event_type', '')
         limit = int(request.args.get('limit', 100))
+        hours = request.args.get('hours')
         
-        logs = list(observability_service.logs)
-        
-        # Filter by level
-        if level:
-            logs = [log for log in logs if log['level'] == level]
-        
-        # Filter by event type
-        if event_type:
-            logs = [log for log in logs if log['event_type'] == event_type]
-        
-        # Limit results
-        logs = logs[-limit:]
+        # Served from the level/event_type/time indexes instead of scanning every entry
+        logs = observability_service.logs.query(
+            level=level or None,
+            event_type=event_type or None,
+            since=time.time() - float(hours) * 3600 if hours else None,
+            limit=limit
+        )
         
         return jsonify({
             'logs': logs,
             'total_count': len(observability_service.logs),
-            'filtered_count': len(logs)
+            'filtered_count': len(logs),
+            'pipeline': log_writer.stats()
         })
         
     except Exception as e:
@@ -162,45 +223,47 @@ def get_api_performance():
         # Get API response time metrics
         api_metrics = observability_service.get_metrics_summary('api_response_time_ms', hours)
         
-        # Get recent API calls
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        recent_logs = [
-            log for log in observability_service.logs 
-            if log['event_type'] == 'API_CALL' and 
-            datetime.fromisoformat(log['timestamp']) > cutoff_time
-        ]
+        # Per-endpoint counts, error rates and percentiles from the latency sketches,
+        # which cover all traffic in the window rather than the last 1000 log entries
+        latency = observability_service.get_latency_percentiles('api_response_time_ms', hours)
+        api_metrics.update({k: v for k, v in latency['overall'].items() if k.startswith('p')})
         
-        # Group by endpoint
         endpoint_stats = {}
-        for log in recent_logs:
-            endpoint = log['metadata'].get('endpoint', 'unknown')
-            if endpoint not in endpoint_stats:
-                endpoint_stats[endpoint] = {
-                    'count': 0,
-                    'total_duration': 0,
-                    'errors': 0
-                }
-            
-            endpoint_stats[endpoint]['count'] += 1
-            endpoint_stats[endpoint]['total_duration'] += log['metadata'].get('duration_ms', 0)
-            
-            if log['metadata'].get('status_code', 200) >= 400:
-                endpoint_stats[endpoint]['errors'] += 1
-        
-        # Calculate averages
-        for endpoint, stats in endpoint_stats.items():
-            if stats['count'] > 0:
-                stats['avg_duration_ms'] = stats['total_duration'] / stats['count']
-                stats['error_rate'] = (stats['errors'] / stats['count']) * 100
-            else:
-                stats['avg_duration_ms'] = 0
-                stats['error_rate'] = 0
+        for endpoint, stats in latency['breakdown'].items():
+            endpoint_stats[endpoint] = {
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'error_rate': stats['error_rate'],
+                'avg_duration_ms': stats['avg'],
+                'p50_ms': stats['p50'],
+                'p95_ms': stats['p95'],
+                'p99_ms': stats['p99'],
+                'max_ms': stats['max']
+            }
         
         return jsonify({
             'period_hours': hours,
             'overall_metrics': api_metrics,
             'endpoint_stats': endpoint_stats,
-            'total_requests': len(recent_logs)
+            'total_requests': latency['overall']['count']
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@monitoring_bp.route('/performance/workflows', methods=['GET'])
+def get_workflow_performance():
+    """Get workflow latency percentiles per workflow type"""
+    try:
+        hours = int(request.args.get('hours', 24))
+        
+        latency = observability_service.get_latency_percentiles('workflow_duration_ms', hours)
+        
+        return jsonify({
+            'period_hours': hours,
+            'overall_metrics': latency['overall'],
+            'workflow_stats': latency['breakdown'],
+            'total_executions': latency['overall']['count']
         })
         
     except Exception as e:
@@ -210,18 +273,19 @@ def get_api_performance():
 def get_system_status():
     """Get comprehensive system status"""
     try:
-        health = observability_service.health_check()
+        health = health_service.snapshot()
         kpis = observability_service.calculate_kpis()
-        active_alerts = [alert for alert in observability_service.alerts if not alert.get('acknowledged', False)]
+        alert_counts = observability_service.alerts.counts()
         
         status = {
             'timestamp': datetime.utcnow().isoformat(),
             'overall_status': health['status'],
             'health_checks': health['checks'],
+            'health_age_seconds': health['age_seconds'],
             'kpis': kpis,
-            'active_alerts_count': len(active_alerts),
-            'critical_alerts_count': len([a for a in active_alerts if a.get('severity') == 'critical']),
-            'system_uptime': 'N/A',  # Would track actual uptime
+            'active_alerts_count': alert_counts['active'],
+            'critical_alerts_count': alert_counts['critical'],
+            'system_uptime': round(health_service.uptime_seconds()),
             'version': '1.0.0'
         }
         
@@ -0,0 +1,46 @@
+from datetime import datetime
+from src.models.lead import db
+
+class NotificationOutbox(db.Model):
+    """A rendered e-mail or SMS written in the same transaction as the change that caused it, sent later"""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        # Claiming: next pending messages on one channel that are due
+        db.Index('ix_notification_outbox_claim', 'status', 'channel', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.String, primary_key=True)
+    channel = db.Column(db.String, nullable=False)                 # email, sms
+    dedup_key = db.Column(db.String, nullable=False, unique=True)  # one message per key, however often it is enqueued
+    lead_id = db.Column(db.String, index=True)
+    template = db.Column(db.String)
+    recipient = db.Column(db.String, nullable=False)
+    subject = db.Column(db.String)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String, nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String)
+    locked_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        # Recipient and body stay out of API responses (PHI)
+        return {
+            'message_id': self.id,
+            'channel': self.channel,
+            'dedup_key': self.dedup_key,
+            'lead_id': self.lead_id,
+            'template': self.template,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.status == 'pending' else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
@@ -1,49 +1,260 @@
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from functools import lru_cache
 import os
-from datetime import datetime
+from src.services.email_delivery import create_transport
+from src.services.template_engine import compile_template, compile_partial, TemplateError
+
+# Values a template may reference ("Email Variables to Replace" in EMAIL_TEMPLATES.html)
+TEMPLATE_VARIABLES = (
+    'first_name', 'last_name', 'email', 'phone', 'consultation_date', 'consultation_time',
+    'upload_link', 'consent_link', 'missing_docs'
+)
+
+# Plain-text bodies of the templates in EMAIL_TEMPLATES.html
+EMAIL_TEMPLATES = {
+    # Template 1: sent when the follow-up goes out for a new inquiry
+    'initial_followup': {
+        'subject': 'Next Steps for Your Consultation at An Oasis of Healing',
+        'required': ('first_name', 'upload_link', 'consent_link'),
+        'body': """Hello {first_name},
+
+Thank you for your interest in An Oasis of Healing. We're committed to providing you with comprehensive, personalized cancer care.
+
+Next steps:
+1. Upload Medical Records: please upload your recent medical records using this secure link:
+   {upload_link}
+2. Complete HIPAA Consent: review and sign our HIPAA authorization form:
+   {consent_link}
+3. Schedule Consultation: once we receive your documents, we'll contact you to schedule your consultation with Dr. Bardwell.
+
+Required documents:
+- Recent imaging reports (CT, MRI, PET scans)
+- Pathology reports
+- Laboratory results
+- Current medication list
+- Previous treatment notes
+
+Questions? Please don't hesitate to contact our admissions team at (480) 834-5414.
+
+We look forward to supporting you on your healing journey.
+
+Warm regards,
+The Admissions Team
+An Oasis of Healing"""
+    },
+    # Template 2: sent 3 days after the document request if nothing arrived
+    'document_reminder': {
+        'subject': 'Reminder: Medical Records Needed for Your Consultation',
+        'required': ('first_name', 'missing_docs', 'upload_link'),
+        'body': """Hello {first_name},
+
+We're still waiting for your medical records to schedule your consultation with Dr. Bardwell.
+
+Still needed:
+{missing_docs}
+
+Upload your documents securely here: {upload_link}
+
+Need help? Call us at (480) 834-5414 or email admissions@anoasisofhealing.com.
+
+Best regards,
+The Admissions Team"""
+    },
+    # Template 3: all documents received and consent signed
+    'consultation_ready': {
+        'subject': 'Ready to Schedule Your Consultation with Dr. Bardwell',
+        'required': ('first_name', 'consultation_date'),
+        'body': """Great News, {first_name}!
+
+We've received all your medical records and HIPAA consent. You're ready to schedule your consultation!
+
+Dr. Bardwell is available for consultations on Fridays. Please choose from the following available times:
+- Friday, {consultation_date} at 9:00 AM
+- Friday, {consultation_date} at 11:00 AM
+- Friday, {consultation_date} at 2:00 PM
+- Friday, {consultation_date} at 4:00 PM
+
+What to expect:
+- Duration: 60-90 minutes
+- Format: In-person or virtual consultation available
+- Preparation: Review your medical history and prepare questions
+
+Questions about scheduling? Call us at (480) 834-5414.
+
+Best regards,
+Dr. Bardwell's Team
+An Oasis of Healing"""
+    },
+    # Template 4: consultation scheduled
+    'consultation_confirmed': {
+        'subject': 'Consultation Confirmed - Friday, {consultation_date} at {consultation_time}',
+        'required': ('first_name', 'consultation_date', 'consultation_time'),
+        'body': """Hello {first_name},
+
+Your consultation is confirmed for Friday, {consultation_date} at {consultation_time} (Arizona Time).
+
+Consultation details:
+- Duration: 60-90 minutes
+- Location: An Oasis of Healing, 13230 N 92nd St, Scottsdale, AZ 85260
+- With: Dr. Bardwell
+
+Before your visit:
+- Arrive 15 minutes early for check-in
+- Bring a valid ID and insurance cards
+- Prepare a list of current medications
+- Write down any questions you have
+
+Need to reschedule? Please call us at least 24 hours in advance: (480) 834-5414.
+
+Best regards,
+Dr. Bardwell's Team"""
+    }
+}
+
+# SMS bodies carry no PHI: a name and a link at most
+SMS_TEMPLATES = {
+    'document_reminder': {
+        'required': ('first_name', 'upload_link'),
+        'body': 'Hi {first_name}, this is An Oasis of Healing. We still need your medical records to schedule your '
+                'consultation. Upload securely: {upload_link} Questions? (480) 834-5414'
+    },
+    'consultation_confirmed': {
+        'required': ('first_name', 'consultation_date', 'consultation_time'),
+        'body': 'Hi {first_name}, your consultation with Dr. Bardwell is confirmed for Friday, {consultation_date} '
+                'at {consultation_time} (Arizona Time). To reschedule call (480) 834-5414.'
+    }
+}
+
+@lru_cache(maxsize=256)
+def _adhoc_template(text, fields):
+    """Compiled form of a caller-supplied body, cached by text and the variable names given"""
+    return compile_partial('adhoc', text, dict.fromkeys(fields))
 
 class NotificationService:
+    """E-mail and SMS sending on top of templates compiled once at startup
+
+    A template with a placeholder outside TEMPLATE_VARIABLES, or one that
+    lacks a placeholder it requires, raises TemplateError when the service
+    is constructed. render_batch() fills one template for a whole
+    campaign in a single call.
+    """
+
     def __init__(self):
         # Email configuration (placeholder - would use real SMTP settings)
         self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_username = os.getenv('SMTP_USERNAME', 'admissions@oasisofhealing.com')
         self.smtp_password = os.getenv('SMTP_PASSWORD', 'password')
-        
+
+        # EMAIL_TRANSPORT=smtp delivers through a pooled, rate-limited SMTP client; file writes to a local sink
+        self.email_transport = create_transport(
+            os.getenv('EMAIL_TRANSPORT', 'console'),
+            self.smtp_username, self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password
+        )
+
         # SMS configuration (placeholder - would use Twilio or similar)
         self.sms_enabled = os.getenv('SMS_ENABLED', 'false').lower() == 'true'
-    
+
+        self.email_templates = {
+            name: (
+                compile_template(f'{name}.subject', spec['subject'], TEMPLATE_VARIABLES),
+                compile_template(f'{name}.body', spec['body'], TEMPLATE_VARIABLES, spec['required'])
+            )
+            for name, spec in EMAIL_TEMPLATES.items()
+        }
+        self.sms_templates = {
+            name: compile_template(f'sms.{name}', spec['body'], TEMPLATE_VARIABLES, spec['required'])
+            for name, spec in SMS_TEMPLATES.items()
+        }
+
+    def _email_template(self, template_name):
+        try:
+            return self.email_templates[template_name]
+        except KeyError:
+            raise TemplateError(f'Unknown email template: {template_name}') from None
+
+    def render_email(self, template_name, values):
+        """(subject, body) for one recipient"""
+        subject, body = self._email_template(template_name)
+        return subject.render(values), body.render(values)
+
+    def render_batch(self, template_name, rows):
+        """[(subject, body)] for a list of value dicts, e.g. a reminder or digest campaign"""
+        subject, body = self._email_template(template_name)
+        return list(zip(subject.render_many(rows), body.render_many(rows)))
+
+    def render_sms_batch(self, template_name, rows):
+        try:
+            template = self.sms_templates[template_name]
+        except KeyError:
+            raise TemplateError(f'Unknown SMS template: {template_name}') from None
+        return template.render_many(rows)
+
     def send_email(self, to_email, subject, body, template_vars=None):
         """Send an email notification"""
         try:
-            # Replace template variables
+            # Replace template variables; placeholders without a value stay as written
             if template_vars:
-                for key, value in template_vars.items():
-                    body = body.replace(f'{{{key}}}', str(value))
-            
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # In a real implementation, this would actually send the email
-            print(f"EMAIL SENT TO: {to_email}")
-            print(f"SUBJECT: {subject}")
-            print(f"BODY: {body}")
-            print("---")
-            
+                body = _adhoc_template(body, frozenset(template_vars)).render(template_vars)
+
+            error = self.email_transport.send_many([(to_email, subject, body)])[0]
+            if error:
+                print(f"Error sending email to {to_email}: {error}")
+                return False
             return True
         except Exception as e:
             print(f"Error sending email: {e}")
             return False
-    
+
+    def send_email_batch(self, messages):
+        """Send [(to_email, subject, body)] through the transport in one call; returns a success flag per message"""
+        try:
+            errors = self.email_transport.send_many(messages)
+        except Exception as e:
+            print(f"Error sending email batch: {e}")
+            return [False] * len(messages)
+
+        for (to_email, _, _), error in zip(messages, errors):
+            if error:
+                print(f"Error sending email to {to_email}: {error}")
+        return [error is None for error in errors]
+
     def send_sms(self, to_phone, message, template_vars=None):
         """Send an SMS notification"""
         try:
-            # Replace template variables
+            # Replace template variables; placeholders without a value stay as written
             if template_vars:
-                for key, value in template_vars.items():
-                    message = message.replace(f'{{{key}}}', str(value))
+                message = _adhoc_template(message, frozenset(template_vars)).render(template_vars)
+
+            if not self.sms_enabled:
+                print(f"SMS DISABLED, NOT SENT TO: {to_phone}")
+                return False
+
+            # In a real implementation, this would call the SMS provider
+            print(f"SMS SENT TO: {to_phone}")
+            print(f"MESSAGE: {message}")
+            print("---")
+
+            return True
+        except Exception as e:
+            print(f"Error sending SMS: {e}")
+            return False
+
+    def send_template_email(self, template_name, to_email, values):
+        """Render a registered template and send it"""
+        try:
+            subject, body = self.render_email(template_name, values)
+        except TemplateError as e:
+            print(f"Error rendering email: {e}")
+            return False
+        return self.send_email(to_email, subject, body)
+
+    def send_secure_upload_and_consent(self, lead_data, upload_link, consent_link):
+        """Template 1: upload link and HIPAA consent link for a new inquiry"""
+        return self.send_template_email('initial_followup', lead_data['email'], {
+            **lead_data,
+            'upload_link': upload_link,
+            'consent_link': consent_link
+        })
+
+# Global instance
+notification_service = NotificationService()
@@ -1,15 +1,31 @@
-import json
+import os
 import time
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
-from src.models.lead import Lead
+from collections import defaultdict
+from sqlalchemy import text
+from src.models.lead import db, DOCS_RECEIVED_STAGES
+from src.services.kpi_service import kpi_service
+from src.services.metric_store import MetricStore
+from src.services.quantile_sketch import DDSketch, WindowedSketches
+from src.services.log_writer import log_writer
+from src.services.log_store import LogStore
+from src.services.alert_store import AlertStore
 
 class ObservabilityService:
     def __init__(self):
-        # In-memory metrics storage (in production, would use proper metrics store)
-        self.metrics = defaultdict(list)
-        self.logs = deque(maxlen=1000)  # Keep last 1000 log entries
-        self.alerts = []
+        # In-memory metrics storage: fixed-size ring per metric (in production, would use proper metrics store)
+        self.metrics = MetricStore(capacity=1000)
+        # Latency percentiles over all traffic, keyed by (endpoint or workflow type, succeeded)
+        self.latency_sketches = {
+            'api_response_time_ms': WindowedSketches(),
+            'workflow_duration_ms': WindowedSketches()
+        }
+        # Indexed by level, event_type and time; warmed from the on-disk log when LOG_FILE is set
+        self.logs = LogStore(capacity=int(os.getenv('LOG_RETENTION_ENTRIES', '50000')))
+        if log_writer.path:
+            self.logs.load(log_writer.path)
+        # Repeats of an active alert are coalesced into one entry with a count
+        self.alerts = AlertStore(capacity=int(os.getenv('ALERT_CAPACITY', '500')))
         
         # Performance thresholds
         self.thresholds = {
@@ -30,25 +46,14 @@ class ObservabilityService:
         }
         
         self.logs.append(log_entry)
-        
-        # Print to console (in production, would send to proper logging system)
-        print(f"[{level}] {event_type}: {message}")
-        if metadata:
-            print(f"  Metadata: {json.dumps(metadata, indent=2)}")
+
+        # Serialisation and I/O happen on the log writer thread, off the caller's path
+        log_writer.write(log_entry)
     
     def record_metric(self, metric_name, value, tags=None):
         """Record a metric value"""
-        metric_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'value': value,
-            'tags': tags or {}
-        }
-        
-        self.metrics[metric_name].append(metric_entry)
-        
-        # Keep only last 1000 entries per metric
-        if len(self.metrics[metric_name]) > 1000:
-            self.metrics[metric_name] = self.metrics[metric_name][-1000:]
+        # O(1) append; the ring keeps the last 1000 entries per metric
+        self.metrics.record(metric_name, value, tags)
         
         # Check thresholds
         self.check_threshold(metric_name, value)
@@ -68,21 +73,25 @@ class ObservabilityService:
                     'severity': 'warning'
                 }
                 
-                self.alerts.append(alert)
-                self.log_event('ALERT', f'Threshold exceeded: {metric_name} = {value} > {threshold}', 'WARNING', alert)
+                alert, is_new = self.alerts.raise_alert(('threshold_exceeded', metric_name), alert)
+                if is_new:
+                    self.log_event('ALERT', f'Threshold exceeded: {metric_name} = {value} > {threshold}', 'WARNING', dict(alert))
     
-    def track_api_performance(self, endpoint, duration_ms, status_code):
-        """Track API endpoint performance"""
+    def track_api_performance(self, endpoint, duration_ms, status_code, details=None, log=True):
+        """Track API endpoint performance (log=False records metrics without the API_CALL log line)"""
         self.record_metric('api_response_time_ms', duration_ms, {
             'endpoint': endpoint,
             'status_code': status_code
         })
-        
-        self.log_event('API_CALL', f'{endpoint} completed in {duration_ms}ms', 'INFO', {
-            'endpoint': endpoint,
-            'duration_ms': duration_ms,
-            'status_code': status_code
-        })
+        self.latency_sketches['api_response_time_ms'].add((endpoint, status_code < 400), duration_ms)
+
+        if log:
+            self.log_event('API_CALL', f'{endpoint} completed in {duration_ms}ms', 'INFO', {
+                'endpoint': endpoint,
+                'duration_ms': duration_ms,
+                'status_code': status_code,
+                **(details or {})
+            })
     
     def track_lead_progression(self, lead_id, from_stage, to_stage):
         """Track lead stage progression"""
@@ -104,6 +113,7 @@ class ObservabilityService:
             'workflow_type': workflow_type,
             'success': success
         })
+        self.latency_sketches['workflow_duration_ms'].add((workflow_type, bool(success)), duration_ms)
         
         if not success:
             self.record_metric('workflow_failures', 1, {
@@ -121,9 +131,9 @@ class ObservabilityService:
     def calculate_kpis(self):
         """Calculate key performance indicators"""
         try:
-            # Get all leads
-            leads = Lead.query.all()
-            total_leads = len(leads)
+            # Lead counts come from the incrementally maintained counters
+            counts = kpi_service.snapshot()
+            total_leads = counts['total_leads']
             
             if total_leads == 0:
                 return {
@@ -135,31 +145,28 @@ class ObservabilityService:
                 }
             
             # Docs to consult conversion rate
-            docs_received_leads = [l for l in leads if l.stage in ['docs_received', 'clinical_review', 'consult_ready', 'scheduled', 'decision']]
-            scheduled_leads = [l for l in leads if l.stage in ['scheduled', 'decision']]
+            docs_received_leads = sum(counts['stage_counts'][stage] for stage in DOCS_RECEIVED_STAGES)
+            scheduled_leads = counts['stage_counts']['scheduled'] + counts['stage_counts']['decision']
             
-            docs_to_consult_conversion = (len(scheduled_leads) / len(docs_received_leads) * 100) if docs_received_leads else 0
+            docs_to_consult_conversion = (scheduled_leads / docs_received_leads * 100) if docs_received_leads else 0
             
             # Median docs completion time (simulated)
-            completion_times = []
-            for lead in docs_received_leads:
-                if lead.last_touch_iso:
-                    # Simulate completion time (in real system, would track actual times)
-                    completion_times.append(3)  # Assume 3 days average
-            
-            median_docs_completion_days = sorted(completion_times)[len(completion_times)//2] if completion_times else 0
+            # Simulate completion time (in real system, would track actual times)
+            touched_docs_leads = sum(counts['touched_by_stage'][stage] for stage in DOCS_RECEIVED_STAGES)
+            median_docs_completion_days = 3 if touched_docs_leads else 0  # Assume 3 days average
             
             # Consult overrun rate (simulated - would track actual consult durations)
             consult_overrun_rate = 5  # Assume 5% overrun rate
             
             # Automation failure rate
-            workflow_failures = sum(entry['value'] for entry in self.metrics.get('workflow_failures', []))
-            total_workflows = len(self.metrics.get('workflow_duration_ms', []))
+            failures_series = self.metrics.get('workflow_failures')
+            workflow_failures = sum(failures_series.values()) if failures_series else 0
+            durations_series = self.metrics.get('workflow_duration_ms')
+            total_workflows = len(durations_series) if durations_series else 0
             automation_failure_rate = (workflow_failures / total_workflows * 100) if total_workflows > 0 else 0
             
             # Consent compliance rate
-            consented_leads = [l for l in leads if l.has_consent]
-            consent_compliance_rate = (len(consented_leads) / total_leads * 100) if total_leads > 0 else 0
+            consent_compliance_rate = (counts['consented_leads'] / total_leads * 100) if total_leads > 0 else 0
             
             kpis = {
                 'docs_to_consult_conversion': round(docs_to_consult_conversion, 2),
@@ -192,42 +199,32 @@ class ObservabilityService:
             'acknowledged': False
         }
         
-        self.alerts.append(alert)
-        self.log_event('ALERT', message, severity.upper(), alert)
+        alert, is_new = self.alerts.raise_alert((alert_type, message), alert)
+        if is_new:
+            self.log_event('ALERT', message, severity.upper(), dict(alert))
+        return alert
     
     def get_daily_digest(self):
         """Generate daily operational digest"""
         try:
             # Get leads by stage
-            leads = Lead.query.all()
-            stage_counts = defaultdict(int)
-            
-            for lead in leads:
-                stage_counts[lead.stage] += 1
+            counts = kpi_service.snapshot()
+            stage_counts = {stage: count for stage, count in counts['stage_counts'].items() if count}
             
             # Get recent activity (last 24 hours)
-            yesterday = datetime.utcnow() - timedelta(days=1)
-            recent_logs = [
-                log for log in self.logs 
-                if datetime.fromisoformat(log['timestamp']) > yesterday
-            ]
-            
-            # Count events by type
-            event_counts = defaultdict(int)
-            for log in recent_logs:
-                event_counts[log['event_type']] += 1
+            event_counts = self.logs.counts_by_event_type(since=time.time() - 24 * 3600)
             
             # Get active alerts
-            active_alerts = [alert for alert in self.alerts if not alert.get('acknowledged', False)]
+            active_alerts = self.alerts.counts()['active']
             
             digest = {
                 'date': datetime.utcnow().date().isoformat(),
-                'lead_counts': dict(stage_counts),
-                'total_leads': len(leads),
+                'lead_counts': stage_counts,
+                'total_leads': counts['total_leads'],
                 'recent_activity': dict(event_counts),
-                'active_alerts': len(active_alerts),
+                'active_alerts': active_alerts,
                 'kpis': self.calculate_kpis(),
-                'system_health': 'healthy' if len(active_alerts) == 0 else 'attention_needed'
+                'system_health': 'healthy' if active_alerts == 0 else 'attention_needed'
             }
             
             return digest
@@ -239,81 +236,91 @@ class ObservabilityService:
     def get_metrics_summary(self, metric_name, hours=24):
         """Get summary statistics for a metric over time period"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            
-            recent_metrics = [
-                entry for entry in self.metrics.get(metric_name, [])
-                if datetime.fromisoformat(entry['timestamp']) > cutoff_time
-            ]
-            
-            if not recent_metrics:
+            series = self.metrics.get(metric_name)
+            if series is None:
                 return {'count': 0, 'avg': 0, 'min': 0, 'max': 0}
             
-            values = [entry['value'] for entry in recent_metrics]
-            
-            return {
-                'count': len(values),
-                'avg': sum(values) / len(values),
-                'min': min(values),
-                'max': max(values),
-                'latest': values[-1] if values else 0
-            }
+            # Binary search for the window start instead of parsing every timestamp
+            cutoff = time.time() - hours * 3600
+            return series.summary(since=cutoff)
             
         except Exception as e:
             self.log_event('ERROR', f'Error getting metrics summary: {e}', 'ERROR')
             return {}
     
-    def health_check(self):
-        """Perform system health check"""
-        health_status = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'status': 'healthy',
-            'checks': {}
-        }
+    def get_latency_percentiles(self, metric_name, hours=24):
+        """p50/p95/p99 for a latency metric, overall and per endpoint or workflow type"""
+        sketches = self.latency_sketches.get(metric_name)
+        if sketches is None:
+            return None
         
+        overall = DDSketch()
+        by_name = defaultdict(DDSketch)
+        failures = defaultdict(int)
+        for name, succeeded in sketches.keys():
+            sketch = sketches.merged((name, succeeded), hours)
+            if not sketch.count:
+                continue
+            overall.merge(sketch)
+            by_name[name].merge(sketch)
+            if not succeeded:
+                failures[name] += sketch.count
+        
+        breakdown = {}
+        for name, sketch in by_name.items():
+            stats = sketch.summary()
+            stats['errors'] = failures[name]
+            stats['error_rate'] = round(failures[name] / sketch.count * 100, 2)
+            breakdown[name] = stats
+        
+        return {
+            'overall': overall.summary(),
+            'breakdown': breakdown
+        }
+    
+    def check_database(self):
+        """Database reachability; lead count comes from the KPI counter table, not a table scan"""
         try:
-            # Database connectivity
-            lead_count = Lead.query.count()
-            health_status['checks']['database'] = {
+            db.session.execute(text('SELECT 1'))
+            return {
                 'status': 'healthy',
-                'lead_count': lead_count
+                'lead_count': kpi_service.snapshot()['total_leads']
             }
         except Exception as e:
-            health_status['checks']['database'] = {
+            db.session.rollback()
+            return {
                 'status': 'unhealthy',
                 'error': str(e)
             }
-            health_status['status'] = 'unhealthy'
-        
-        # Check for recent errors
-        recent_errors = [
-            log for log in self.logs 
-            if log['level'] == 'ERROR' and 
-            datetime.fromisoformat(log['timestamp']) > datetime.utcnow() - timedelta(hours=1)
-        ]
-        
-        health_status['checks']['error_rate'] = {
-            'status': 'healthy' if len(recent_errors) < 5 else 'unhealthy',
-            'recent_errors': len(recent_errors)
+    
+    def check_error_rate(self):
+        recent_errors = self.logs.count(level='ERROR', since=time.time() - 3600)
+        return {
+            'status': 'healthy' if recent_errors < 5 else 'unhealthy',
+            'recent_errors': recent_errors
         }
-        
-        if len(recent_errors) >= 5:
-            health_status['status'] = 'unhealthy'
-        
-        # Check active alerts
-        active_alerts = [alert for alert in self.alerts if not alert.get('acknowledged', False)]
-        critical_alerts = [alert for alert in active_alerts if alert.get('severity') == 'critical']
-        
-        health_status['checks']['alerts'] = {
-            'status': 'healthy' if len(critical_alerts) == 0 else 'unhealthy',
-            'active_alerts': len(active_alerts),
-            'critical_alerts': len(critical_alerts)
+    
+    def check_alerts(self):
+        alert_counts = self.alerts.counts()
+        return {
+            'status': 'healthy' if alert_counts['critical'] == 0 else 'unhealthy',
+            'active_alerts': alert_counts['active'],
+            'critical_alerts': alert_counts['critical']
+        }
+    
+    def health_check(self):
+        """Perform system health check (synchronously; /api/health serves health_service's cached snapshot)"""
+        checks = {
+            'database': self.check_database(),
+            'error_rate': self.check_error_rate(),
+            'alerts': self.check_alerts()
         }
         
-        if len(critical_alerts) > 0:
-            health_status['status'] = 'unhealthy'
-        
-        return health_status
+        return {
+            'timestamp': datetime.utcnow().isoformat(),
+            'status': 'healthy' if all(check['status'] == 'healthy' for check in checks.values()) else 'unhealthy',
+            'checks': checks
+        }
 
 # Global instance
 observability_service = ObservabilityService()
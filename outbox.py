@@ -0,0 +1,35 @@
+from flask import Blueprint, jsonify
+from src.services.outbox_service import outbox_service
+
+outbox_bp = Blueprint('outbox', __name__)
+
+@outbox_bp.route('/outbox/stats', methods=['GET'])
+def get_outbox_stats():
+    """Queued, sent and failed notification counts per channel"""
+    try:
+        return jsonify(outbox_service.stats())
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@outbox_bp.route('/outbox/leads/<lead_id>', methods=['GET'])
+def get_lead_notifications(lead_id):
+    """Delivery state of every notification queued for a lead"""
+    try:
+        messages = outbox_service.messages_for_lead(lead_id)
+        return jsonify({'lead_id': lead_id, 'messages': [message.to_dict() for message in messages]})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@outbox_bp.route('/outbox/<message_id>/retry', methods=['POST'])
+def retry_notification(message_id):
+    """Requeue a notification that ran out of attempts"""
+    try:
+        message = outbox_service.retry(message_id)
+        if message is None:
+            return jsonify({'error': 'Message not found'}), 404
+        return jsonify(message.to_dict())
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,380 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.models.lead import db
+from src.models.notification_outbox import NotificationOutbox
+from src.services.notification_service import notification_service
+from src.services.database_config import conflict_insert
+
+CHANNELS = ('email', 'sms')
+
+class OutboxService:
+    """Transactional outbox for e-mail and SMS, drained by per-channel dispatcher threads
+
+    enqueue() only adds a row to the caller's session. The message is
+    committed, or rolled back, with the stage change that caused it, and
+    no provider is called inside the workflow. Dispatchers claim due
+    messages in batches of OUTBOX_BATCH_SIZE and hand each batch to the
+    channel's sender. OUTBOX_EMAIL_CONCURRENCY and OUTBOX_SMS_CONCURRENCY
+    set how many batches per channel are in flight in one process.
+
+    Delivery is at least once. A message whose dispatcher died after
+    sending but before recording the result is claimed again after
+    OUTBOX_LOCK_TIMEOUT_SECONDS. The dedup key makes enqueueing
+    idempotent: a retried workflow does not queue a second copy.
+
+    Sent and failed messages are deleted OUTBOX_RETENTION_DAYS after
+    their last update, so recipients and rendered bodies are not kept
+    indefinitely. Dedup keys are only remembered for that long.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+        self.concurrency = {
+            'email': int(os.getenv('OUTBOX_EMAIL_CONCURRENCY', '2')),
+            'sms': int(os.getenv('OUTBOX_SMS_CONCURRENCY', '1'))
+        }
+        self.max_attempts = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+        self.backoff_seconds = float(os.getenv('OUTBOX_BACKOFF_SECONDS', '30'))
+        self.max_backoff_seconds = float(os.getenv('OUTBOX_MAX_BACKOFF_SECONDS', '3600'))
+        self.lock_timeout_seconds = int(os.getenv('OUTBOX_LOCK_TIMEOUT_SECONDS', '300'))
+        self.poll_interval_seconds = float(os.getenv('OUTBOX_POLL_INTERVAL_SECONDS', '1'))
+        self.retention_days = int(os.getenv('OUTBOX_RETENTION_DAYS', '30'))
+        self.purge_batch_size = int(os.getenv('OUTBOX_PURGE_BATCH_SIZE', '1000'))
+
+        self.senders = {
+            'email': self._send_email,
+            'sms': self._send_sms
+        }
+        self._wakeup = {channel: threading.Event() for channel in CHANNELS}
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_stale_check = 0.0
+        self._last_purge = 0.0
+
+        # Wake the dispatchers once the enqueuing transaction is committed, not before
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+
+    def _after_commit(self, session):
+        for channel in session.info.pop('outbox_channels', ()):
+            self._wakeup[channel].set()
+
+    def _after_rollback(self, session):
+        session.info.pop('outbox_channels', None)
+
+    # Enqueueing (inside the caller's transaction)
+
+    def enqueue(self, channel, recipient, body, dedup_key, subject=None, lead_id=None, template=None):
+        """Stage a message in the current session; returns (message_id, created)
+
+        Nothing is committed here. A dedup key that already exists returns
+        the existing message with created=False. The insert skips a
+        conflicting key instead of failing, so two workflows enqueueing
+        the same key at once never abort the caller's transaction.
+        """
+        if channel not in self.senders:
+            raise ValueError(f'Unknown notification channel: {channel}')
+
+        table = NotificationOutbox.__table__
+        now = datetime.utcnow()
+        message_id = str(uuid.uuid4())
+        values = {
+            'id': message_id,
+            'channel': channel,
+            'dedup_key': dedup_key,
+            'lead_id': lead_id,
+            'template': template,
+            'recipient': recipient,
+            'subject': subject,
+            'body': body,
+            'status': 'pending',
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'next_attempt_at': now,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        insert = conflict_insert(db.session.get_bind().dialect.name, table)
+        if insert is not None:
+            created = db.session.execute(
+                insert.values(**values).on_conflict_do_nothing(index_elements=['dedup_key'])
+            ).rowcount == 1
+        else:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(**values))
+                created = True
+            except IntegrityError:
+                created = False
+
+        if not created:
+            message_id = db.session.execute(
+                db.select(table.c.id).where(table.c.dedup_key == dedup_key)
+            ).scalar_one()
+            return message_id, False
+
+        db.session.info.setdefault('outbox_channels', set()).add(channel)
+        return message_id, True
+
+    def enqueue_template_email(self, template_name, to_email, values, dedup_key, lead_id=None):
+        """Render a registered template now and stage it; rendering errors raise TemplateError to the caller"""
+        subject, body = notification_service.render_email(template_name, values)
+        return self.enqueue('email', to_email, body, dedup_key, subject=subject, lead_id=lead_id,
+                            template=template_name)
+
+    # Dispatching
+
+    def claim_batch(self, channel, worker_id):
+        """Move up to batch_size due messages on one channel to 'sending' for this worker; returns their rows"""
+        table = NotificationOutbox.__table__
+        now = datetime.utcnow()
+
+        ids = db.session.execute(
+            db.select(table.c.id)
+            .where((table.c.status == 'pending') & (table.c.channel == channel) & (table.c.next_attempt_at <= now))
+            .order_by(table.c.next_attempt_at)
+            .limit(self.batch_size)
+        ).scalars().all()
+        if not ids:
+            db.session.commit()
+            return []
+
+        # The status guard makes the claim safe against other dispatchers and processes
+        db.session.execute(
+            table.update()
+            .where(table.c.id.in_(ids) & (table.c.status == 'pending'))
+            .values(status='sending', locked_by=worker_id, locked_at=now,
+                    attempts=table.c.attempts + 1, updated_at=now)
+        )
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.recipient, table.c.subject, table.c.body,
+                      table.c.attempts, table.c.max_attempts)
+            .where(table.c.id.in_(ids) & (table.c.status == 'sending') & (table.c.locked_by == worker_id))
+        ).all()
+        db.session.commit()
+        return rows
+
+    def _send_email(self, rows):
+        return notification_service.email_transport.send_many(
+            [(row.recipient, row.subject, row.body) for row in rows]
+        )
+
+    def _send_sms(self, rows):
+        return [
+            None if notification_service.send_sms(row.recipient, row.body) else 'SMS not sent'
+            for row in rows
+        ]
+
+    def backoff_for(self, attempts):
+        return min(self.backoff_seconds * (2 ** (attempts - 1)), self.max_backoff_seconds)
+
+    def record_results(self, rows, errors):
+        """Mark sent messages, and reschedule or fail the rest"""
+        table = NotificationOutbox.__table__
+        now = datetime.utcnow()
+
+        sent = [row.id for row, error in zip(rows, errors) if error is None]
+        if sent:
+            db.session.execute(
+                table.update()
+                .where(table.c.id.in_(sent))
+                .values(status='sent', sent_at=now, locked_by=None, locked_at=None, error=None, updated_at=now)
+            )
+
+        for row, error in zip(rows, errors):
+            if error is None:
+                continue
+            if row.attempts < row.max_attempts:
+                values = {'status': 'pending', 'next_attempt_at': now + timedelta(seconds=self.backoff_for(row.attempts))}
+            else:
+                values = {'status': 'failed'}
+            db.session.execute(
+                table.update()
+                .where(table.c.id == row.id)
+                .values(locked_by=None, locked_at=None, error=error, updated_at=now, **values)
+            )
+
+        db.session.commit()
+        return len(sent)
+
+    def dispatch_batch(self, channel, worker_id=None):
+        """Claim, send and record one batch; returns (claimed, sent)"""
+        rows = self.claim_batch(channel, worker_id or f'inline-{os.getpid()}-{uuid.uuid4().hex[:6]}')
+        if not rows:
+            return 0, 0
+
+        try:
+            errors = self.senders[channel](rows)
+        except Exception as e:
+            errors = [f'Sender error: {e}'] * len(rows)
+        return len(rows), self.record_results(rows, errors)
+
+    def dispatch_pending(self, channel=None):
+        """Drain every due message inline (scripts and tests, or with the dispatchers disabled)"""
+        totals = {'claimed': 0, 'sent': 0}
+        for name in ([channel] if channel else CHANNELS):
+            while True:
+                claimed, sent = self.dispatch_batch(name)
+                if not claimed:
+                    break
+                totals['claimed'] += claimed
+                totals['sent'] += sent
+        return totals
+
+    def requeue_stale(self):
+        """Return messages whose dispatcher stopped responding; they are sent again"""
+        table = NotificationOutbox.__table__
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.lock_timeout_seconds)
+
+        requeued = db.session.execute(
+            table.update()
+            .where((table.c.status == 'sending') & (table.c.locked_at < cutoff))
+            .values(status='pending', locked_by=None, locked_at=None, next_attempt_at=now, updated_at=now)
+        ).rowcount
+        db.session.commit()
+        return requeued
+
+    def retry(self, message_id):
+        """Put a failed message back on the queue with a fresh attempt budget; returns it, or None if not found"""
+        message = db.session.get(NotificationOutbox, message_id)
+        if message is None:
+            return None
+        if message.status == 'failed':
+            now = datetime.utcnow()
+            message.status = 'pending'
+            message.attempts = 0
+            message.next_attempt_at = now
+            message.updated_at = now
+            db.session.info.setdefault('outbox_channels', set()).add(message.channel)
+            db.session.commit()
+        return message
+
+    def stats(self):
+        """Message counts by channel and status, plus the age of the oldest due message per channel"""
+        table = NotificationOutbox.__table__
+        counts = {channel: {} for channel in CHANNELS}
+        for channel, status, count in db.session.execute(
+            db.select(table.c.channel, table.c.status, func.count()).group_by(table.c.channel, table.c.status)
+        ):
+            counts.setdefault(channel, {})[status] = count
+
+        now = datetime.utcnow()
+        oldest = {}
+        for channel, next_attempt_at in db.session.execute(
+            db.select(table.c.channel, func.min(table.c.next_attempt_at))
+            .where(table.c.status == 'pending')
+            .group_by(table.c.channel)
+        ):
+            oldest[channel] = round(max(0.0, (now - next_attempt_at).total_seconds()), 1)
+
+        return {
+            'counts': counts,
+            'oldest_due_seconds': oldest,
+            'concurrency': self.concurrency,
+            'dispatchers_running': len(self._threads),
+            'timestamp': now.isoformat()
+        }
+
+    def purge_delivered(self, retention_days=None):
+        """Delete sent and failed messages last updated more than retention_days ago; returns the number deleted"""
+        table = NotificationOutbox.__table__
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days if retention_days is None else retention_days)
+        where = table.c.status.in_(('sent', 'failed')) & (table.c.updated_at < cutoff)
+
+        # Batched like the lead purge, so the writer lock is released between batches
+        deleted = 0
+        while True:
+            batch = db.select(table.c.id).where(where).limit(self.purge_batch_size)
+            count = db.session.execute(table.delete().where(table.c.id.in_(batch.scalar_subquery()))).rowcount
+            db.session.commit()
+            deleted += count
+            if count < self.purge_batch_size:
+                return deleted
+
+    def messages_for_lead(self, lead_id):
+        return NotificationOutbox.query.filter_by(lead_id=lead_id).order_by(NotificationOutbox.created_at).all()
+
+    # Dispatcher threads
+
+    def _worker_loop(self, app, channel, worker_id):
+        wakeup = self._wakeup[channel]
+        while not self._stopping.is_set():
+            claimed = 0
+            try:
+                with app.app_context():
+                    claimed, _ = self.dispatch_batch(channel, worker_id)
+            except Exception as e:
+                print(f"Outbox dispatcher {worker_id} error: {e}")
+
+            if not claimed:
+                self._check_stale(app)
+                self._check_purge(app)
+                wakeup.wait(self.poll_interval_seconds)
+                wakeup.clear()
+
+    def _check_stale(self, app):
+        """Requeue stale messages at most once a minute per process, from whichever dispatcher is idle"""
+        now = time.monotonic()
+        if now - self._last_stale_check < 60:
+            return
+        self._last_stale_check = now
+        try:
+            with app.app_context():
+                self.requeue_stale()
+        except Exception as e:
+            print(f"Stale outbox check error: {e}")
+
+    def _check_purge(self, app):
+        """Delete old delivered messages at most once an hour per process"""
+        now = time.monotonic()
+        if now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        try:
+            with app.app_context():
+                self.purge_delivered()
+        except Exception as e:
+            print(f"Outbox purge error: {e}")
+
+    def start(self, app):
+        """Start the dispatcher threads (a channel with concurrency 0 gets none)"""
+        if self._threads:
+            return self._threads
+
+        with app.app_context():
+            self.requeue_stale()
+        self._last_stale_check = time.monotonic()
+
+        prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        for channel in CHANNELS:
+            for i in range(self.concurrency[channel]):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    args=(app, channel, f"{prefix}-{channel}-{i}"),
+                    name=f"outbox-{channel}-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        return self._threads
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        for wakeup in self._wakeup.values():
+            wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping.clear()
+
+# Global instance
+outbox_service = OutboxService()
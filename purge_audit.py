@@ -0,0 +1,48 @@
+import json
+from datetime import datetime
+from src.models.lead import db
+
+class PurgeAudit(db.Model):
+    """One row per retention purge or bulk delete run; holds counts and a digest of the ids, never lead data"""
+    __tablename__ = 'purge_audit'
+
+    id = db.Column(db.String, primary_key=True)
+    kind = db.Column(db.String, nullable=False)              # retention, bulk_delete
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)
+    requested_by = db.Column(db.String)
+    cutoff = db.Column(db.DateTime)                          # retention runs: last touch on or before this
+    retention_days = db.Column(db.Integer)
+    matched = db.Column(db.Integer, nullable=False, default=0)
+    deleted = db.Column(db.Integer, nullable=False, default=0)
+    documents_deleted = db.Column(db.Integer, nullable=False, default=0)
+    related_deleted = db.Column(db.Text, nullable=False, default='{}')  # JSON {table: rows} for workflow_step etc.
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    stage_counts = db.Column(db.Text, nullable=False, default='{}')  # JSON {stage: count}
+    lead_ids_sha256 = db.Column(db.String)                   # over the sorted deleted ids, for later verification
+    elapsed_seconds = db.Column(db.Float)
+    rows_per_second = db.Column(db.Float)
+    error = db.Column(db.Text)                               # set when a batch failed; earlier batches stay committed
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'audit_id': self.id,
+            'kind': self.kind,
+            'dry_run': self.dry_run,
+            'requested_by': self.requested_by,
+            'cutoff': self.cutoff.isoformat() if self.cutoff else None,
+            'retention_days': self.retention_days,
+            'matched': self.matched,
+            'deleted': self.deleted,
+            'documents_deleted': self.documents_deleted,
+            'related_deleted': json.loads(self.related_deleted),
+            'batches': self.batches,
+            'stage_counts': json.loads(self.stage_counts),
+            'lead_ids_sha256': self.lead_ids_sha256,
+            'elapsed_seconds': self.elapsed_seconds,
+            'rows_per_second': self.rows_per_second,
+            'error': self.error,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
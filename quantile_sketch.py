@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+
+class DDSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch)
+
+    Each positive value falls into bin ceil(log_gamma(x)), so any
+    quantile it reports is within relative_accuracy of the true value.
+    Memory is capped at max_bins. When the cap is hit, the lowest bins
+    are merged, which only costs accuracy in the far low tail that
+    latency SLOs don't look at.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        value = float(value)
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + 1
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += 1
+
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def _collapse(self):
+        """Fold the lowest bins together until the sketch is back under max_bins"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0) if self.min is not None else 0
+
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                # Clamp to observed extremes so p0/p100 are exact
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99)):
+        result = {
+            'count': self.count,
+            'avg': self.sum / self.count if self.count else 0,
+            'min': self.min if self.min is not None else 0,
+            'max': self.max if self.max is not None else 0
+        }
+        for q in quantiles:
+            result[f'p{round(q * 100):d}'] = round(self.quantile(q), 2)
+        return result
+
+class WindowedSketches:
+    """Per-key DDSketches in fixed time buckets; windows merge the buckets they cover
+
+    Memory is bounded by keys x retained buckets x max_bins. Traffic volume
+    does not change it.
+    """
+
+    def __init__(self, bucket_seconds=3600, retention_buckets=168, relative_accuracy=0.01):
+        self.bucket_seconds = bucket_seconds
+        self.retention_buckets = retention_buckets
+        self.relative_accuracy = relative_accuracy
+        self._buckets = {}  # key -> {bucket_start: DDSketch}
+        self._lock = threading.Lock()
+
+    def add(self, key, value, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        bucket = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+        with self._lock:
+            buckets = self._buckets.setdefault(key, {})
+            sketch = buckets.get(bucket)
+            if sketch is None:
+                sketch = buckets[bucket] = DDSketch(self.relative_accuracy)
+                self._expire(buckets)
+                if bucket not in buckets:
+                    return
+            sketch.add(value)
+
+    def _expire(self, buckets):
+        oldest_kept = max(buckets) - (self.retention_buckets - 1) * self.bucket_seconds
+        for bucket in [b for b in buckets if b < oldest_kept]:
+            del buckets[bucket]
+
+    def merged(self, key, hours=24, now=None):
+        """One sketch covering the last `hours` for a key (bucket granularity)"""
+        now = time.time() if now is None else now
+        since = now - hours * 3600
+        result = DDSketch(self.relative_accuracy)
+
+        with self._lock:
+            for bucket, sketch in self._buckets.get(key, {}).items():
+                if bucket + self.bucket_seconds > since:
+                    result.merge(sketch)
+        return result
+
+    def keys(self):
+        with self._lock:
+            return list(self._buckets.keys())
+
+    def summaries(self, hours=24):
+        """{key: percentile summary} for every key with data in the window"""
+        summaries = {}
+        for key in self.keys():
+            sketch = self.merged(key, hours)
+            if sketch.count:
+                summaries[key] = sketch.summary()
+        return summaries
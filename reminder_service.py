@@ -0,0 +1,129 @@
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from src.models.lead import db, Lead, LeadDocument
+from src.services.notification_service import notification_service
+from src.services.sharepoint_service import sharepoint_service
+
+DOC_LABELS = {
+    'imaging': 'Recent imaging reports (CT, MRI, PET scans)',
+    'pathology': 'Pathology reports',
+    'labs': 'Laboratory results',
+    'med_list': 'Current medication list',
+    'prior_notes': 'Previous treatment notes'
+}
+
+class ReminderService:
+    """Document-upload reminder pipeline: select -> load docs -> render -> dispatch -> commit, per batch
+
+    Dispatch hands each batch to the e-mail transport in one call. The
+    transport owns delivery concurrency, connection reuse and the
+    provider rate limit.
+    """
+
+    def __init__(self):
+        self.reminder_interval_hours = int(os.getenv('REMINDER_INTERVAL_HOURS', '72'))
+        self.batch_size = int(os.getenv('REMINDER_BATCH_SIZE', '500'))
+
+    def select_eligible(self, now):
+        """docs_requested leads untouched for the reminder interval (served by ix_lead_stage_last_touch)"""
+        cutoff = now - timedelta(hours=self.reminder_interval_hours)
+        return db.session.query(Lead.lead_id, Lead.first_name, Lead.email).filter(
+            Lead.stage == 'docs_requested',
+            Lead.last_touch_iso < cutoff
+        ).all()
+
+    def load_missing_docs(self, lead_ids):
+        """{lead_id: [doc_type, ...]} for one batch in a single query"""
+        rows = db.session.query(LeadDocument.lead_id, LeadDocument.doc_type).filter(
+            LeadDocument.lead_id.in_(lead_ids),
+            LeadDocument.required == True,
+            LeadDocument.received_at.is_(None)
+        ).all()
+
+        missing = defaultdict(list)
+        for lead_id, doc_type in rows:
+            missing[lead_id].append(doc_type)
+        return missing
+
+    def render(self, leads, missing_docs):
+        """Render reminder messages for a batch in one render_batch call; returns [(lead_id, email, subject, body)]"""
+        rows = [
+            {
+                'first_name': first_name,
+                'missing_docs': '\n'.join(
+                    f'- {DOC_LABELS.get(doc, doc)}' for doc in missing_docs.get(lead_id) or []
+                ) or '- Any outstanding records',
+                'upload_link': sharepoint_service.get_upload_link(lead_id)
+            }
+            for lead_id, first_name, _ in leads
+        ]
+        rendered = notification_service.render_batch('document_reminder', rows)
+        return [
+            (lead_id, email, subject, body)
+            for (lead_id, _, email), (subject, body) in zip(leads, rendered)
+        ]
+
+    def send_reminders(self, now=None):
+        """Send reminders to all eligible leads and report throughput and per-stage timings"""
+        now = now or datetime.utcnow()
+        timings = defaultdict(float)
+        started = time.perf_counter()
+
+        stage_start = time.perf_counter()
+        eligible = self.select_eligible(now)
+        timings['select'] += time.perf_counter() - stage_start
+
+        sent = 0
+        failed = []
+
+        for offset in range(0, len(eligible), self.batch_size):
+            batch = eligible[offset:offset + self.batch_size]
+
+            stage_start = time.perf_counter()
+            missing_docs = self.load_missing_docs([lead_id for lead_id, _, _ in batch])
+            timings['load_docs'] += time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            messages = self.render(batch, missing_docs)
+            timings['render'] += time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            results = notification_service.send_email_batch(
+                [(email, subject, body) for _, email, subject, body in messages]
+            )
+            delivered = []
+            for (lead_id, _, _, _), ok in zip(messages, results):
+                (delivered if ok else failed).append(lead_id)
+            timings['dispatch'] += time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            if delivered:
+                # last_touch stays non-null, so the KPI counter buckets are unaffected by this bulk update
+                db.session.execute(
+                    Lead.__table__.update()
+                    .where(Lead.__table__.c.lead_id.in_(delivered))
+                    .values(last_touch_iso=now)
+                )
+            db.session.commit()
+            timings['commit'] += time.perf_counter() - stage_start
+
+            sent += len(delivered)
+
+        elapsed = time.perf_counter() - started
+
+        return {
+            'status': 'completed',
+            'eligible': len(eligible),
+            'reminders_sent': sent,
+            'failed': len(failed),
+            'failed_lead_ids': failed[:100],
+            'elapsed_seconds': round(elapsed, 3),
+            'leads_per_second': round(len(eligible) / elapsed, 1) if elapsed > 0 else 0,
+            'stage_timings_ms': {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+# Global instance
+reminder_service = ReminderService()
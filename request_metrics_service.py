@@ -0,0 +1,72 @@
+import os
+import random
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.services.observability_service import observability_service
+
+class RequestMetricsService:
+    """Times every blueprint request and counts the SQL it ran, feeding track_api_performance
+
+    Metrics and latency sketches see every request. The API_CALL log line
+    is written only for a sample of requests, plus every 5xx and every
+    request over the slow threshold.
+    """
+
+    def __init__(self):
+        self.log_sample_rate = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', '0.01'))
+        self.slow_request_ms = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_time_ms = 0.0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's execution context, which is discarded with it when the statement raises
+        context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = context._query_started
+        # Worker threads run queries under an app context with no request to charge them to
+        if has_request_context() and 'request_started' in g:
+            g.sql_statements += 1
+            g.sql_time_ms += (time.perf_counter() - started) * 1000
+
+    def _after_request(self, response):
+        started = g.pop('request_started', None)
+        if started is None or request.blueprint is None:
+            return response
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        endpoint = f"{request.method} {rule}"
+
+        log = (
+            response.status_code >= 500
+            or duration_ms >= self.slow_request_ms
+            or random.random() < self.log_sample_rate
+        )
+
+        observability_service.track_api_performance(endpoint, round(duration_ms, 2), response.status_code, {
+            'sql_statements': g.sql_statements,
+            'sql_time_ms': round(g.sql_time_ms, 2)
+        }, log=log)
+        observability_service.record_metric('api_sql_statements', g.sql_statements, {'endpoint': endpoint})
+        observability_service.record_metric('api_sql_time_ms', g.sql_time_ms, {'endpoint': endpoint})
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={duration_ms:.1f}, db;dur={g.sql_time_ms:.1f};desc="{g.sql_statements} queries"'
+        )
+        return response
+
+# Global instance
+request_metrics_service = RequestMetricsService()
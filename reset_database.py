@@ -3,7 +3,7 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.models.lead import db, Lead
+from src.models.lead import db, Lead, REQUIRED_DOCS
 from flask import Flask
 import uuid
 from datetime import datetime
@@ -35,11 +35,9 @@ with app.app_context():
         timezone="America/Phoenix",
         relationship="self",
         stage="inquiry",
-        required_docs='["imaging", "pathology", "labs", "med_list", "prior_notes"]',
-        received_docs='[]',
-        missing_docs='["imaging", "pathology", "labs", "med_list", "prior_notes"]',
+        required_docs=REQUIRED_DOCS,
         owner_user_id="admissions_staff",
-        last_touch_iso=datetime.utcnow().isoformat(),
+        last_touch_iso=datetime.utcnow(),
         idempotency_key="test_user_key"
     )
     
@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from src.services.retention_service import retention_service
+
+retention_bp = Blueprint('retention', __name__)
+
+def _positive_int(value, name):
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError(f'{name} must be a positive integer')
+    return value
+
+@retention_bp.route('/retention/purge', methods=['POST'])
+def purge_expired_leads():
+    """Purge leads past the retention period; a dry run unless the body sets "dry_run": false"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = retention_service.purge_expired(
+            dry_run=data.get('dry_run', True) is not False,
+            batch_size=_positive_int(data.get('batch_size'), 'batch_size'),
+            max_batches=_positive_int(data.get('max_batches'), 'max_batches'),
+            requested_by=data.get('requested_by')
+        )
+        return jsonify(result), 500 if result['error'] else 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@retention_bp.route('/retention/audits', methods=['GET'])
+def list_purge_audits():
+    """Recent purge and bulk delete audit records"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        return jsonify({'audits': retention_service.list_audits(limit)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
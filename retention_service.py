@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from src.models.lead import db, Lead, LeadDocument
+from src.models.purge_audit import PurgeAudit
+from src.models.workflow_step import WorkflowStep
+from src.models.workflow_job import WorkflowJob
+from src.models.idempotency_record import IdempotencyRecord
+from src.models.notification_outbox import NotificationOutbox
+from src.services.kpi_service import kpi_service
+from src.services.digest_service import digest_service
+from src.services.security_service import security_service
+from src.services.observability_service import observability_service
+from src.services.idempotency_service import idempotency_service
+
+# Leads in these stages are kept past retention (enrolled patients)
+RETAINED_STAGES = ('decision',)
+
+# Tables besides lead_document holding a deleted lead's data (step details, job payloads, stored responses,
+# queued and sent notifications)
+LEAD_SIDE_TABLES = (
+    WorkflowStep.__table__, WorkflowJob.__table__, IdempotencyRecord.__table__, NotificationOutbox.__table__
+)
+
+class RetentionService:
+    """Set-based lead deletion for the retention purge and bulk deletes
+
+    Leads go in batches of PURGE_BATCH_SIZE. Each batch is one DELETE
+    over a LIMITed id subquery, plus the matching lead_document rows and
+    the lead's rows in LEAD_SIDE_TABLES, counted per table in the audit.
+    Each batch commits on its own, so the writer lock is never held for
+    the whole purge. The deleted rows come back via RETURNING. The KPI
+    counters and today's digest row are adjusted from them in the same
+    transaction, because Core deletes bypass the ORM flush listeners.
+    Every run, dry or real, leaves one purge_audit row.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv('PURGE_BATCH_SIZE', '1000'))
+
+    @property
+    def retention_days(self):
+        return security_service.hipaa_settings['data_retention_days']
+
+    def cutoff(self, now=None):
+        """Leads last touched on or before this are past retention
+
+        Same boundary as SecurityService.check_data_retention: more than
+        retention_days whole days since the last touch.
+        """
+        now = now or datetime.utcnow()
+        return now - timedelta(days=self.retention_days + 1)
+
+    def _expired(self, cutoff):
+        # Range scan on ix_lead_last_touch; never-touched leads are retained, as in check_data_retention
+        return (Lead.last_touch_iso <= cutoff) & Lead.stage.notin_(RETAINED_STAGES)
+
+    def _stage_counts(self, where):
+        rows = db.session.query(Lead.stage, func.count()).filter(where).group_by(Lead.stage).all()
+        return dict(rows)
+
+    def _delete_batch(self, where, limit):
+        """Delete up to `limit` leads matching `where` (oldest touch first) and all their rows in one transaction
+
+        Returns (deleted lead rows, lead_document rows deleted, {side table: rows deleted}).
+        """
+        table = Lead.__table__
+        documents = LeadDocument.__table__
+        connection = db.session.connection()
+
+        batch = db.select(table.c.lead_id).where(where).order_by(table.c.last_touch_iso, table.c.lead_id).limit(limit)
+        deleted = connection.execute(
+            table.delete()
+            .where(table.c.lead_id.in_(batch.scalar_subquery()))
+            .returning(table.c.lead_id, table.c.stage, table.c.has_consent, table.c.last_touch_iso)
+        ).all()
+        if not deleted:
+            db.session.rollback()
+            return [], 0, Counter()
+
+        lead_ids = [row.lead_id for row in deleted]
+        documents_deleted = connection.execute(
+            documents.delete().where(documents.c.lead_id.in_(lead_ids))
+        ).rowcount
+        related_deleted = Counter()
+        for side_table in LEAD_SIDE_TABLES:
+            related_deleted[side_table.name] += connection.execute(
+                side_table.delete().where(side_table.c.lead_id.in_(lead_ids))
+            ).rowcount
+
+        kpi_deltas = Counter()
+        stage_deltas = Counter()
+        for row in deleted:
+            kpi_deltas[kpi_service.bucket_for(row.stage, row.has_consent, row.last_touch_iso)] -= 1
+            stage_deltas[row.stage] -= 1
+        kpi_service.apply_deltas(connection, kpi_deltas)
+        digest_service.apply_events(connection, stage_deltas, Counter())
+
+        db.session.commit()
+        idempotency_service.forget_leads(lead_ids)
+        return deleted, documents_deleted, related_deleted
+
+    def _run_batches(self, run, where, limit, max_batches=None):
+        """Delete batches matching `where` until one comes back short or max_batches have run; totals go into run"""
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                deleted, documents_deleted, related_deleted = self._delete_batch(where, limit)
+                batches += 1
+                if deleted:
+                    run['batches'] += 1
+                    run['deleted'] += len(deleted)
+                    run['documents_deleted'] += documents_deleted
+                    run['related_deleted'].update(related_deleted)
+                    run['stage_counts'].update(row.stage for row in deleted)
+                    run['lead_ids'].extend(row.lead_id for row in deleted)
+                if len(deleted) < limit:
+                    break
+        except Exception as e:
+            db.session.rollback()
+            run['error'] = str(e)
+
+    def _new_run(self, dry_run, **extra):
+        return {
+            'dry_run': dry_run,
+            'matched': 0,
+            'deleted': 0,
+            'documents_deleted': 0,
+            'related_deleted': Counter(),
+            'batches': 0,
+            'stage_counts': Counter(),
+            'lead_ids': [],
+            **extra
+        }
+
+    def _record(self, kind, run, started, started_at, requested_by):
+        """Store the audit row and log the run; returns the audit as a dict"""
+        elapsed = time.perf_counter() - started
+        rows = run['matched'] if run['dry_run'] else run['deleted']
+        lead_ids = run['lead_ids']
+
+        audit = PurgeAudit(
+            id=str(uuid.uuid4()),
+            kind=kind,
+            dry_run=run['dry_run'],
+            requested_by=requested_by,
+            cutoff=run.get('cutoff'),
+            retention_days=run.get('retention_days'),
+            matched=run['matched'],
+            deleted=run['deleted'],
+            documents_deleted=run['documents_deleted'],
+            related_deleted=json.dumps(run['related_deleted']),
+            batches=run['batches'],
+            stage_counts=json.dumps(run['stage_counts']),
+            lead_ids_sha256=hashlib.sha256('\n'.join(sorted(lead_ids)).encode()).hexdigest() if lead_ids else None,
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(rows / elapsed, 1) if elapsed > 0 else 0,
+            error=run.get('error'),
+            started_at=started_at,
+            finished_at=datetime.utcnow()
+        )
+        db.session.add(audit)
+        db.session.commit()
+
+        result = audit.to_dict()
+        observability_service.log_event(
+            f'lead_{kind}',
+            f"{'Dry run: ' if run['dry_run'] else ''}{kind} {'matched' if run['dry_run'] else 'deleted'} {rows} leads",
+            level='ERROR' if audit.error else 'INFO',
+            metadata={key: value for key, value in result.items() if key != 'stage_counts'}
+        )
+        return result
+
+    def purge_expired(self, dry_run=False, batch_size=None, max_batches=None, requested_by=None):
+        """Delete every lead past retention (dry_run only counts them); returns the audit record"""
+        started = time.perf_counter()
+        started_at = datetime.utcnow()
+        cutoff = self.cutoff(started_at)
+        where = self._expired(cutoff)
+        run = self._new_run(dry_run, cutoff=cutoff, retention_days=self.retention_days)
+
+        if dry_run:
+            run['stage_counts'].update(self._stage_counts(where))
+            run['matched'] = sum(run['stage_counts'].values())
+        else:
+            self._run_batches(run, where, batch_size or self.batch_size, max_batches)
+            run['matched'] = run['deleted']
+
+        return self._record('retention', run, started, started_at, requested_by)
+
+    def delete_leads(self, lead_ids, dry_run=False, batch_size=None, requested_by=None):
+        """Delete the given leads in batches; the result lists ids that were not found"""
+        started = time.perf_counter()
+        started_at = datetime.utcnow()
+        batch_size = batch_size or self.batch_size
+        lead_ids = list(dict.fromkeys(lead_ids))
+        run = self._new_run(dry_run)
+
+        for i in range(0, len(lead_ids), batch_size):
+            chunk = lead_ids[i:i + batch_size]
+            if dry_run:
+                rows = db.session.query(Lead.lead_id, Lead.stage).filter(Lead.lead_id.in_(chunk)).all()
+                run['stage_counts'].update(row.stage for row in rows)
+                run['lead_ids'].extend(row.lead_id for row in rows)
+            else:
+                # A short batch here only means some ids were missing, so every chunk runs
+                self._run_batches(run, Lead.lead_id.in_(chunk), len(chunk), max_batches=1)
+                if run.get('error'):
+                    break
+
+        found = set(run['lead_ids'])
+        run['matched'] = len(found)
+        if dry_run:
+            run['lead_ids'] = []
+
+        result = self._record('bulk_delete', run, started, started_at, requested_by)
+        result['not_found'] = [lead_id for lead_id in lead_ids if lead_id not in found]
+        return result
+
+    def list_audits(self, limit=50):
+        """Most recent purge audit records first"""
+        rows = PurgeAudit.query.order_by(PurgeAudit.started_at.desc()).limit(limit).all()
+        return [row.to_dict() for row in rows]
+
+# Global instance
+retention_service = RetentionService()
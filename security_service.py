@@ -181,8 +181,7 @@ class SecurityService:
             if not lead.last_touch_iso:
                 return {'action': 'retain', 'reason': 'No last touch date'}
             
-            last_touch = datetime.fromisoformat(lead.last_touch_iso.replace('Z', '+00:00'))
-            days_since_touch = (datetime.utcnow() - last_touch).days
+            days_since_touch = (datetime.utcnow() - lead.last_touch_iso).days
             
             if days_since_touch > self.hipaa_settings['data_retention_days']:
                 # Check if patient is enrolled (would prevent deletion)
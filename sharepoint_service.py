@@ -1,6 +1,9 @@
 import os
 import json
 from datetime import datetime, timedelta
+from src.models.lead import REQUIRED_DOCS
+from src.services.document_classifier import document_classifier
+from src.services.folder_listing import FolderListingCache, create_folder_source
 
 class SharePointService:
     def __init__(self):
@@ -9,6 +12,20 @@ class SharePointService:
         self.library_path = os.getenv('SHAREPOINT_LIBRARY', '/Admissions/Intake')
         self.client_id = os.getenv('SHAREPOINT_CLIENT_ID', 'client_id')
         self.client_secret = os.getenv('SHAREPOINT_CLIENT_SECRET', 'client_secret')
+
+        # Folder contents: SHAREPOINT_BACKEND=local reads a directory per lead under SHAREPOINT_LOCAL_ROOT
+        # as a stand-in for the document library; listings are cached until the change feed reports an upload
+        self.folder_source = create_folder_source(
+            os.getenv('SHAREPOINT_BACKEND', 'simulated'),
+            os.getenv('SHAREPOINT_LOCAL_ROOT', os.path.join(os.getcwd(), 'sharepoint_local')),
+            float(os.getenv('SHAREPOINT_LOCAL_LATENCY_MS', '0'))
+        )
+        self.listing_cache = FolderListingCache(
+            self.folder_source,
+            max_entries=int(os.getenv('SHAREPOINT_LISTING_CACHE_SIZE', '50000')),
+            delta_interval_seconds=float(os.getenv('SHAREPOINT_DELTA_INTERVAL_SECONDS', '30')),
+            use_delta=os.getenv('SHAREPOINT_USE_DELTA', 'true').lower() == 'true'
+        )
     
     def create_upload_folder(self, lead_id):
         """Create a secure upload folder for a lead"""
@@ -16,6 +33,7 @@ class SharePointService:
             folder_path = f"{self.library_path}/{lead_id}"
             
             # In a real implementation, this would create the folder in SharePoint
+            self.folder_source.create_folder(lead_id)
             print(f"SHAREPOINT: Created folder {folder_path}")
             
             return {
@@ -42,7 +60,7 @@ class SharePointService:
             expires_at = datetime.utcnow() + timedelta(hours=expires_hours)
             
             # In a real implementation, this would generate a SharePoint "Request files" link
-            upload_link = f"{self.sharepoint_site}/_layouts/15/upload.aspx?FolderCTID=0x012001&RootFolder={self.library_path}/{lead_id}&Source={self.sharepoint_site}"
+            upload_link = self.get_upload_link(lead_id)
             
             print(f"SHAREPOINT: Generated upload link for {lead_id}")
             print(f"LINK: {upload_link}")
@@ -57,52 +75,40 @@ class SharePointService:
             print(f"Error generating upload link: {e}")
             return None
     
+    def get_upload_link(self, lead_id):
+        """Upload link for an existing lead folder (no folder creation)"""
+        return f"{self.sharepoint_site}/_layouts/15/upload.aspx?FolderCTID=0x012001&RootFolder={self.library_path}/{lead_id}&Source={self.sharepoint_site}"
+    
+    def document_status(self, lead_id):
+        """Received and missing categories from the lead's folder listing (cached), without logging"""
+        files, listed = self.listing_cache.get(lead_id)
+        received_docs = document_classifier.classify_files(files)
+        return {
+            'received': received_docs,
+            'missing': [doc for doc in REQUIRED_DOCS if doc not in received_docs],
+            'files': files,
+            'listed': listed
+        }
+    
     def check_documents(self, lead_id):
         """Check what documents have been uploaded for a lead"""
         try:
-            folder_path = f"{self.library_path}/{lead_id}"
-            
-            # In a real implementation, this would query SharePoint for files
-            # For now, simulate document checking
-            
-            # Simulate some documents being present (for testing)
-            # In reality, this would scan the SharePoint folder
-            simulated_files = [
-                'imaging_scan_2025.pdf',
-                'lab_results_recent.pdf'
-            ]
-            
-            # Map files to categories
-            received_docs = []
-            if any('imaging' in f.lower() or 'scan' in f.lower() or 'mri' in f.lower() or 'ct' in f.lower() for f in simulated_files):
-                received_docs.append('imaging')
-            if any('lab' in f.lower() for f in simulated_files):
-                received_docs.append('labs')
-            if any('pathology' in f.lower() or 'biopsy' in f.lower() for f in simulated_files):
-                received_docs.append('pathology')
-            if any('medication' in f.lower() or 'med_list' in f.lower() or 'drugs' in f.lower() for f in simulated_files):
-                received_docs.append('med_list')
-            if any('oncology' in f.lower() or 'notes' in f.lower() or 'report' in f.lower() for f in simulated_files):
-                received_docs.append('prior_notes')
-            
-            # Calculate missing documents
-            required_docs = ['imaging', 'pathology', 'labs', 'med_list', 'prior_notes']
-            missing_docs = [doc for doc in required_docs if doc not in received_docs]
+            status = self.document_status(lead_id)
             
             print(f"SHAREPOINT: Checked documents for {lead_id}")
-            print(f"RECEIVED: {received_docs}")
-            print(f"MISSING: {missing_docs}")
+            print(f"RECEIVED: {status['received']}")
+            print(f"MISSING: {status['missing']}")
             
             return {
-                'received': received_docs,
-                'missing': missing_docs,
-                'files': simulated_files
+                'received': status['received'],
+                'missing': status['missing'],
+                'files': status['files']
             }
         except Exception as e:
             print(f"Error checking documents: {e}")
             return {
                 'received': [],
-                'missing': ['imaging', 'pathology', 'labs', 'med_list', 'prior_notes'],
+                'missing': list(REQUIRED_DOCS),
                 'files': []
             }
     
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from src.models.lead import db, Lead
+from src.services.retention_service import retention_service
 from datetime import datetime
 
 simple_delete_bp = Blueprint('simple_delete', __name__)
@@ -22,12 +23,19 @@ def delete_lead_simple(lead_id):
         lead_name = f"{lead.first_name} {lead.last_name}"
         lead_email = lead.email
         
-        # Delete the lead
-        db.session.delete(lead)
-        db.session.commit()
+        # Same path as bulk deletes: documents, workflow history, jobs, stored responses and
+        # notifications go with the lead, and the delete is audited
+        result = retention_service.delete_leads([lead_id], requested_by=request.args.get('requested_by'))
+        if result['error'] is not None:
+            return jsonify({
+                'success': False,
+                'error': f"Database error: {result['error']}",
+                'lead_id': lead_id
+            }), 500
         
         return jsonify({
             'success': True,
+            'audit_id': result['audit_id'],
             'message': f'Successfully deleted {lead_name}',
             'deleted_name': lead_name,
             'deleted_email': lead_email,
@@ -43,3 +51,31 @@ def delete_lead_simple(lead_id):
             'lead_id': lead_id
         }), 500
 
+
+@simple_delete_bp.route('/delete-leads', methods=['POST'])
+def delete_leads_bulk():
+    """Delete many leads in batched set-based DELETEs; body {"lead_ids": [...], "dry_run": false}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        lead_ids = data.get('lead_ids')
+
+        if not isinstance(lead_ids, list) or not lead_ids or not all(isinstance(i, str) for i in lead_ids):
+            return jsonify({
+                'success': False,
+                'error': 'lead_ids must be a non-empty list of strings'
+            }), 400
+
+        result = retention_service.delete_leads(
+            lead_ids,
+            dry_run=bool(data.get('dry_run', False)),
+            requested_by=data.get('requested_by')
+        )
+        result['success'] = result['error'] is None
+        return jsonify(result), 200 if result['success'] else 500
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }), 500
@@ -1,5 +1,6 @@
 from datetime import datetime
 from src.models.lead import db, Lead
+from src.services.workflow_history_service import workflow_history_service
 
 class SimpleWorkflowService:
     def __init__(self):
@@ -20,52 +21,39 @@ class SimpleWorkflowService:
             # Step 1: Send follow-up email (simulated)
             print(f"WORKFLOW: Processing lead {lead.first_name} {lead.last_name}")
             print(f"EMAIL: Sending follow-up email to {lead.email}")
-            workflow_steps.append({
-                'step': 'email_sent',
-                'status': 'completed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'details': f'Follow-up email sent to {lead.email}'
-            })
+            workflow_steps.append(workflow_history_service.record_step(
+                lead_id, 'F1_WebLead', 'email_sent', 'completed', f'Follow-up email sent to {lead.email}'
+            ))
             
             # Step 2: Create SharePoint upload folder (simulated)
             print(f"SHAREPOINT: Creating upload folder for {lead_id}")
             upload_link = f"https://oasisofhealing.sharepoint.com/upload/{lead_id}"
-            workflow_steps.append({
-                'step': 'upload_link_created',
-                'status': 'completed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'details': f'Upload link created: {upload_link}'
-            })
+            workflow_steps.append(workflow_history_service.record_step(
+                lead_id, 'F1_WebLead', 'upload_link_created', 'completed', f'Upload link created: {upload_link}'
+            ))
             
             # Step 3: Generate consent link (simulated)
             print(f"DOCUSIGN: Generating consent link for {lead.first_name}")
             consent_link = f"https://docusign.com/consent/{lead_id}"
-            workflow_steps.append({
-                'step': 'consent_link_generated',
-                'status': 'completed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'details': f'Consent link generated: {consent_link}'
-            })
+            workflow_steps.append(workflow_history_service.record_step(
+                lead_id, 'F1_WebLead', 'consent_link_generated', 'completed', f'Consent link generated: {consent_link}'
+            ))
             
             # Step 4: Update lead stage if needed
             if lead.stage == 'inquiry':
                 lead.stage = 'docs_requested'
-                lead.last_touch_iso = datetime.utcnow().isoformat()
-                db.session.commit()
+                lead.last_touch_iso = datetime.utcnow()
                 print(f"UPDATED: Lead stage changed to docs_requested")
-                workflow_steps.append({
-                    'step': 'stage_updated',
-                    'status': 'completed',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'details': 'Lead stage updated to docs_requested'
-                })
+                workflow_steps.append(workflow_history_service.record_step(
+                    lead_id, 'F1_WebLead', 'stage_updated', 'completed', 'Lead stage updated to docs_requested'
+                ))
             else:
-                workflow_steps.append({
-                    'step': 'stage_check',
-                    'status': 'completed',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'details': f'Lead already in {lead.stage} stage'
-                })
+                workflow_steps.append(workflow_history_service.record_step(
+                    lead_id, 'F1_WebLead', 'stage_check', 'completed', f'Lead already in {lead.stage} stage'
+                ))
+            
+            # Persist the step history together with the stage change
+            db.session.commit()
             
             return {
                 'status': 'success',
@@ -77,6 +65,7 @@ class SimpleWorkflowService:
             }
             
         except Exception as e:
+            db.session.rollback()
             print(f"Workflow error: {str(e)}")
             return {'error': f'Workflow error: {str(e)}'}
     
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Synthetic lead data for benchmarks and load tests"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import random
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from flask import Flask
+from src.models.lead import db, Lead, LeadDocument, LEAD_STAGES, REQUIRED_DOCS
+
+DOCUMENT_FIELDS = ('required_docs', 'received_docs', 'missing_docs')
+
+def make_app(db_path=None):
+    """Create a bare Flask app bound to a scratch SQLite database"""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='admissions_bench_'), 'app.db')
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+def synthetic_lead_rows(count, start=0, seed=42):
+    """Yield plain dict lead records; document fields are lists, timestamps are datetimes"""
+    rng = random.Random(seed + start)
+    now = datetime.utcnow()
+
+    for i in range(start, start + count):
+        stage = rng.choice(LEAD_STAGES)
+        received = rng.sample(REQUIRED_DOCS, rng.randint(0, len(REQUIRED_DOCS)))
+        has_consent = rng.random() < 0.7
+        last_touch = now - timedelta(days=rng.randint(0, 500), minutes=rng.randint(0, 1440))
+
+        yield {
+            'lead_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'first_name': f'First{i}',
+            'last_name': f'Last{i}',
+            'email': f'lead{i}@example.com',
+            'phone': f'555-{i:08d}',
+            'timezone': 'America/Phoenix',
+            'relationship': rng.choice(['self', 'spouse', 'child']),
+            'stage': stage,
+            'has_consent': has_consent,
+            'consent_type': 'hipaa' if has_consent else None,
+            'consent_version': 'v1.2' if has_consent else None,
+            'consent_timestamp': last_touch if has_consent else None,
+            'required_docs': list(REQUIRED_DOCS),
+            'received_docs': received,
+            'missing_docs': [d for d in REQUIRED_DOCS if d not in received],
+            'ehr_patient_id': None,
+            'owner_user_id': rng.choice(['admissions_staff', 'intake_nurse', 'coordinator']),
+            'last_touch_iso': last_touch,
+            'idempotency_key': f'synthetic_{i}'
+        }
+
+def split_document_rows(record):
+    """Split a synthetic record into a Lead row and its lead_document rows"""
+    row = {key: value for key, value in record.items() if key not in DOCUMENT_FIELDS}
+    received = set(record['received_docs'])
+    documents = [
+        {
+            'lead_id': record['lead_id'],
+            'doc_type': doc_type,
+            'required': True,
+            'received_at': record['last_touch_iso'] if doc_type in received else None
+        }
+        for doc_type in record['required_docs']
+    ]
+    return row, documents
+
+def seed_leads(count, chunk_size=50000):
+    """Insert synthetic leads with chunked executemany inserts (requires app context)"""
+    inserted = 0
+    while inserted < count:
+        lead_rows = []
+        document_rows = []
+        for record in synthetic_lead_rows(min(chunk_size, count - inserted), start=inserted):
+            row, documents = split_document_rows(record)
+            lead_rows.append(row)
+            document_rows.extend(documents)
+
+        db.session.execute(Lead.__table__.insert(), lead_rows)
+        db.session.execute(LeadDocument.__table__.insert(), document_rows)
+        db.session.commit()
+        inserted += len(lead_rows)
+    return inserted
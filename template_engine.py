@@ -0,0 +1,103 @@
+import re
+
+# {name} placeholders, as in the str.format-style bodies used across the services
+PLACEHOLDER = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+class TemplateError(ValueError):
+    pass
+
+class CompiledTemplate:
+    """A template parsed once into literal segments plus the slot indexes that take values
+
+    render() copies the segment list, drops each value into its slot and
+    joins once. The cost is proportional to the number of placeholders,
+    not to the number of variables times the body length.
+    """
+
+    __slots__ = ('name', 'segments', 'slots', 'fields')
+
+    def __init__(self, name, segments, slots):
+        self.name = name
+        self.segments = segments          # literal text, with None where a value goes
+        self.slots = slots                # ((segment index, field name), ...)
+        self.fields = frozenset(field for _, field in slots)
+
+    def render(self, values):
+        parts = self.segments.copy()
+        try:
+            for index, field in self.slots:
+                parts[index] = str(values[field])
+        except KeyError as e:
+            raise TemplateError(f'{self.name}: no value for {{{e.args[0]}}}') from None
+        return ''.join(parts)
+
+    def render_many(self, rows):
+        """Render one message per values dict"""
+        if not self.slots:
+            text = ''.join(self.segments)
+            return [text] * len(rows)
+
+        segments = self.segments
+        slots = self.slots
+        rendered = []
+        append = rendered.append
+        join = ''.join
+        try:
+            for values in rows:
+                parts = segments.copy()
+                for index, field in slots:
+                    parts[index] = str(values[field])
+                append(join(parts))
+        except KeyError as e:
+            raise TemplateError(f'{self.name}: no value for {{{e.args[0]}}}') from None
+        return rendered
+
+def compile_template(name, text, variables=None, required=()):
+    """Parse a template into a CompiledTemplate
+
+    With `variables`, a placeholder outside that set raises TemplateError.
+    A name in `required` that the text never uses raises TemplateError
+    too. Both are caught at compile time instead of surfacing in a sent
+    message.
+    """
+    segments = []
+    slots = []
+    position = 0
+
+    for match in PLACEHOLDER.finditer(text):
+        if match.start() > position:
+            segments.append(text[position:match.start()])
+        slots.append((len(segments), match.group(1)))
+        segments.append(None)
+        position = match.end()
+    if position < len(text):
+        segments.append(text[position:])
+
+    used = {field for _, field in slots}
+    errors = []
+    if variables is not None:
+        unknown = used - set(variables)
+        if unknown:
+            errors.append(f"unknown placeholders {', '.join(sorted(unknown))}")
+    missing = set(required) - used
+    if missing:
+        errors.append(f"missing placeholders {', '.join(sorted(missing))}")
+    if errors:
+        raise TemplateError(f"{name}: {'; '.join(errors)}")
+
+    return CompiledTemplate(name, segments, tuple(slots))
+
+def compile_partial(name, text, values):
+    """Compile an ad-hoc body, keeping placeholders that have no value as literal text (str.replace semantics)"""
+    template = compile_template(name, text)
+    if template.fields <= values.keys():
+        return template
+
+    segments = list(template.segments)
+    slots = []
+    for index, field in template.slots:
+        if field in values:
+            slots.append((index, field))
+        else:
+            segments[index] = f'{{{field}}}'
+    return CompiledTemplate(name, segments, tuple(slots))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""DocumentReconciliationService.diff: which rows change and when a packet counts as complete"""
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.models.lead import REQUIRED_DOCS
+from src.services.document_reconciliation_service import DocumentReconciliationService
+
+service = DocumentReconciliationService()
+
+def lead(stage='docs_requested'):
+    return SimpleNamespace(lead_id='lead-1', stage=stage)
+
+def test_lead_without_document_rows_needs_every_required_doc():
+    updates, inserts, complete = service.diff(lead(), {}, {'imaging'})
+    assert updates == []
+    assert inserts == ['imaging']
+    assert not complete
+
+def test_lead_without_document_rows_completes_with_full_packet():
+    _, inserts, complete = service.diff(lead(), {}, set(REQUIRED_DOCS))
+    assert sorted(inserts) == sorted(REQUIRED_DOCS)
+    assert complete
+
+def test_stored_checklist_decides_completeness():
+    stored = {'imaging': (True, False), 'labs': (True, True), 'pathology': (False, False)}
+    updates, inserts, complete = service.diff(lead(), stored, {'imaging', 'labs'})
+    assert updates == [('imaging', True)]
+    assert inserts == []
+    assert complete
+
+def test_folder_clears_receipts_only_before_packet_complete():
+    stored = {'imaging': (True, True)}
+    assert service.diff(lead('docs_requested'), stored, set())[0] == [('imaging', False)]
+    assert service.diff(lead('docs_received'), stored, set())[0] == []
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""KPI counters stay equal to a recount of the lead table across the bulk Core write paths"""
+import csv
+import io
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.models.lead import Lead, REQUIRED_DOCS
+from src.services.kpi_service import kpi_service
+from src.services.lead_import_service import lead_import_service
+from src.services.retention_service import retention_service
+from src.services.folder_listing import FolderListingCache, LocalFolderSource
+from src.services.sharepoint_service import sharepoint_service
+from src.services.document_reconciliation_service import document_reconciliation_service
+from synthetic_leads import make_app, synthetic_lead_rows
+
+def csv_stream(records):
+    """CSV import file for synthetic records (document lists ';'-separated)"""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(records[0]))
+    writer.writeheader()
+    for record in records:
+        writer.writerow({
+            key: ';'.join(value) if isinstance(value, list) else ('' if value is None else value)
+            for key, value in record.items()
+        })
+    out.seek(0)
+    return out
+
+def test_counters_match_table_after_import_purge_and_reconcile(tmp_path, monkeypatch):
+    source = LocalFolderSource(str(tmp_path / 'library'))
+    monkeypatch.setattr(sharepoint_service, 'folder_source', source)
+    monkeypatch.setattr(sharepoint_service, 'listing_cache', FolderListingCache(source))
+
+    app = make_app(str(tmp_path / 'app.db'))
+    with app.app_context():
+        report = lead_import_service.import_stream(csv_stream(list(synthetic_lead_rows(300))))
+        assert report['inserted'] == 300
+        assert kpi_service.stored_counts() == kpi_service.count_from_table()
+
+        lead_ids = [lead_id for lead_id, in Lead.query.with_entities(Lead.lead_id).order_by(Lead.lead_id)]
+        retention_service.delete_leads(lead_ids[:40])
+        assert kpi_service.stored_counts() == kpi_service.count_from_table()
+
+        # A full packet in every docs_requested lead's folder moves it to docs_received
+        requested = [lead_id for lead_id, in Lead.query.with_entities(Lead.lead_id).filter_by(stage='docs_requested')]
+        assert requested
+        for lead_id in requested:
+            source.create_folder(lead_id)
+            for doc_type in REQUIRED_DOCS:
+                open(os.path.join(source.root, lead_id, f'{doc_type}.pdf'), 'w').close()
+        document_reconciliation_service.reconcile()
+
+        assert Lead.query.filter_by(stage='docs_requested').count() == 0
+        assert kpi_service.stored_counts() == kpi_service.count_from_table()
+        assert kpi_service.rebuild()['drift'] == {}
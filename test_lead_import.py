@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""LeadImportService: upserts on idempotency_key write only the columns a row supplies"""
+import io
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.models.lead import db, Lead
+from src.services.kpi_service import kpi_service
+from src.services.lead_import_service import lead_import_service
+from synthetic_leads import make_app
+
+FULL = (
+    'idempotency_key,first_name,last_name,email,phone,stage,has_consent,consent_type,last_touch_iso,received_docs\n'
+    'crm-1,Ada,Lovelace,ada@example.com,555-0001,scheduled,true,hipaa,2026-01-05T10:00:00Z,imaging;labs\n'
+)
+
+def test_partial_reimport_leaves_stage_and_consent_unchanged(tmp_path):
+    app = make_app(str(tmp_path / 'app.db'))
+    with app.app_context():
+        assert lead_import_service.import_stream(io.StringIO(FULL))['inserted'] == 1
+
+        report = lead_import_service.import_stream(io.StringIO(
+            'idempotency_key,first_name,stage,has_consent\n'
+            'crm-1,Augusta,,\n'
+        ))
+        assert report['updated'] == 1
+        assert report['rejected'] == 0
+
+        lead = Lead.query.filter_by(idempotency_key='crm-1').one()
+        assert lead.first_name == 'Augusta'
+        assert lead.last_name == 'Lovelace'
+        assert lead.stage == 'scheduled'
+        assert lead.has_consent is True
+        assert lead.consent_type == 'hipaa'
+        assert lead.last_touch_iso.isoformat() == '2026-01-05T10:00:00'
+        assert lead.to_dict()['received_docs'] == ['imaging', 'labs']
+        assert kpi_service.stored_counts() == kpi_service.count_from_table()
+
+def test_duplicate_email_is_rejected_with_its_line(tmp_path):
+    app = make_app(str(tmp_path / 'app.db'))
+    with app.app_context():
+        lead_import_service.import_stream(io.StringIO(FULL))
+        ada_id = db.session.query(Lead.lead_id).filter_by(idempotency_key='crm-1').scalar()
+
+        report = lead_import_service.import_stream(io.StringIO(
+            'idempotency_key,first_name,last_name,email,phone\n'
+            'crm-2,Grace,Hopper,grace@example.com,555-0002\n'
+            'crm-3,Ada,Clone,ADA@example.com,555-0003\n'
+        ))
+        assert report['inserted'] == 1
+        assert report['rejects'] == [{'line': 3, 'error': f'email: already used by lead {ada_id}'}]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""RetentionService.delete_leads: a purged lead takes its documents and side-table rows with it"""
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.models.lead import db, Lead, LeadDocument, REQUIRED_DOCS
+from src.models.workflow_step import WorkflowStep
+from src.models.workflow_job import WorkflowJob
+from src.models.idempotency_record import IdempotencyRecord
+from src.models.notification_outbox import NotificationOutbox
+from src.services.kpi_service import kpi_service
+from src.services.retention_service import retention_service, LEAD_SIDE_TABLES
+from src.routes.simple_delete import simple_delete_bp
+from synthetic_leads import make_app
+
+def add_lead(lead_id):
+    """A lead with one row in lead_document and in every side table"""
+    db.session.add(Lead(
+        lead_id=lead_id, first_name='Test', last_name=lead_id, email=f'{lead_id}@example.com',
+        phone=f'555-{lead_id}', stage='docs_requested', required_docs=REQUIRED_DOCS
+    ))
+    db.session.add(WorkflowStep(lead_id=lead_id, workflow_type='F1_WebLead', step='email_sent', status='completed'))
+    db.session.add(WorkflowJob(id=f'job-{lead_id}', workflow_type='F1_WebLead', lead_id=lead_id))
+    db.session.add(IdempotencyRecord(
+        key=f'key-{lead_id}', request_hash='hash', lead_id=lead_id,
+        expires_at=datetime.utcnow() + timedelta(hours=1)
+    ))
+    db.session.add(NotificationOutbox(
+        id=f'msg-{lead_id}', channel='email', dedup_key=f'welcome:{lead_id}', lead_id=lead_id,
+        recipient=f'{lead_id}@example.com', body='Welcome'
+    ))
+    db.session.commit()
+
+def rows_for(lead_id):
+    counts = {table.name: db.session.query(table).filter(table.c.lead_id == lead_id).count() for table in LEAD_SIDE_TABLES}
+    counts['lead_document'] = LeadDocument.query.filter_by(lead_id=lead_id).count()
+    return counts
+
+def test_purge_removes_side_table_rows(tmp_path):
+    app = make_app(str(tmp_path / 'app.db'))
+    with app.app_context():
+        add_lead('purged')
+        add_lead('kept')
+
+        result = retention_service.delete_leads(['purged', 'missing'], requested_by='test')
+
+        assert result['deleted'] == 1
+        assert result['not_found'] == ['missing']
+        assert db.session.get(Lead, 'purged') is None
+        assert set(rows_for('purged').values()) == {0}
+        assert set(rows_for('kept').values()) == {1, len(REQUIRED_DOCS)}
+        assert result['documents_deleted'] == len(REQUIRED_DOCS)
+        assert result['related_deleted'] == {table.name: 1 for table in LEAD_SIDE_TABLES}
+        assert kpi_service.stored_counts() == kpi_service.count_from_table()
+
+def test_single_lead_delete_route_removes_side_table_rows(tmp_path):
+    app = make_app(str(tmp_path / 'app.db'))
+    app.register_blueprint(simple_delete_bp, url_prefix='/api')
+    with app.app_context():
+        add_lead('purged')
+
+        response = app.test_client().delete('/api/delete-lead/purged')
+
+        assert response.status_code == 200
+        assert set(rows_for('purged').values()) == {0}
+        assert app.test_client().delete('/api/delete-lead/purged').status_code == 404
@@ -1,22 +1,43 @@
 from flask import Blueprint, request, jsonify, current_app
 from src.services.simple_workflow_service import simple_workflow_service
+from src.services.metrics_service import metrics_service
+from src.services.reminder_service import reminder_service
+from src.services.document_reconciliation_service import document_reconciliation_service
+from src.services.sharepoint_service import sharepoint_service
+from src.services.workflow_history_service import workflow_history_service
+from src.services.job_queue_service import job_queue_service
+from src.models.lead import db, Lead
 from datetime import datetime
 
 workflow_bp = Blueprint('workflow', __name__)
 
 @workflow_bp.route('/workflows/<workflow_type>/<lead_id>', methods=['POST'])
 def trigger_workflow(workflow_type, lead_id):
-    """Trigger a specific workflow for a lead"""
+    """Queue a workflow for a lead (or run it inline with ?sync=true)"""
     try:
         if workflow_type not in ['F1_WebLead', 'F2_PhoneLead']:
             return jsonify({'error': 'Invalid workflow type'}), 400
         
-        result = simple_workflow_service.workflows[workflow_type](lead_id)
+        if request.args.get('sync', 'false').lower() == 'true':
+            result = simple_workflow_service.workflows[workflow_type](lead_id)
+            
+            if 'error' in result:
+                return jsonify(result), 400
+            
+            return jsonify(result)
         
-        if 'error' in result:
-            return jsonify(result), 400
+        if db.session.query(Lead.lead_id).filter(Lead.lead_id == lead_id).first() is None:
+            return jsonify({'error': 'Lead not found'}), 400
         
-        return jsonify(result)
+        job = job_queue_service.enqueue(workflow_type, lead_id)
+        
+        return jsonify({
+            'status': 'queued',
+            'job_id': job.id,
+            'lead_id': lead_id,
+            'workflow_type': workflow_type,
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
         
     except Exception as e:
         return jsonify({'error': f'Workflow error: {str(e)}'}), 500
@@ -53,20 +74,21 @@ def run_daily_maintenance():
 
 @workflow_bp.route('/workflows/status/<lead_id>', methods=['GET'])
 def get_workflow_status(lead_id):
-    """Get the current workflow status for a lead"""
+    """Get the current workflow status for a lead from the persisted step history"""
     try:
-        # Run the workflow to get current status
-        result = workflow_service.process_web_lead(lead_id)
+        # Validate cheaply first so unchanged polls skip loading the history
+        etag = workflow_history_service.get_status_etag(lead_id)
+        if etag is None:
+            return jsonify({'error': 'Lead not found'}), 404
         
-        if 'error' in result:
-            return jsonify(result), 400
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(workflow_history_service.get_status(lead_id))
         
-        return jsonify({
-            'lead_id': lead_id,
-            'current_stage': result['current_stage'],
-            'workflow_steps': result['steps'],
-            'last_updated': datetime.utcnow().isoformat()
-        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -75,23 +97,35 @@ def get_workflow_status(lead_id):
 def send_reminders():
     """Manually trigger reminder sending for all eligible leads"""
     try:
-        from src.models.lead import Lead
-        
-        # Get all leads in docs_requested stage
-        leads = Lead.query.filter_by(stage='docs_requested').all()
-        
-        reminders_sent = 0
-        for lead in leads:
-            if workflow_service.should_send_reminder(lead):
-                # Trigger workflow to send reminder
-                workflow_service.process_web_lead(lead.lead_id)
-                reminders_sent += 1
+        # Batched pipeline: one indexed select, bulk render, pooled dispatch, batched commits
+        result = reminder_service.send_reminders()
+        return jsonify(result)
         
-        return jsonify({
-            'status': 'completed',
-            'reminders_sent': reminders_sent,
-            'timestamp': datetime.utcnow().isoformat()
-        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@workflow_bp.route('/workflows/documents/reconcile', methods=['POST'])
+def reconcile_documents():
+    """Sync stored document status with SharePoint for all active leads, advancing complete packets to docs_received"""
+    try:
+        data = request.get_json(silent=True) or {}
+        dry_run = data.get('dry_run', False) is True
+        
+        # The simulated folder reports the same two files for every lead; never write that back
+        if not dry_run and sharepoint_service.folder_source.name == 'simulated':
+            return jsonify({'error': 'Document reconciliation needs a real folder source (set SHAREPOINT_BACKEND)'}), 400
+        
+        for field in ('batch_size', 'max_leads'):
+            value = data.get(field)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+                return jsonify({'error': f'{field} must be a positive integer'}), 400
+        
+        result = document_reconciliation_service.reconcile(
+            dry_run=dry_run,
+            batch_size=data.get('batch_size'),
+            max_leads=data.get('max_leads')
+        )
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -100,37 +134,8 @@ def send_reminders():
 def get_workflow_metrics():
     """Get workflow performance metrics"""
     try:
-        from src.models.lead import Lead
-        import json
-        
-        # Calculate metrics
-        total_leads = Lead.query.count()
-        
-        # Stage distribution
-        stages = {}
-        for stage in ['inquiry', 'docs_requested', 'docs_received', 'clinical_review', 'consult_ready', 'scheduled', 'decision']:
-            stages[stage] = Lead.query.filter_by(stage=stage).count()
-        
-        # Consent rate
-        consented_leads = Lead.query.filter_by(has_consent=True).count()
-        consent_rate = (consented_leads / total_leads * 100) if total_leads > 0 else 0
-        
-        # Document completion rate
-        leads_with_docs = Lead.query.filter(Lead.stage.in_(['docs_received', 'clinical_review', 'consult_ready', 'scheduled', 'decision'])).count()
-        docs_completion_rate = (leads_with_docs / total_leads * 100) if total_leads > 0 else 0
-        
-        # Conversion rate (docs to consult)
-        scheduled_leads = Lead.query.filter_by(stage='scheduled').count()
-        conversion_rate = (scheduled_leads / leads_with_docs * 100) if leads_with_docs > 0 else 0
-        
-        return jsonify({
-            'total_leads': total_leads,
-            'stage_distribution': stages,
-            'consent_rate': round(consent_rate, 2),
-            'docs_completion_rate': round(docs_completion_rate, 2),
-            'docs_to_consult_conversion_rate': round(conversion_rate, 2),
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        # Stage distribution and rates come from one grouped aggregate query
+        return jsonify(metrics_service.get_workflow_metrics())
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,62 @@
+from datetime import datetime
+from sqlalchemy import func
+from src.models.lead import db, Lead
+from src.models.workflow_step import WorkflowStep
+
+class WorkflowHistoryService:
+    """Persisted workflow step history and side-effect-free status reads"""
+
+    def record_step(self, lead_id, workflow_type, step, status, details=None):
+        """Stage a step row in the current transaction and return it in the workflow response format"""
+        entry = WorkflowStep(
+            lead_id=lead_id,
+            workflow_type=workflow_type,
+            step=step,
+            status=status,
+            details=details,
+            created_at=datetime.utcnow()
+        )
+        db.session.add(entry)
+
+        return {
+            'step': step,
+            'status': status,
+            'timestamp': entry.created_at.isoformat(),
+            'details': details
+        }
+
+    def get_status_etag(self, lead_id):
+        """Cheap validator for a lead's status: stage plus latest step id (index-only lookup)"""
+        lead = db.session.query(Lead.stage).filter(Lead.lead_id == lead_id).first()
+        if lead is None:
+            return None
+
+        latest_step, = db.session.query(func.max(WorkflowStep.id)).filter(WorkflowStep.lead_id == lead_id).one()
+        return f'{lead_id}:{lead.stage}:{latest_step or 0}'
+
+    def get_steps_since(self, lead_id, workflow_type, since):
+        """Steps one workflow recorded for a lead from `since` on, in execution order"""
+        steps = WorkflowStep.query.filter(
+            WorkflowStep.lead_id == lead_id,
+            WorkflowStep.workflow_type == workflow_type,
+            WorkflowStep.created_at >= since
+        ).order_by(WorkflowStep.id).all()
+        return [step.to_dict() for step in steps]
+
+    def get_status(self, lead_id):
+        """Current stage and step history for a lead, or None if the lead does not exist"""
+        lead = db.session.query(Lead.stage).filter(Lead.lead_id == lead_id).first()
+        if lead is None:
+            return None
+
+        steps = WorkflowStep.query.filter_by(lead_id=lead_id).order_by(WorkflowStep.id).all()
+
+        return {
+            'lead_id': lead_id,
+            'current_stage': lead.stage,
+            'workflow_steps': [step.to_dict() for step in steps],
+            'last_updated': steps[-1].created_at.isoformat() if steps else None
+        }
+
+# Global instance
+workflow_history_service = WorkflowHistoryService()
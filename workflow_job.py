@@ -0,0 +1,37 @@
+from datetime import datetime
+from src.models.lead import db
+
+class WorkflowJob(db.Model):
+    """Durable queue entry for an asynchronous workflow run"""
+    __table_args__ = (
+        # Claiming: next queued job that is due
+        db.Index('ix_workflow_job_claim', 'status', 'next_run_at'),
+    )
+
+    id = db.Column(db.String, primary_key=True)
+    workflow_type = db.Column(db.String, nullable=False)
+    lead_id = db.Column(db.String, nullable=False, index=True)
+    status = db.Column(db.String, nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String)
+    locked_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'workflow_type': self.workflow_type,
+            'lead_id': self.lead_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'next_run_at': self.next_run_at.isoformat() if self.status == 'queued' else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
@@ -1,8 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 from src.models.lead import db, Lead
-from src.services.notification_service import notification_service
+from src.services.outbox_service import outbox_service
 from src.services.sharepoint_service import sharepoint_service
 from src.services.esign_service import esign_service
+from src.services.workflow_history_service import workflow_history_service
+
+class StepGraph:
+    """Runs workflow steps as a dependency graph, starting each step as soon as its inputs are ready
+
+    A step is a callable taking {dependency_name: result}. A step that raises
+    or returns a falsy result counts as failed, and its dependents are skipped.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.steps = {}
+
+    def add(self, name, fn, depends_on=()):
+        for dependency in depends_on:
+            if dependency not in self.steps:
+                raise ValueError(f'Step {name} depends on unknown step {dependency}')
+        self.steps[name] = (fn, tuple(depends_on))
+        return self
+
+    def _run_step(self, name, inputs):
+        fn, _ = self.steps[name]
+        started = datetime.utcnow()
+        start = time.perf_counter()
+        try:
+            result, error = fn(inputs), None
+        except Exception as e:
+            result, error = None, str(e)
+        return name, result, error, started, (time.perf_counter() - start) * 1000
+
+    def run(self):
+        """Execute the graph; returns ({name: result}, [step record in completion order])"""
+        results = {}
+        records = []
+        pending = dict(self.steps)
+        failed = set()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name, (fn, depends_on) in list(pending.items()):
+                    if any(dependency in failed for dependency in depends_on):
+                        del pending[name]
+                        failed.add(name)
+                        records.append({
+                            'step': name,
+                            'status': 'skipped',
+                            'timestamp': datetime.utcnow().isoformat(),
+                            'duration_ms': 0,
+                            'details': f"Skipped: depends on {', '.join(d for d in depends_on if d in failed)}"
+                        })
+                    elif all(dependency in results for dependency in depends_on):
+                        del pending[name]
+                        inputs = {dependency: results[dependency] for dependency in depends_on}
+                        running[pool.submit(self._run_step, name, inputs)] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    name, result, error, started, duration_ms = future.result()
+
+                    if error is None and result:
+                        results[name] = result
+                        status = 'completed'
+                    else:
+                        failed.add(name)
+                        status = 'failed'
+
+                    record = {
+                        'step': name,
+                        'status': status,
+                        'timestamp': started.isoformat(),
+                        'duration_ms': round(duration_ms, 1)
+                    }
+                    if error:
+                        record['details'] = error
+                    records.append(record)
+
+        return results, records
 
 class WorkflowService:
     def __init__(self):
@@ -10,40 +94,96 @@ class WorkflowService:
             'F1_WebLead': self.process_web_lead,
             'F2_PhoneLead': self.process_phone_lead
         }
-    
+
     def process_web_lead(self, lead_id):
         """Process F1 - Website Lead workflow"""
         try:
             lead = Lead.query.filter_by(lead_id=lead_id).first()
             if not lead:
                 return {'error': 'Lead not found'}
-            
+
             workflow_steps = []
-            
+            started = time.perf_counter()
+
             # Step 1: Lead already created by CreateOrUpdateLead API
             workflow_steps.append({
                 'step': 'create_lead',
                 'status': 'completed',
-                'timestamp': lead.last_touch_iso
+                'timestamp': lead.last_touch_iso.isoformat() if lead.last_touch_iso else None
             })
-            
+
             # Step 2: Issue document request and generate consent link
             if lead.stage == 'inquiry':
-                # Generate upload link
-                upload_result = sharepoint_service.generate_upload_link(lead_id)
-                if upload_result:
-                    # Generate consent link
-                    lead_data = {
-                        'first_name': lead.first_name,
-                        'last_name': lead.last_name,
-                        'email': lead.email,
-                        'phone': lead.phone,
-                        'relationship': lead.relationship
-                    }
-                    
-                    consent_link = esign_service.generate_consent_link(lead_data)
-                    
-                    # Send initial email with both links
-                    notification_sent = notification_service.send_secure_upload_and_consent(
-                        lead_data, 
-                        upload_result['upload_link'], 
+                lead_data = {
+                    'first_name': lead.first_name,
+                    'last_name': lead.last_name,
+                    'email': lead.email,
+                    'phone': lead.phone,
+                    'relationship': lead.relationship
+                }
+
+                # Upload link and consent envelope are independent external calls and run concurrently
+                graph = StepGraph()
+                graph.add('upload_link_created', lambda _: sharepoint_service.generate_upload_link(lead_id))
+                graph.add('consent_link_generated', lambda _: esign_service.generate_consent_link(lead_data))
+
+                results, step_records = graph.run()
+
+                for record in step_records:
+                    workflow_history_service.record_step(
+                        lead_id, 'F1_WebLead', record['step'], record['status'], record.get('details')
+                    )
+                workflow_steps.extend(step_records)
+
+                # Step 3: Queue the e-mail and move to docs_requested in one transaction; the outbox
+                # dispatcher delivers it, so provider latency and outages stay out of this workflow
+                if 'upload_link_created' in results and 'consent_link_generated' in results:
+                    _, created = outbox_service.enqueue_template_email(
+                        'initial_followup',
+                        lead.email,
+                        {
+                            **lead_data,
+                            'upload_link': results['upload_link_created']['upload_link'],
+                            'consent_link': results['consent_link_generated']
+                        },
+                        dedup_key=f'F1_WebLead:initial_followup:{lead_id}',
+                        lead_id=lead_id
+                    )
+                    workflow_steps.append(workflow_history_service.record_step(
+                        lead_id, 'F1_WebLead', 'upload_and_consent_queued', 'completed',
+                        f'Upload and consent e-mail queued for {lead.email}' if created else 'Upload and consent e-mail already queued'
+                    ))
+
+                    lead.stage = 'docs_requested'
+                    lead.last_touch_iso = datetime.utcnow()
+                    workflow_steps.append(workflow_history_service.record_step(
+                        lead_id, 'F1_WebLead', 'stage_updated', 'completed', 'Lead stage updated to docs_requested'
+                    ))
+
+            db.session.commit()
+
+            return {
+                'status': 'success',
+                'lead_id': lead_id,
+                'current_stage': lead.stage,
+                'steps': workflow_steps,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Workflow error: {str(e)}")
+            return {'error': f'Workflow error: {str(e)}'}
+
+    def process_phone_lead(self, lead_id):
+        """Process F2 - Phone Lead workflow (placeholder)"""
+        return {
+            'status': 'success',
+            'lead_id': lead_id,
+            'message': 'Phone lead workflow not implemented yet',
+            'steps': []
+        }
+
+# Global instance
+workflow_service = WorkflowService()
@@ -0,0 +1,26 @@
+from datetime import datetime
+from src.models.lead import db
+
+class WorkflowStep(db.Model):
+    """One executed workflow step for a lead, appended as the workflow runs"""
+    __table_args__ = (
+        # Status reads: all steps for a lead in execution order
+        db.Index('ix_workflow_step_lead', 'lead_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    lead_id = db.Column(db.String, nullable=False)
+    workflow_type = db.Column(db.String, nullable=False)
+    step = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False)
+    details = db.Column(db.String)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'step': self.step,
+            'status': self.status,
+            'timestamp': self.created_at.isoformat(),
+            'details': self.details,
+            'workflow_type': self.workflow_type
+        }